@@ -58,6 +58,24 @@ export async function saveCanvas(
   return await response.json()
 }
 
+export async function patchCanvas(
+  id: string,
+  payload: {
+    elements: CanvasData['elements']
+    deleted: string[]
+    files: CanvasData['files']
+    appState?: CanvasData['appState']
+    thumbnail?: string
+  }
+): Promise<void> {
+  const response = await fetch(`/api/canvas/${id}/patch`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(payload),
+  })
+  return await response.json()
+}
+
 export async function renameCanvas(id: string, name: string): Promise<void> {
   const response = await fetch(`/api/canvas/${id}/rename`, {
     method: 'POST',
@@ -1,5 +1,6 @@
 import { Message, Model } from '@/types/types'
 import { ModelInfo, ToolInfo } from './model'
+import { getAccessToken } from './auth'
 
 export const getChatSession = async (sessionId: string) => {
   const response = await fetch(`/api/chat_session/${sessionId}`)
@@ -15,13 +16,17 @@ export const sendMessages = async (payload: {
   toolList: ToolInfo[]
   systemPrompt: string | null
 }) => {
+  const token = getAccessToken()
   const response = await fetch(`/api/chat`, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
+      // Lets the server apply per-user tool confirmation rules
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
     },
     body: JSON.stringify({
-      messages: payload.newMessages,
+      // The server keeps the history; only send the new message
+      message: payload.newMessages[payload.newMessages.length - 1],
       canvas_id: payload.canvasId,
       session_id: payload.sessionId,
       text_model: payload.textModel,
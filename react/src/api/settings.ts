@@ -173,9 +173,10 @@ export const getFileThumbnailApi = async (filePath: string) => {
   return response.json()
 }
 
-// 获取文件服务URL
-export const getFileServiceUrl = (filePath: string) => {
-  return `/api/serve_file?file_path=${encodeURIComponent(filePath)}`
+// 获取文件服务URL；传入 width 时返回服务端生成的 WebP 缩略图
+export const getFileServiceUrl = (filePath: string, width?: number) => {
+  const url = `/api/serve_file?file_path=${encodeURIComponent(filePath)}`
+  return width ? `${url}&w=${width}` : url
 }
 
 // 获取文件详细信息
@@ -1,4 +1,4 @@
-import { saveCanvas } from '@/api/canvas'
+import { patchCanvas, saveCanvas } from '@/api/canvas'
 import { useCanvas } from '@/contexts/canvas'
 import useDebounce from '@/hooks/use-debounce'
 import { useTheme } from '@/hooks/use-theme'
@@ -73,6 +73,10 @@ const CanvasExcali: React.FC<CanvasExcaliProps> = ({
     }
   }
 
+  // Element versions and file ids already persisted, so later saves only send what changed
+  const savedElementVersions = useRef<Map<string, number> | null>(null)
+  const savedFileIds = useRef<Set<string>>(new Set())
+
   // Debounced handler for saving (performance optimization)
   const handleSave = useDebounce(
     (
@@ -104,7 +108,36 @@ const CanvasExcali: React.FC<CanvasExcaliProps> = ({
         }
       }
 
-      saveCanvas(canvasId, { data, thumbnail })
+      const previousVersions = savedElementVersions.current
+      savedElementVersions.current = new Map(
+        elements.map((element) => [element.id, element.version])
+      )
+
+      // First save of this session ships the full document
+      if (!previousVersions) {
+        savedFileIds.current = new Set(Object.keys(files))
+        saveCanvas(canvasId, { data, thumbnail })
+        return
+      }
+
+      const changedElements = elements.filter(
+        (element) => previousVersions.get(element.id) !== element.version
+      )
+      const deleted = [...previousVersions.keys()].filter(
+        (id) => !savedElementVersions.current!.has(id)
+      )
+      const newFiles = Object.fromEntries(
+        Object.entries(files).filter(([id]) => !savedFileIds.current.has(id))
+      )
+      Object.keys(newFiles).forEach((id) => savedFileIds.current.add(id))
+
+      patchCanvas(canvasId, {
+        elements: changedElements,
+        deleted,
+        files: newFiles,
+        appState: data.appState,
+        thumbnail,
+      })
     },
     1000
   )
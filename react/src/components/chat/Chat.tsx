@@ -42,6 +42,7 @@ import { ModelInfo, ToolInfo } from '@/api/model'
 import { Button } from '@/components/ui/button'
 import { Share2 } from 'lucide-react'
 import { useAuth } from '@/contexts/AuthContext'
+import { useSocket } from '@/contexts/socket'
 import { useQueryClient } from '@tanstack/react-query'
 import MixedContent, { MixedContentImages, MixedContentText } from './Message/MixedContent'
 
@@ -88,6 +89,12 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
 
   const sessionId = session?.id ?? searchSessionId
 
+  // Only receive session_update events for the session and canvas on screen
+  const { socketManager, connected } = useSocket()
+  useEffect(() => {
+    socketManager?.joinSession(sessionId, canvasId)
+  }, [socketManager, connected, sessionId, canvasId])
+
   const sessionIdRef = useRef<string>(session?.id || nanoid())
   const [expandingToolCalls, setExpandingToolCalls] = useState<string[]>([])
   const [pendingToolConfirmations, setPendingToolConfirmations] = useState<
@@ -452,6 +459,40 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
     })
   }, [])
 
+  const handleGenerationJobResumed = useCallback(
+    (data: TEvents['Socket::Session::GenerationJobResumed']) => {
+      if (data.session_id && data.session_id !== sessionId) {
+        return
+      }
+
+      toast.success(`Resumed ${data.kind} generation finished`, {
+        closeButton: true,
+        duration: 10 * 1000,
+      })
+    },
+    [sessionId]
+  )
+
+  const handleGenerationQueue = useCallback(
+    (data: TEvents['Socket::Session::GenerationQueue']) => {
+      if (data.session_id && data.session_id !== sessionId) {
+        return
+      }
+
+      // One toast per provider, updated in place while the request waits
+      const toastId = `generation-queue-${data.provider}`
+      if (data.position > 0) {
+        toast.loading(
+          `Waiting for ${data.provider}: #${data.position} in queue`,
+          { id: toastId }
+        )
+      } else {
+        toast.dismiss(toastId)
+      }
+    },
+    [sessionId]
+  )
+
   useEffect(() => {
     const handleScroll = () => {
       if (scrollRef.current) {
@@ -478,6 +519,11 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
     eventBus.on('Socket::Session::Done', handleDone)
     eventBus.on('Socket::Session::Error', handleError)
     eventBus.on('Socket::Session::Info', handleInfo)
+    eventBus.on(
+      'Socket::Session::GenerationJobResumed',
+      handleGenerationJobResumed
+    )
+    eventBus.on('Socket::Session::GenerationQueue', handleGenerationQueue)
     return () => {
       scrollEl?.removeEventListener('scroll', handleScroll)
 
@@ -505,6 +551,11 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({
       eventBus.off('Socket::Session::Done', handleDone)
       eventBus.off('Socket::Session::Error', handleError)
       eventBus.off('Socket::Session::Info', handleInfo)
+      eventBus.off(
+        'Socket::Session::GenerationJobResumed',
+        handleGenerationJobResumed
+      )
+      eventBus.off('Socket::Session::GenerationQueue', handleGenerationQueue)
     }
   })
 
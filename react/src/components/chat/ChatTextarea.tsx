@@ -422,7 +422,7 @@ const ChatTextarea: React.FC<ChatTextareaProps> = ({
               >
                 <img
                   key={image.file_id}
-                  src={`/api/file/${image.file_id}`}
+                  src={`/api/file/${image.file_id}?w=256`}
                   alt="Uploaded image"
                   className="w-full h-full object-cover rounded-md"
                   draggable={false}
@@ -613,7 +613,7 @@ export default function MaterialManager() {
 
               {file.type === 'image' ? (
                 <img
-                  src={getFileServiceUrl(file.path)}
+                  src={getFileServiceUrl(file.path, 256)}
                   alt={file.name}
                   className="w-full h-full object-cover transition-transform duration-300 group-hover:scale-105"
                   onError={(e) => {
@@ -689,7 +689,7 @@ export default function MaterialManager() {
 
               {file.type === 'image' ? (
                 <img
-                  src={getFileServiceUrl(file.path)}
+                  src={getFileServiceUrl(file.path, 256)}
                   alt={file.name}
                   className="w-full h-full object-cover"
                   onError={(e) => {
@@ -772,7 +772,7 @@ export default function MaterialManager() {
             <div className="aspect-video bg-gray-100 dark:bg-gray-700 rounded-lg overflow-hidden flex items-center justify-center">
               {selectedFile.type === 'image' ? (
                 <img
-                  src={getFileServiceUrl(selectedFile.path)}
+                  src={getFileServiceUrl(selectedFile.path, 1024)}
                   alt={selectedFile.name}
                   className="max-w-full max-h-full object-contain"
                 />
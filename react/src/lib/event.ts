@@ -40,6 +40,8 @@ export type TEvents = {
   'Socket::Session::ToolCallPendingConfirmation': ISocket.SessionToolCallPendingConfirmationEvent
   'Socket::Session::ToolCallConfirmed': ISocket.SessionToolCallConfirmedEvent
   'Socket::Session::ToolCallCancelled': ISocket.SessionToolCallCancelledEvent
+  'Socket::Session::GenerationJobResumed': ISocket.SessionGenerationJobResumedEvent
+  'Socket::Session::GenerationQueue': ISocket.SessionGenerationQueueEvent
   // ********** Socket events - End **********
 
   // ********** Canvas events - Start **********
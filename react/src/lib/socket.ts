@@ -7,8 +7,18 @@ export interface SocketConfig {
   autoConnect?: boolean
 }
 
+type SessionMessagesState = {
+  runId?: string | null
+  seq: number
+  messages: ISocket.SessionAllMessagesEvent['messages']
+}
+
 export class SocketIOManager {
   private socket: Socket | null = null
+  // Latest full message list per session, rebuilt from messages_delta events
+  private sessionMessages = new Map<string, SessionMessagesState>()
+  // Session/canvas rooms this client is subscribed to; re-joined after reconnects
+  private subscription: { sessionId?: string; canvasId?: string } = {}
   private connected = false
   private reconnectAttempts = 0
   private maxReconnectAttempts = 5
@@ -40,6 +50,7 @@ export class SocketIOManager {
         console.log('✅ Socket.IO connected:', this.socket?.id)
         this.connected = true
         this.reconnectAttempts = 0
+        this.emitJoinSession()
         resolve(true)
       })
 
@@ -123,7 +134,10 @@ export class SocketIOManager {
         eventBus.emit('Socket::Session::VideoGenerated', data)
         break
       case ISocket.SessionEventType.AllMessages:
-        eventBus.emit('Socket::Session::AllMessages', data)
+        this.handleAllMessages(data)
+        break
+      case ISocket.SessionEventType.MessagesDelta:
+        this.handleMessagesDelta(data)
         break
       case ISocket.SessionEventType.Done:
         eventBus.emit('Socket::Session::Done', data)
@@ -137,11 +151,93 @@ export class SocketIOManager {
       case ISocket.SessionEventType.ToolCallResult:
         eventBus.emit('Socket::Session::ToolCallResult', data)
         break
+      case ISocket.SessionEventType.GenerationJobResumed:
+        eventBus.emit('Socket::Session::GenerationJobResumed', data)
+        // The result message was appended outside a run: fetch the updated list
+        this.resyncMessages(session_id)
+        break
+      case ISocket.SessionEventType.GenerationQueue:
+        eventBus.emit('Socket::Session::GenerationQueue', data)
+        break
       default:
         console.log('⚠️ Unknown session update type:', type)
     }
   }
 
+  private handleAllMessages(data: ISocket.SessionAllMessagesEvent) {
+    this.sessionMessages.set(data.session_id, {
+      runId: data.run_id,
+      seq: data.seq ?? 0,
+      messages: data.messages,
+    })
+    eventBus.emit('Socket::Session::AllMessages', data)
+  }
+
+  private handleMessagesDelta(data: ISocket.SessionMessagesDeltaEvent) {
+    const state = this.sessionMessages.get(data.session_id)
+    // A new run starts from the stored history this client already holds
+    const startsRun = data.seq === 1 && (state?.messages.length ?? -1) >= (data.base ?? 0)
+    const inOrder = state?.runId === data.run_id && state.seq + 1 === data.seq
+    if (!state || !(startsRun || inOrder)) {
+      // Missed a frame: ask the server for the full list
+      this.resyncMessages(data.session_id)
+      return
+    }
+
+    const messages = state.messages.slice(0, data.total)
+    for (const { index, message } of data.updates) {
+      messages[index] = message
+    }
+    this.handleAllMessages({
+      type: ISocket.SessionEventType.AllMessages,
+      session_id: data.session_id,
+      run_id: data.run_id,
+      seq: data.seq,
+      messages,
+    })
+  }
+
+  joinSession(sessionId?: string, canvasId?: string) {
+    if (
+      this.subscription.sessionId === sessionId &&
+      this.subscription.canvasId === canvasId
+    ) {
+      return
+    }
+    this.subscription = { sessionId, canvasId }
+    this.emitJoinSession()
+  }
+
+  private emitJoinSession() {
+    if (!this.socket || !this.connected) return
+    const { sessionId, canvasId } = this.subscription
+    if (!sessionId && !canvasId) return
+
+    this.socket.emit(
+      'join_session',
+      { session_id: sessionId, canvas_id: canvasId },
+      () => {
+        // Catch up on anything emitted to the room before we joined
+        if (sessionId) {
+          this.resyncMessages(sessionId)
+        }
+      }
+    )
+  }
+
+  resyncMessages(sessionId: string) {
+    if (!this.socket || !this.connected) return
+    this.socket.emit(
+      'resync_messages',
+      { session_id: sessionId },
+      (data: ISocket.SessionAllMessagesEvent) => {
+        if (data?.type === ISocket.SessionEventType.AllMessages) {
+          this.handleAllMessages(data)
+        }
+      }
+    )
+  }
+
   ping(data: unknown) {
     if (this.socket && this.connected) {
       this.socket.emit('ping', data)
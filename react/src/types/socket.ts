@@ -13,10 +13,13 @@ export enum SessionEventType {
   ToolCallArguments = 'tool_call_arguments',
   ToolCallResult = 'tool_call_result',
   AllMessages = 'all_messages',
+  MessagesDelta = 'messages_delta',
   ToolCallProgress = 'tool_call_progress',
   ToolCallPendingConfirmation = 'tool_call_pending_confirmation',
   ToolCallConfirmed = 'tool_call_confirmed',
   ToolCallCancelled = 'tool_call_cancelled',
+  GenerationJobResumed = 'generation_job_resumed',
+  GenerationQueue = 'generation_queue',
 }
 
 export interface SessionBaseEvent {
@@ -71,6 +74,17 @@ export interface SessionToolCallResultEvent extends SessionBaseEvent {
 export interface SessionAllMessagesEvent extends SessionBaseEvent {
   type: SessionEventType.AllMessages
   messages: Message[]
+  run_id?: string | null
+  seq?: number
+}
+export interface SessionMessagesDeltaEvent extends SessionBaseEvent {
+  type: SessionEventType.MessagesDelta
+  run_id: string
+  seq: number
+  total: number
+  updates: { index: number; message: Message }[]
+  // First frame of a run: number of stored messages the updates are relative to
+  base?: number
 }
 export interface SessionToolCallProgressEvent extends SessionBaseEvent {
   type: SessionEventType.ToolCallProgress
@@ -96,6 +110,21 @@ export interface SessionToolCallCancelledEvent extends SessionBaseEvent {
   id: string
 }
 
+// A generation interrupted by a server restart finished; its result message was added to the session
+export interface SessionGenerationJobResumedEvent extends SessionBaseEvent {
+  type: SessionEventType.GenerationJobResumed
+  job_id: string
+  kind: 'image' | 'video'
+  message: Message
+}
+
+// Position of a queued image / video generation; 0 means it has started
+export interface SessionGenerationQueueEvent extends SessionBaseEvent {
+  type: SessionEventType.GenerationQueue
+  provider: string
+  position: number
+}
+
 export type SessionUpdateEvent =
   | SessionDeltaEvent
   | SessionToolCallEvent
@@ -104,6 +133,7 @@ export type SessionUpdateEvent =
   | SessionImageGeneratedEvent
   | SessionVideoGeneratedEvent
   | SessionAllMessagesEvent
+  | SessionMessagesDeltaEvent
   | SessionDoneEvent
   | SessionErrorEvent
   | SessionInfoEvent
@@ -111,3 +141,5 @@ export type SessionUpdateEvent =
   | SessionToolCallPendingConfirmationEvent
   | SessionToolCallConfirmedEvent
   | SessionToolCallCancelledEvent
+  | SessionGenerationJobResumedEvent
+  | SessionGenerationQueueEvent
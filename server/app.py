@@ -0,0 +1,146 @@
+# server/app.py
+# Aplikasi FastAPI + Socket.IO. Dipisahkan dari main.py karena proses anak (worker uvicorn,
+# process pool gambar) mengimpor ulang main.py; modul ini hanya diimpor oleh proses server.
+
+import os
+# --- Impor Router dan Service ---
+print('Importing websocket_router')
+from routers.websocket_router import *
+print('Importing routers')
+from routers import (
+    auth_router,
+    config_router,
+    image_router,
+    root_router,
+    workspace,
+    canvas,
+    ssl_test,
+    chat_router,
+    settings,
+    tool_confirmation,
+    task_webhook_router
+)
+# --- PERUBAHAN DI SINI ---
+from fastapi import FastAPI, HTTPException, Request # <-- Impor HTTPException dari fastapi
+from fastapi.responses import FileResponse # <-- Impor FileResponse secara terpisah
+# --- AKHIR PERUBAHAN ---
+from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
+from starlette.types import Scope
+from starlette.responses import Response
+import socketio # type: ignore
+
+print('Importing websocket_state')
+from services.websocket_state import sio
+print('Importing websocket_service')
+from services.websocket_service import broadcast_init_done
+print('Importing config_service')
+from services.config_service import config_service
+print('Importing tool_service')
+from services.tool_service import tool_service
+from services.db_service import db_service
+from services.stream_service import stream_task_registry
+from services.image_processing_service import image_processing_service
+from services.asset_store import asset_store
+from services.message_journal import message_journal
+from services.task_tracker import task_tracker
+from services.generation_job_service import generation_job_service
+from services.tool_confirmation_manager import tool_confirmation_manager
+from utils.http_client import HttpClient
+from utils.llm_client_registry import llm_client_registry
+from utils.http_cache import cached_file_response, IMMUTABLE_CACHE_CONTROL, NO_STORE_CACHE_CONTROL
+
+root_dir = os.path.dirname(__file__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Fungsi yang dieksekusi saat startup dan shutdown server."""
+    # --- ON STARTUP ---
+    print('Initializing db_service')
+    await db_service.initialize()
+    await message_journal.start()
+    await task_tracker.start()
+    await stream_task_registry.start()
+    await asset_store.start()
+    await tool_confirmation_manager.start()
+    print('Initializing config_service')
+    await config_service.initialize()
+    print('Initializing tool_service (generic)')
+    await tool_service.initialize()
+    # Setelah konfigurasi dan tools dimuat: resumer provider membaca kredensial dari config
+    print('Resuming interrupted generation jobs')
+    await generation_job_service.start()
+    print('Initializing broadcast_init_done')
+    await broadcast_init_done()
+    
+    yield
+    
+    # --- ON SHUTDOWN ---
+    # Sebelum stream dibatalkan, agar job generasi yang berjalan tetap bisa dilanjutkan
+    await generation_job_service.stop()
+    await stream_task_registry.stop()
+    await task_tracker.stop()
+    await tool_confirmation_manager.stop()
+    image_processing_service.shutdown()
+    await asset_store.close()
+    await llm_client_registry.aclose()
+    await HttpClient.aclose_shared()
+    await message_journal.close()
+    await db_service.close()
+
+print('Creating FastAPI app')
+app = FastAPI(lifespan=lifespan)
+
+# --- Integrasi Router ---
+#print('Including routers')
+app.include_router(auth_router.router)
+app.include_router(config_router.router)
+app.include_router(settings.router)
+app.include_router(root_router.router)
+app.include_router(canvas.router)
+app.include_router(workspace.router)
+app.include_router(image_router.router)
+app.include_router(ssl_test.router)
+app.include_router(chat_router.router)
+app.include_router(tool_confirmation.router)
+app.include_router(task_webhook_router.router)
+
+# --- Penyajian File Statis (Frontend React) ---
+react_build_dir = os.environ.get('UI_DIST_DIR', os.path.join(
+    os.path.dirname(root_dir), "react", "dist"))
+
+class HashedStaticFiles(StaticFiles):
+    """Aset build Vite memiliki hash konten di nama file, jadi aman di-cache selamanya."""
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 206, 304):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+static_site_assets = os.path.join(react_build_dir, "assets")
+if os.path.exists(static_site_assets):
+    app.mount("/assets", HashedStaticFiles(directory=static_site_assets), name="assets")
+
+@app.get("/{full_path:path}", include_in_schema=False)
+async def serve_react_app(request: Request, full_path: str):
+    """Menyajikan aplikasi React, termasuk menangani routing di sisi klien."""
+    file_path = os.path.join(react_build_dir, full_path)
+    # index.html harus selalu diambil ulang agar merujuk ke aset dengan hash terbaru
+    is_index = os.path.basename(file_path) == "index.html"
+    if os.path.exists(file_path) and os.path.isfile(file_path) and not is_index:
+        # File di root build (favicon, dll.) tanpa hash: cache dengan revalidasi ETag
+        return cached_file_response(request, file_path)
+    
+    index_path = os.path.join(react_build_dir, "index.html")
+    if os.path.exists(index_path):
+        response = FileResponse(index_path)
+        response.headers["Cache-Control"] = NO_STORE_CACHE_CONTROL
+        response.headers["Pragma"] = "no-cache"
+        response.headers["Expires"] = "0"
+        return response
+    
+    raise HTTPException(status_code=404, detail="React app not found.")
+
+print('Creating socketio app')
+# Menggabungkan aplikasi FastAPI dengan Socket.IO
+socket_app = socketio.ASGIApp(sio, other_asgi_app=app, socketio_path='/socket.io')
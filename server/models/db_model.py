@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import Any, Dict, Literal, Optional, TypedDict
 
 
 class ComfyWorkflow(BaseModel):
@@ -7,3 +8,57 @@ class ComfyWorkflow(BaseModel):
     description: str
     inputs: str
     outputs: str
+
+
+class CanvasOp(TypedDict):
+    """One entry of the canvas patch log.
+
+    - append/update: payload is the full element, keyed by element_id
+    - delete: removes element_id, payload is None
+    - file: payload is a files-map entry, keyed by its 'id'
+    - app_state: payload replaces data.appState
+    """
+    op: Literal['append', 'update', 'delete', 'file', 'app_state']
+    element_id: Optional[str]
+    payload: Optional[Dict[str, Any]]
+
+
+class CanvasElementGeometry(TypedDict, total=False):
+    """Element projection used for placement; no files map, no sessions."""
+    id: str
+    type: str
+    x: float
+    y: float
+    width: float
+    height: float
+    isDeleted: bool
+
+
+CANVAS_GEOMETRY_FIELDS = ('id', 'type', 'x', 'y', 'width', 'height', 'isDeleted')
+
+
+GenerationJobStatus = Literal['submitted', 'running', 'resuming', 'succeeded', 'failed']
+
+
+class GenerationJob(TypedDict, total=False):
+    """A remote image/video generation, persisted so it can be resumed after a restart.
+
+    - submitted: created before the provider request, no remote_task_id yet
+    - running: the provider accepted the task, remote_task_id is known
+    - resuming: claimed by a worker that re-attached to it after its owner stopped
+
+    owner_id is the worker process running the job; it refreshes heartbeat_at while alive,
+    so other workers only take over jobs whose heartbeat went stale.
+    """
+    id: str
+    kind: Literal['image', 'video']
+    provider: str
+    model: str
+    remote_task_id: Optional[str]
+    canvas_id: str
+    session_id: str
+    status: GenerationJobStatus
+    result_url: Optional[str]
+    error: Optional[str]
+    owner_id: Optional[str]
+    heartbeat_at: Optional[float]
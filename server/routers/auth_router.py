@@ -3,13 +3,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr, Field, field_validator
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from services.db_service import db_service
 from services.auth_service import verify_password, get_password_hash, create_access_token, decode_access_token
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token")
+# Untuk endpoint yang juga melayani pengguna tanpa login
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/token", auto_error=False)
 
 class UserCreate(BaseModel):
     username: str
@@ -54,6 +56,16 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any
         raise credentials_exception
     return user
 
+async def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[Dict[str, Any]]:
+    """Pengguna yang login, atau None bila tidak ada token yang valid"""
+    if not token:
+        return None
+    payload = decode_access_token(token)
+    user_id = payload.get("sub") if payload else None
+    if user_id is None:
+        return None
+    return await db_service.get_user_by_id(int(user_id))
+
 @router.post("/register", response_model=User)
 async def register_user(user: UserCreate):
     db_user_by_username = await db_service.get_user_by_username(user.username)
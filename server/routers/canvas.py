@@ -2,6 +2,8 @@ from fastapi import APIRouter, Request
 #from routers.agent import chat
 from services.chat_service import handle_chat
 from services.db_service import db_service
+from models.db_model import CanvasOp
+from typing import List
 import asyncio
 import json
 
@@ -32,6 +34,31 @@ async def save_canvas(id: str, request: Request):
     await db_service.save_canvas_data(id, data_str, payload['thumbnail'])
     return {"id": id }
 
+@router.post("/{id}/patch")
+async def patch_canvas(id: str, request: Request):
+    """
+    Simpan perubahan canvas secara incremental.
+    Body: {elements: [elemen baru/berubah], deleted: [id elemen], files: {file_id: file}, appState?, thumbnail?}
+    """
+    payload = await request.json()
+    ops: List[CanvasOp] = [
+        {'op': 'file', 'element_id': file_id, 'payload': file}
+        for file_id, file in (payload.get('files') or {}).items()
+    ]
+    ops.extend(
+        {'op': 'update', 'element_id': element['id'], 'payload': element}
+        for element in payload.get('elements') or []
+    )
+    ops.extend(
+        {'op': 'delete', 'element_id': element_id, 'payload': None}
+        for element_id in payload.get('deleted') or []
+    )
+    if payload.get('appState') is not None:
+        ops.append({'op': 'app_state', 'element_id': None, 'payload': payload['appState']})
+
+    await db_service.patch_canvas(id, ops, payload.get('thumbnail'))
+    return {"id": id }
+
 @router.post("/{id}/rename")
 async def rename_canvas(id: str, request: Request):
     data = await request.json()
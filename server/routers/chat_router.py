@@ -1,19 +1,21 @@
 #server/routers/chat_router.py
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, Request
 from services.chat_service import handle_chat
 from services.magic_service import handle_magic
-from services.stream_service import get_stream_task
-from typing import Dict
+from services.stream_service import cancel_stream_task
+from typing import Any, Dict, Optional
+from routers.auth_router import get_optional_user
 
 router = APIRouter(prefix="/api")
 
 @router.post("/chat")
-async def chat(request: Request):
+async def chat(request: Request, current_user: Optional[Dict[str, Any]] = Depends(get_optional_user)):
     """
     Endpoint to handle chat requests.
 
     Receives a JSON payload from the client, passes it to the chat handler,
-    and returns a success status.
+    and returns a success status. The logged-in user (bearer token, optional)
+    is used by the tool confirmation policy.
 
     Request body:
         JSON object containing chat data.
@@ -22,7 +24,7 @@ async def chat(request: Request):
         {"status": "done"}
     """
     data = await request.json()
-    await handle_chat(data)
+    await handle_chat(data, user_id=current_user['id'] if current_user else None)
     return {"status": "done"}
 
 @router.post("/cancel/{session_id}")
@@ -39,9 +41,7 @@ async def cancel_chat(session_id: str):
         {"status": "cancelled"} if the task was cancelled.
         {"status": "not_found_or_done"} if no such task exists or it is already done.
     """
-    task = get_stream_task(session_id)
-    if task and not task.done():
-        task.cancel()
+    if await cancel_stream_task(session_id):
         return {"status": "cancelled"}
     return {"status": "not_found_or_done"}
 
@@ -77,8 +77,6 @@ async def cancel_magic(session_id: str) -> Dict[str, str]:
         {"status": "cancelled"} if the task was cancelled.
         {"status": "not_found_or_done"} if no such task exists or it is already done.
     """
-    task = get_stream_task(session_id)
-    if task and not task.done():
-        task.cancel()
+    if await cancel_stream_task(session_id):
         return {"status": "cancelled"}
     return {"status": "not_found_or_done"}
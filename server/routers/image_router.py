@@ -1,13 +1,16 @@
-from fastapi.responses import FileResponse
 from fastapi.concurrency import run_in_threadpool
 from common import DEFAULT_PORT
 from tools.utils.image_canvas_utils import generate_file_id
 from services.config_service import FILES_DIR
+from services.asset_store import asset_store
+from services.derivative_service import derivative_service, snap_width
+from utils.http_cache import cached_file_response
 
 from PIL import Image
 from io import BytesIO
 import os
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Query, Request
+from typing import Optional
 import httpx
 import aiofiles
 from mimetypes import guess_type
@@ -87,6 +90,9 @@ async def upload_image(file: UploadFile = File(...), max_size_mb: float = 3.0):
             # img.save(file_path, format=save_format)
             await run_in_threadpool(img.save, file_path, format=save_format)
 
+    # 记录到内容寻址存储，相同内容的上传共享同一个 blob
+    await asset_store.ingest(file_path)
+
     # 返回文件信息
     print('🦄upload_image file_path', file_path)
     return {
@@ -146,12 +152,24 @@ def compress_image(img: Image.Image, max_size_mb: float) -> bytes:
 
 # 文件下载接口
 @router.get("/file/{file_id}")
-async def get_file(file_id: str):
-    file_path = os.path.join(FILES_DIR, f'{file_id}')
+async def get_file(request: Request, file_id: str, w: Optional[int] = Query(None, gt=0)):
+    file_path = await asset_store.resolve_path(file_id)
     print('🦄get_file file_path', file_path)
-    if not os.path.exists(file_path):
+    if file_path is None:
         raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(file_path)
+    # 已入库的文件内容不会再变：用内容哈希做强 ETag，并允许浏览器永久缓存
+    blob = await asset_store.lookup(file_id)
+    sha256 = blob['sha256'] if blob else None
+    # ?w= 返回按需生成并缓存的 WebP 缩略图/预览
+    if w and derivative_service.supports(file_path):
+        derivative_path = await derivative_service.get(file_path, w, sha256)
+        return cached_file_response(
+            request, derivative_path,
+            etag=f"{sha256}-w{snap_width(w)}" if sha256 else None,
+            immutable=sha256 is not None,
+            media_type='image/webp',
+        )
+    return cached_file_response(request, file_path, etag=sha256, immutable=sha256 is not None)
 
 
 @router.post("/comfyui/object_info")
@@ -11,6 +11,15 @@ from utils.http_client import HttpClient
 from models.config_model import ModelInfo
 from typing import List
 from services.tool_service import TOOL_MAPPING
+from services.langgraph_service.swarm_cache import swarm_cache
+from services.image_processing_service import image_processing_service
+from services.derivative_service import derivative_service
+from utils.llm_client_registry import llm_client_registry
+from services.chat_history_service import chat_history_service
+from services.message_journal import message_journal
+from services.task_tracker import task_tracker
+from services.generation_job_service import generation_job_service
+from services.generation_scheduler import generation_scheduler
 
 router = APIRouter(prefix="/api")
 
@@ -137,4 +146,20 @@ async def list_chat_sessions():
 
 @router.get("/chat_session/{session_id}")
 async def get_chat_session(session_id: str):
-    return await db_service.get_chat_history(session_id)
+    return await chat_history_service.load(session_id)
+
+
+@router.get("/metrics")
+async def get_metrics():
+    """Runtime counters of the in-process caches and worker pools"""
+    return {
+        'swarm_cache': swarm_cache.stats(),
+        'image_processing': image_processing_service.stats(),
+        'derivatives': derivative_service.stats(),
+        'llm_clients': llm_client_registry.stats(),
+        'chat_history': chat_history_service.stats(),
+        'message_journal': message_journal.stats(),
+        'task_tracker': task_tracker.stats(),
+        'generation_jobs': generation_job_service.stats(),
+        'generation_scheduler': generation_scheduler.stats(),
+    }
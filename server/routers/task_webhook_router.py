@@ -0,0 +1,31 @@
+import hmac
+from typing import Any, Dict
+from fastapi import APIRouter, HTTPException, Request
+from services.task_tracker import task_tracker, TASK_WEBHOOK_SECRET
+from services.stream_service import broadcast_to_workers, register_stream_control_handler
+
+router = APIRouter(prefix="/api/webhooks")
+
+
+async def _webhook_from_peer(message: Dict[str, Any]) -> None:
+    """其他 worker 收到、但在该 worker 中没有等待者的 webhook"""
+    task_tracker.handle_webhook(message['provider'], message['payload'])
+
+
+register_stream_control_handler('task_webhook', _webhook_from_peer)
+
+
+@router.post("/{provider}")
+async def handle_task_webhook(provider: str, token: str, request: Request):
+    """接收 provider 推送的任务结果，直接结束对应任务的轮询"""
+    if not TASK_WEBHOOK_SECRET or not hmac.compare_digest(token, TASK_WEBHOOK_SECRET):
+        raise HTTPException(status_code=403, detail="Invalid webhook token")
+
+    payload: Dict[str, Any] = await request.json()
+    matched = task_tracker.handle_webhook(provider, payload)
+    forwarded = False
+    if not matched:
+        # 等待该任务的可能是其他 worker：通过消息队列转发
+        forwarded = await broadcast_to_workers({'type': 'task_webhook', 'provider': provider, 'payload': payload})
+    # 未匹配的任务（如已超时或已被轮询结束）同样返回 200，避免 provider 重复推送
+    return {"status": "ok", "matched": matched, "forwarded": forwarded}
@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import Dict, Any
 from services.websocket_service import send_to_websocket
 from services.tool_confirmation_manager import tool_confirmation_manager
+from services.stream_service import forward_to_stream_worker, register_stream_control_handler
 
 router = APIRouter(prefix="/api")
 
@@ -11,35 +12,47 @@ class ToolConfirmationRequest(BaseModel):
     tool_call_id: str
     confirmed: bool
 
+async def _apply_confirmation(session_id: str, tool_call_id: str, confirmed: bool) -> bool:
+    """在本 worker 中确认或取消等待中的工具调用，并通知前端"""
+    if confirmed:
+        success = tool_confirmation_manager.confirm_tool(tool_call_id)
+    else:
+        success = tool_confirmation_manager.cancel_confirmation(tool_call_id)
+    if success:
+        await send_to_websocket(session_id, {
+            'type': 'tool_call_confirmed' if confirmed else 'tool_call_cancelled',
+            'id': tool_call_id
+        })
+    return success
+
+
+async def _confirmation_from_peer(message: Dict[str, Any]) -> None:
+    """其他 worker 转发过来的确认结果（工具调用在本 worker 中等待）"""
+    await _apply_confirmation(message['session_id'], message['tool_call_id'], message['confirmed'])
+
+
+register_stream_control_handler('tool_confirmation', _confirmation_from_peer)
+
+
 @router.post("/tool_confirmation")
 async def handle_tool_confirmation(request: ToolConfirmationRequest):
     """处理工具调用确认"""
     try:
-        if request.confirmed:
-            # 确认工具调用
-            success = tool_confirmation_manager.confirm_tool(
-                request.tool_call_id)
-            if success:
-                await send_to_websocket(request.session_id, {
-                    'type': 'tool_call_confirmed',
-                    'id': request.tool_call_id
-                })
-            else:
-                raise HTTPException(
-                    status_code=404, detail="Tool call not found or already processed")
-        else:
-            # 取消工具调用
-            success = tool_confirmation_manager.cancel_confirmation(
-                request.tool_call_id)
-            if success:
-                await send_to_websocket(request.session_id, {
-                    'type': 'tool_call_cancelled',
-                    'id': request.tool_call_id
-                })
-            else:
-                raise HTTPException(
-                    status_code=404, detail="Tool call not found or already processed")
+        success = await _apply_confirmation(
+            request.session_id, request.tool_call_id, request.confirmed)
+        if not success:
+            # 工具调用可能在运行该会话的其他 worker 中等待
+            success = await forward_to_stream_worker(request.session_id, {
+                'type': 'tool_confirmation',
+                'tool_call_id': request.tool_call_id,
+                'confirmed': request.confirmed,
+            })
+        if not success:
+            raise HTTPException(
+                status_code=404, detail="Tool call not found or already processed")
 
         return {"status": "success"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
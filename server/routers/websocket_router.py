@@ -1,5 +1,8 @@
 # routers/websocket_router.py
-from services.websocket_state import sio, add_connection, remove_connection
+from services.websocket_state import sio, add_connection, remove_connection, session_room, canvas_room
+from services.chat_history_service import chat_history_service
+from services.langgraph_service.StreamProcessor import active_stream_processors
+from services.stream_service import forward_to_stream_worker, register_stream_control_handler
 
 @sio.event
 async def connect(sid, environ, auth):
@@ -18,3 +21,53 @@ async def disconnect(sid):
 @sio.event
 async def ping(sid, data):
     await sio.emit('pong', data, room=sid)
+
+@sio.event
+async def join_session(sid, data):
+    """Subscribe a client to the session and canvas it is viewing, leaving the previous ones"""
+    data = data or {}
+    rooms = {session_room(data['session_id'])} if data.get('session_id') else set()
+    if data.get('canvas_id'):
+        rooms.add(canvas_room(data['canvas_id']))
+
+    for room in sio.rooms(sid):
+        if room.startswith(('session:', 'canvas:')) and room not in rooms:
+            await sio.leave_room(sid, room)
+    for room in rooms:
+        await sio.enter_room(sid, room)
+    return {'rooms': sorted(rooms)}
+
+async def _message_snapshot(session_id):
+    processor = active_stream_processors.get(session_id)
+    if processor:
+        return processor.snapshot()
+
+    messages = await chat_history_service.load(session_id)
+    return {
+        'type': 'all_messages',
+        'session_id': session_id,
+        'run_id': None,
+        'seq': 0,
+        'messages': messages,
+    }
+
+@sio.event
+async def resync_messages(sid, data):
+    """Return the full message list for a session when the client missed a messages_delta"""
+    session_id = (data or {}).get('session_id')
+    if not session_id:
+        return {'type': 'error', 'error': 'session_id is required'}
+
+    if session_id not in active_stream_processors and await forward_to_stream_worker(
+            session_id, {'type': 'resync', 'sid': sid}):
+        # The run lives on another worker: it emits the snapshot to this client directly
+        return {'type': 'resync_forwarded', 'session_id': session_id}
+
+    return await _message_snapshot(session_id)
+
+async def _resync_for_peer(message):
+    """Answer a resync forwarded by the worker the client is connected to"""
+    snapshot = await _message_snapshot(message['session_id'])
+    await sio.emit('session_update', snapshot, room=message['sid'])
+
+register_stream_control_handler('resync', _resync_for_peer)
@@ -3,10 +3,12 @@ import traceback
 import platform
 import subprocess
 import mimetypes
-from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import APIRouter, Request, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from services.config_service import USER_DATA_DIR
-from typing import List, Dict, Any
+from services.derivative_service import derivative_service
+from utils.http_cache import cached_file_response
+from typing import List, Dict, Any, Optional
 import io
 
 router = APIRouter(prefix="/api")
@@ -216,7 +218,8 @@ async def browse_filesystem(path: str = ""):
                         "mtime": mtime,
                         "is_directory": is_dir,
                         "is_media": is_media,
-                        "has_thumbnail": is_media  # 可以生成缩略图
+                        # serve_file?w= 可生成缩略图
+                        "has_thumbnail": file_type == "image" and derivative_service.supports(item_path)
                     }
                     
                     items.append(item_info)
@@ -353,12 +356,13 @@ def get_file_type(file_path: str) -> str:
         return "file"
 
 @router.get("/serve_file")
-async def serve_file(file_path: str):
+async def serve_file(request: Request, file_path: str, w: Optional[int] = Query(None, gt=0)):
     """
     提供文件内容服务，用于在浏览器中预览图片和视频
     
     Args:
         file_path: 文件路径
+        w: 可选，返回最大宽度为 w 的 WebP 缩略图
     
     Returns:
         文件内容
@@ -375,17 +379,25 @@ async def serve_file(file_path: str):
         if file_type not in ["image", "video"]:
             raise HTTPException(status_code=400, detail="File type not supported for preview")
         
+        # 工作区文件可能被原地修改：允许缓存，但每次用 ETag 重新验证
+        if w and derivative_service.supports(file_path):
+            derivative_path = await derivative_service.get(file_path, w)
+            return cached_file_response(request, derivative_path, media_type='image/webp')
+
         # 获取MIME类型
         mime_type, _ = mimetypes.guess_type(file_path)
         if not mime_type:
             mime_type = "application/octet-stream"
         
-        return FileResponse(
+        return cached_file_response(
+            request,
             file_path,
             media_type=mime_type,
             filename=os.path.basename(file_path)
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,354 @@
+import os
+import time
+import asyncio
+import shutil
+import hashlib
+import traceback
+from typing import Dict, Optional, TypedDict
+
+import aiosqlite
+
+from services.config_service import FILES_DIR
+
+# Blob disimpan di FILES_DIR/blobs/<2 hex>/<2 hex>/<sha256><ext>
+BLOBS_DIR = os.path.join(FILES_DIR, "blobs")
+# Nama aset (id /api/file/<nama>) disimpan di FILES_DIR/names/<2 hex>/<2 hex>/<nama>
+NAMES_DIR = os.path.join(FILES_DIR, "names")
+ASSET_INDEX_PATH = os.environ.get("ASSET_INDEX_PATH", os.path.join(FILES_DIR, "assets.sqlite3"))
+HASH_CHUNK_SIZE = 1024 * 1024
+# Umur minimum (detik) file lama sebelum diindeks oleh migrasi saat startup
+LEGACY_MIGRATION_MIN_AGE = 60
+# Interval (detik) pembersihan nama yang dihapus dan blob yatim selama server berjalan
+ASSET_GC_INTERVAL = float(os.environ.get("ASSET_GC_INTERVAL", 3600))
+# Versi tata letak indeks (PRAGMA user_version). Versi 0 memindahkan file ke blob tanpa
+# menyisakan nama; versi 1 menyimpan nama sebagai hardlink datar di FILES_DIR; versi 2
+# menyimpan nama sebagai hardlink di NAMES_DIR yang di-shard.
+INDEX_LAYOUT_VERSION = 2
+
+# File di FILES_DIR yang bukan aset (indeks, file sementara unduhan)
+_SKIPPED_SUFFIXES = ('.part', '.download', '.link', '.sqlite3', '.sqlite3-wal', '.sqlite3-shm', '.sqlite3-journal')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS asset_blobs (
+    sha256 TEXT PRIMARY KEY,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE TABLE IF NOT EXISTS asset_names (
+    name TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL REFERENCES asset_blobs(sha256),
+    created_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+CREATE INDEX IF NOT EXISTS idx_asset_names_sha256 ON asset_names(sha256);
+"""
+
+
+class AssetBlob(TypedDict):
+    sha256: str
+    ext: str
+    size: int
+    path: str
+
+
+def blob_path(sha256: str, ext: str) -> str:
+    """Path blob untuk hash tertentu; dua level shard agar satu direktori tidak berisi ratusan ribu file"""
+    return os.path.join(BLOBS_DIR, sha256[:2], sha256[2:4], f"{sha256}{ext}")
+
+
+def name_path(name: str) -> str:
+    """Path nama aset; di-shard berdasarkan hash nama karena nama sering berawalan sama (im_, vi_)"""
+    digest = hashlib.sha256(name.encode()).hexdigest()
+    return os.path.join(NAMES_DIR, digest[:2], digest[2:4], name)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _place(source: str, target: str) -> None:
+    """Buat target sebagai hardlink ke source, atau salinan jika hardlink tidak didukung"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if not _link(source, target):
+        shutil.copyfile(source, target)
+
+
+def _remove_if_exists(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _link(source: str, target: str) -> bool:
+    """
+    Jadikan target hardlink ke source (menimpa target secara atomik).
+    Mengembalikan False jika filesystem tidak mendukung hardlink.
+    """
+    temp = f"{target}.link"
+    try:
+        os.link(source, temp)
+    except FileExistsError:
+        os.remove(temp)
+        os.link(source, temp)
+    except OSError:
+        return False
+    os.replace(temp, target)
+    return True
+
+
+class AssetStore:
+    """
+    Penyimpanan aset berbasis konten (content-addressed) untuk FILES_DIR.
+
+    Penulis file tetap menulis ke FILES_DIR/<nama> seperti sebelumnya, lalu memanggil
+    ingest(): file di-hash, dicatat di indeks dan dipindahkan ke NAMES_DIR yang di-shard,
+    sehingga tidak ada satu direktori pun yang berisi ratusan ribu entri. Blob dan nama
+    berbagi inode (hardlink), jadi nama tetap terlihat di bawah FILES_DIR (My Assets) dan
+    isi yang sama hanya disimpan sekali. Di filesystem tanpa hardlink, nama dan blob berupa
+    salinan. File datar di FILES_DIR hanya dibaca sebagai fallback lama sampai diindeks.
+
+    Menghapus file nama (misalnya lewat My Assets) melepas namanya: collect_garbage(), yang
+    dijalankan berkala, membuang nama yang file-nya sudah tidak ada, lalu blob yang tidak
+    lagi ditunjuk nama mana pun.
+    """
+
+    def __init__(self, index_path: str = ASSET_INDEX_PATH):
+        self.index_path = index_path
+        self._db: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+        self._migration: Optional[asyncio.Task[None]] = None
+        self._gc: Optional[asyncio.Task[None]] = None
+
+    async def initialize(self) -> None:
+        if self._db is not None:
+            return
+        os.makedirs(BLOBS_DIR, exist_ok=True)
+        os.makedirs(NAMES_DIR, exist_ok=True)
+        self._db = await aiosqlite.connect(self.index_path)
+        self._db.row_factory = aiosqlite.Row
+        await self._db.execute("PRAGMA journal_mode=WAL")
+        await self._db.executescript(_SCHEMA)
+        await self._db.commit()
+
+    async def start(self) -> None:
+        """Buka indeks, indeks file lama di FILES_DIR di latar belakang dan jadwalkan GC berkala"""
+        await self.initialize()
+        self._migration = asyncio.create_task(self._migrate_legacy_files())
+        self._gc = asyncio.create_task(self._collect_garbage_periodically())
+
+    async def close(self) -> None:
+        if self._migration:
+            self._migration.cancel()
+            self._migration = None
+        if self._gc:
+            self._gc.cancel()
+            self._gc = None
+        if self._db is not None:
+            await self._db.close()
+            self._db = None
+
+    async def _conn(self) -> aiosqlite.Connection:
+        if self._db is None:
+            await self.initialize()
+        assert self._db is not None
+        return self._db
+
+    async def ingest(self, file_path: str) -> AssetBlob:
+        """
+        Catat file yang baru ditulis di FILES_DIR di penyimpanan blob.
+
+        Nama file (basename) menjadi id lama yang dipakai di URL /api/file/<nama>; file-nya
+        dipindahkan ke name_path(nama) sebagai hardlink ke blob.
+        """
+        name = os.path.basename(file_path)
+        ext = os.path.splitext(name)[1].lower()
+        sha256 = await asyncio.to_thread(_hash_file, file_path)
+        size = os.path.getsize(file_path)
+        db = await self._conn()
+
+        deduplicated = False
+        async with self._lock:
+            async with db.execute("SELECT ext FROM asset_blobs WHERE sha256 = ?", (sha256,)) as cursor:
+                existing = await cursor.fetchone()
+
+            if existing is not None and os.path.exists(blob_path(sha256, existing['ext'])):
+                # Isi yang sama sudah tersimpan: nama menjadi hardlink ke blob yang ada
+                ext = existing['ext']
+                target = blob_path(sha256, ext)
+                deduplicated = not os.path.samefile(target, file_path)
+            else:
+                target = blob_path(sha256, ext)
+                await asyncio.to_thread(_place, file_path, target)
+            named_path = name_path(name)
+            if not (os.path.exists(named_path) and os.path.samefile(target, named_path)):
+                await asyncio.to_thread(_place, target, named_path)
+
+            await db.execute("""
+                INSERT INTO asset_blobs (sha256, ext, size) VALUES (?, ?, ?)
+                ON CONFLICT(sha256) DO UPDATE SET ext = excluded.ext
+            """, (sha256, ext, size))
+            # Nama yang sama bisa ditulis ulang dengan isi berbeda
+            await db.execute("""
+                INSERT INTO asset_names (name, sha256) VALUES (?, ?)
+                ON CONFLICT(name) DO UPDATE SET sha256 = excluded.sha256
+            """, (name, sha256))
+            await db.commit()
+            # Nama sudah ada di NAMES_DIR: file datar tidak lagi diperlukan
+            if os.path.abspath(file_path) != os.path.abspath(named_path):
+                await asyncio.to_thread(_remove_if_exists, file_path)
+
+        if deduplicated:
+            print(f"🗃️ Deduplicated {name} -> {sha256[:12]}")
+        return {'sha256': sha256, 'ext': ext, 'size': size, 'path': blob_path(sha256, ext)}
+
+    async def lookup(self, name: str) -> Optional[AssetBlob]:
+        """Blob yang ditunjuk oleh nama lama, atau None jika nama belum terindeks"""
+        db = await self._conn()
+        async with db.execute("""
+            SELECT b.sha256, b.ext, b.size FROM asset_names n
+            JOIN asset_blobs b ON b.sha256 = n.sha256
+            WHERE n.name = ?
+        """, (name,)) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        return {'sha256': row['sha256'], 'ext': row['ext'], 'size': row['size'],
+                'path': blob_path(row['sha256'], row['ext'])}
+
+    async def resolve_path(self, name: str) -> Optional[str]:
+        """
+        Path file di disk untuk nama /api/file/<nama>.
+
+        File nama di NAMES_DIR dipakai lebih dulu, lalu file datar lama di FILES_DIR (belum
+        diindeks, atau sedang di-ingest); blob hanya dipakai jika namanya sudah dihapus tetapi
+        belum dibersihkan oleh collect_garbage().
+        """
+        # Tolak nama yang keluar dari FILES_DIR
+        if os.path.basename(name) != name:
+            return None
+        for path in (name_path(name), os.path.join(FILES_DIR, name)):
+            if os.path.isfile(path):
+                return path
+        blob = await self.lookup(name)
+        if blob is not None and os.path.exists(blob['path']):
+            return blob['path']
+        return None
+
+    async def collect_garbage(self) -> int:
+        """
+        Lepaskan nama yang file-nya sudah dihapus (di NAMES_DIR maupun FILES_DIR), lalu hapus blob yang tidak
+        lagi ditunjuk nama mana pun. Mengembalikan jumlah blob yang dihapus.
+        """
+        db = await self._conn()
+        async with self._lock:
+            async with db.execute("SELECT name FROM asset_names") as cursor:
+                names = [row['name'] for row in await cursor.fetchall()]
+            removed = await asyncio.to_thread(lambda: [
+                name for name in names
+                if not os.path.exists(name_path(name)) and not os.path.exists(os.path.join(FILES_DIR, name))
+            ])
+            await db.executemany("DELETE FROM asset_names WHERE name = ?", [(name,) for name in removed])
+
+            async with db.execute("""
+                SELECT sha256, ext FROM asset_blobs
+                WHERE NOT EXISTS (SELECT 1 FROM asset_names n WHERE n.sha256 = asset_blobs.sha256)
+            """) as cursor:
+                rows = await cursor.fetchall()
+            for row in rows:
+                path = blob_path(row['sha256'], row['ext'])
+                if os.path.exists(path):
+                    os.remove(path)
+            await db.executemany("DELETE FROM asset_blobs WHERE sha256 = ?", [(row['sha256'],) for row in rows])
+            await db.commit()
+        if rows:
+            print(f"🗃️ Asset GC released {len(removed)} deleted names and removed {len(rows)} unreferenced blobs")
+        return len(rows)
+
+    async def stats(self) -> Dict[str, int]:
+        db = await self._conn()
+        async with db.execute("""
+            SELECT (SELECT COUNT(*) FROM asset_names) AS names,
+                   COUNT(*) AS blobs,
+                   COALESCE(SUM(size), 0) AS bytes
+            FROM asset_blobs
+        """) as cursor:
+            row = await cursor.fetchone()
+        return {'names': row['names'], 'blobs': row['blobs'], 'bytes': row['bytes']}
+
+    async def _collect_garbage_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(ASSET_GC_INTERVAL)
+            try:
+                await self.collect_garbage()
+            except Exception as e:
+                print(f"Asset GC error: {e}")
+                traceback.print_exc()
+
+    async def _restore_names(self) -> None:
+        """
+        Tata letak versi 0 memindahkan file ke blob: kembalikan namanya ke NAMES_DIR.
+        Nama datar versi 1 dipindahkan oleh pemindaian di _migrate_legacy_files().
+        """
+        db = await self._conn()
+        async with db.execute("PRAGMA user_version") as cursor:
+            row = await cursor.fetchone()
+        if row[0] >= INDEX_LAYOUT_VERSION:
+            return
+        async with db.execute("""
+            SELECT n.name, b.sha256, b.ext FROM asset_names n
+            JOIN asset_blobs b ON b.sha256 = n.sha256
+        """) as cursor:
+            rows = await cursor.fetchall()
+        restored = 0
+        for row in rows:
+            named_path = name_path(row['name'])
+            source = blob_path(row['sha256'], row['ext'])
+            if os.path.exists(named_path) or os.path.exists(os.path.join(FILES_DIR, row['name'])):
+                continue
+            if not os.path.exists(source):
+                continue
+            await asyncio.to_thread(_place, source, named_path)
+            restored += 1
+        await db.execute(f"PRAGMA user_version = {INDEX_LAYOUT_VERSION}")
+        await db.commit()
+        if restored:
+            print(f"🗃️ Restored {restored} asset names in {NAMES_DIR}")
+
+    async def _migrate_legacy_files(self) -> None:
+        """
+        Pindahkan file datar di FILES_DIR (belum diindeks, atau nama datar tata letak versi 1)
+        ke NAMES_DIR, lalu bersihkan nama yang dihapus dan blob yatim
+        """
+        try:
+            await self._restore_names()
+            ingested = 0
+            # File yang baru saja ditulis akan di-ingest oleh penulisnya sendiri
+            cutoff = time.time() - LEGACY_MIGRATION_MIN_AGE
+            for entry in await asyncio.to_thread(lambda: list(os.scandir(FILES_DIR))):
+                if not entry.is_file() or entry.name.startswith('.') or entry.name.endswith(_SKIPPED_SUFFIXES):
+                    continue
+                if entry.stat().st_mtime > cutoff:
+                    continue
+                try:
+                    await self.ingest(entry.path)
+                    ingested += 1
+                except FileNotFoundError:
+                    # File dihapus saat migrasi berjalan
+                    continue
+            if ingested:
+                print(f"🗃️ Moved {ingested} flat files into the asset store")
+            await self.collect_garbage()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Asset store migration error: {e}")
+            traceback.print_exc()
+
+
+# --- Singleton Instance ---
+asset_store = AssetStore()
@@ -0,0 +1,190 @@
+# services/chat_history_service.py
+
+import os
+import json
+import asyncio
+import traceback
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services.message_journal import message_journal
+from services.websocket_state import MESSAGE_QUEUE_URL
+
+# Approximate model input budget for the history window
+CHAT_HISTORY_TOKEN_BUDGET = int(os.environ.get("CHAT_HISTORY_TOKEN_BUDGET", 24000))
+# When older turns get summarized, the window is cut down to this share of the budget,
+# so the next few turns fit without summarizing again
+CHAT_HISTORY_TARGET_RATIO = 0.75
+# Number of sessions whose history is kept in memory
+CHAT_HISTORY_CACHE_SIZE = int(os.environ.get("CHAT_HISTORY_CACHE_SIZE", 64))
+# Check cached histories against the stored message count before use. Needed when several
+# workers (sharing MESSAGE_QUEUE_URL) can append to the same session.
+CHAT_HISTORY_VERIFY_CACHE = os.environ.get(
+    "CHAT_HISTORY_VERIFY_CACHE", "1" if MESSAGE_QUEUE_URL else "0") == "1"
+# Rough token cost of an attached image; base64 data URLs would otherwise dominate the estimate
+IMAGE_TOKEN_ESTIMATE = 1000
+
+# Summarizer: (previous summary or None, messages to fold in) -> new summary
+Summarizer = Callable[[Optional[str], List[Dict[str, Any]]], Awaitable[str]]
+
+
+@dataclass
+class HistoryWindow:
+    """Messages to feed the model for one turn"""
+    # Summary message (if any) followed by the most recent messages
+    messages: List[Dict[str, Any]]
+    # Older messages left out of the window, still shown to the client
+    omitted: List[Dict[str, Any]]
+    # Number of leading entries in `messages` that are not part of the stored history
+    injected: int
+
+
+@dataclass
+class _SessionHistory:
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    summary: Optional[str] = None
+    # messages[:summarized_upto] are folded into summary
+    summarized_upto: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+def estimate_tokens(message: Dict[str, Any]) -> int:
+    """Cheap token estimate (~4 characters per token), without a tokenizer per provider"""
+    content = message.get('content')
+    chars = 0
+    images = 0
+    if isinstance(content, str):
+        chars += len(content)
+    elif isinstance(content, list):
+        for part in content:
+            if part.get('type') == 'text':
+                chars += len(part.get('text', ''))
+            else:
+                images += 1
+    for tool_call in message.get('tool_calls') or []:
+        chars += len(json.dumps(tool_call.get('function', tool_call), ensure_ascii=False))
+    return chars // 4 + images * IMAGE_TOKEN_ESTIMATE + 4
+
+
+class ChatHistoryService:
+    """
+    Server-owned chat history.
+
+    The history of active sessions is cached in memory and kept up to date as messages
+    are saved, so a turn does not need the client to send the whole conversation. Each
+    turn feeds the model a token-budgeted window of recent messages; turns that fall out
+    of the window are folded into a rolling summary that is prepended to the window.
+    The cache is per process. With several workers another worker may have appended to
+    a session, so (with CHAT_HISTORY_VERIFY_CACHE) a cached history is only used if its
+    length still matches the stored count, and is reloaded otherwise.
+    """
+
+    def __init__(self, max_sessions: int = CHAT_HISTORY_CACHE_SIZE, token_budget: int = CHAT_HISTORY_TOKEN_BUDGET,
+                 verify_cache: bool = CHAT_HISTORY_VERIFY_CACHE):
+        self.max_sessions = max_sessions
+        self.token_budget = token_budget
+        self.verify_cache = verify_cache
+        self.stale_reloads = 0
+        self._sessions: 'OrderedDict[str, _SessionHistory]' = OrderedDict()
+
+    async def _get(self, session_id: str) -> _SessionHistory:
+        history = self._sessions.get(session_id)
+        if history is not None and self.verify_cache:
+            await self._refresh_if_stale(session_id, history)
+        if history is None:
+            history = _SessionHistory(messages=await message_journal.read_session(session_id))
+            # Another coroutine may have loaded it meanwhile
+            history = self._sessions.setdefault(session_id, history)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return history
+
+    async def _refresh_if_stale(self, session_id: str, history: _SessionHistory) -> None:
+        if await message_journal.count_session(session_id) == len(history.messages):
+            return
+        messages = await message_journal.read_session(session_id)
+        self.stale_reloads += 1
+        # History is append-only: the summary stays valid as long as it covers a prefix
+        if len(messages) < history.summarized_upto:
+            history.summary = None
+            history.summarized_upto = 0
+        history.messages = messages
+
+    async def load(self, session_id: str) -> List[Dict[str, Any]]:
+        """Full stored history of a session"""
+        return list((await self._get(session_id)).messages)
+
+    async def save_message(self, session_id: str, message: Dict[str, Any]) -> None:
+        """Journal a message for a batched write and append it to the cached history"""
+        message_journal.append(session_id, message.get('role', 'user'), json.dumps(message))
+        history = self._sessions.get(session_id)
+        if history is not None:
+            history.messages.append(message)
+
+    def forget(self, session_id: str) -> None:
+        self._sessions.pop(session_id, None)
+
+    async def build_window(self, session_id: str, summarize: Optional[Summarizer] = None) -> HistoryWindow:
+        """
+        Select the most recent messages that fit the token budget.
+
+        Messages that drop out of the window are folded into the rolling summary with
+        `summarize`; without a summarizer, or if it fails, they are simply left out.
+        """
+        history = await self._get(session_id)
+        async with history.lock:
+            messages = history.messages
+            start = self._window_start(messages, self.token_budget)
+
+            if start > history.summarized_upto:
+                # Leave headroom so the summary is not rebuilt on every turn
+                start = max(start, self._window_start(messages, int(self.token_budget * CHAT_HISTORY_TARGET_RATIO)))
+                if summarize is not None:
+                    try:
+                        history.summary = await summarize(history.summary, messages[history.summarized_upto:start])
+                        print(f"📝 Summarized {start - history.summarized_upto} older messages of session {session_id}")
+                    except Exception as e:
+                        print(f"Error summarizing chat history of session {session_id}: {e}")
+                        traceback.print_exc()
+                history.summarized_upto = start
+            else:
+                start = history.summarized_upto
+
+            window = list(messages[start:])
+            injected = 0
+            if history.summary:
+                window.insert(0, {
+                    'role': 'system',
+                    'content': f"Summary of the earlier conversation:\n{history.summary}",
+                })
+                injected = 1
+            return HistoryWindow(messages=window, omitted=list(messages[:start]), injected=injected)
+
+    @staticmethod
+    def _window_start(messages: List[Dict[str, Any]], budget: int) -> int:
+        """Index of the first message of the newest suffix that fits in budget"""
+        total = 0
+        start = len(messages)
+        while start > 0:
+            cost = estimate_tokens(messages[start - 1])
+            if total + cost > budget and start < len(messages):
+                break
+            total += cost
+            start -= 1
+        # Never start on a tool result whose tool call was cut off
+        while start < len(messages) - 1 and messages[start].get('role') == 'tool':
+            start += 1
+        return start
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sessions': len(self._sessions),
+            'max_sessions': self.max_sessions,
+            'token_budget': self.token_budget,
+            'stale_reloads': self.stale_reloads,
+        }
+
+
+chat_history_service = ChatHistoryService()
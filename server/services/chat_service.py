@@ -2,40 +2,48 @@
 
 # Import necessary modules
 import asyncio
-import json
+from functools import partial
 from typing import Dict, Any, List, Optional
 
 # Import service modules
 from models.tool_model import ToolInfoJson
 from services.db_service import db_service
-from services.langgraph_service import langgraph_multi_agent
+from services.chat_history_service import chat_history_service
+from services.message_journal import message_journal
+from services.langgraph_service import langgraph_multi_agent, summarize_chat_history
 from services.websocket_service import send_to_websocket
 from services.stream_service import add_stream_task, remove_stream_task
 from models.config_model import ModelInfo
 
 
-async def handle_chat(data: Dict[str, Any]) -> None:
+async def handle_chat(data: Dict[str, Any], user_id: Optional[int] = None) -> None:
     """
     Handle an incoming chat request.
 
     Workflow:
     - Parse incoming chat data.
     - Optionally inject system prompt.
-    - Save chat session and messages to the database.
+    - Save chat session and the new message to the database.
+    - Build the model input from the server-side history (recent messages within
+      the token budget, older turns folded into a rolling summary).
     - Launch langgraph_agent task to process chat.
     - Manage stream task lifecycle (add, remove).
     - Notify frontend via WebSocket when stream is done.
 
     Args:
         data (dict): Chat request data containing:
-            - messages: list of message dicts
+            - message: the new user message; the rest of the history is loaded on the server
+            - messages: legacy clients send the whole list, only its last message is used
             - session_id: unique session identifier
             - canvas_id: canvas identifier (contextual use)
             - text_model: text model configuration
             - tool_list: list of tool model configurations (images/videos)
+        user_id: authenticated user, matched by the tool confirmation policy
     """
     # Extract fields from incoming data
-    messages: List[Dict[str, Any]] = data.get('messages', [])
+    message: Optional[Dict[str, Any]] = data.get('message')
+    if message is None and data.get('messages'):
+        message = data['messages'][-1]
     session_id: str = data.get('session_id', '')
     canvas_id: str = data.get('canvas_id', '')
     text_model: ModelInfo = data.get('text_model', {})
@@ -46,18 +54,18 @@ async def handle_chat(data: Dict[str, Any]) -> None:
     # TODO: save and fetch system prompt from db or settings config
     system_prompt: Optional[str] = data.get('system_prompt')
 
-    # If there is only one message, create a new chat session
-    if len(messages) == 1:
-        # create new session
-        prompt = messages[0].get('content', '')
-        # TODO: Better way to determin when to create new chat session.
+    # If the session has no stored messages yet, create a new chat session
+    history = await chat_history_service.load(session_id)
+    if len(history) == 0 and message is not None:
+        prompt = message.get('content', '')
         await db_service.create_chat_session(session_id, text_model.get('model'), text_model.get('provider'), canvas_id, (prompt[:200] if isinstance(prompt, str) else ''))
 
-    await db_service.create_message(session_id, messages[-1].get('role', 'user'), json.dumps(messages[-1])) if len(messages) > 0 else None
+    if message is not None:
+        await chat_history_service.save_message(session_id, message)
 
     # Create and start langgraph_agent task for chat processing
-    task = asyncio.create_task(langgraph_multi_agent(
-        messages, canvas_id, session_id, text_model, tool_list, system_prompt))
+    task = asyncio.create_task(_run_agent(
+        canvas_id, session_id, text_model, tool_list, system_prompt, user_id))
 
     # Register the task in stream_tasks (for possible cancellation)
     add_stream_task(session_id, task)
@@ -69,7 +77,25 @@ async def handle_chat(data: Dict[str, Any]) -> None:
     finally:
         # Always remove the task from stream_tasks after completion/cancellation
         remove_stream_task(session_id)
+        # Persist the messages of this turn in one batch
+        await message_journal.flush(session_id)
         # Notify frontend WebSocket that chat processing is done
         await send_to_websocket(session_id, {
             'type': 'done'
         })
+
+
+async def _run_agent(
+    canvas_id: str,
+    session_id: str,
+    text_model: ModelInfo,
+    tool_list: List[ToolInfoJson],
+    system_prompt: Optional[str],
+    user_id: Optional[int] = None,
+) -> None:
+    """Build the history window (summarizing older turns if needed) and run the agents"""
+    window = await chat_history_service.build_window(
+        session_id, partial(summarize_chat_history, text_model))
+    await langgraph_multi_agent(
+        window.messages, canvas_id, session_id, text_model, tool_list, system_prompt,
+        history_prefix=window.omitted, injected=window.injected, user_id=user_id)
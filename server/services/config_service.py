@@ -3,7 +3,7 @@ import os
 import traceback
 import aiofiles
 import toml
-from typing import Dict, TypedDict, Literal, Optional
+from typing import Callable, Dict, List, TypedDict, Literal, Optional
 
 # 定义配置文件的类型结构
 
@@ -93,6 +93,7 @@ VIDEO_FORMATS = (
 class ConfigService:
     def __init__(self):
         self.app_config: AppConfig = copy.deepcopy(DEFAULT_PROVIDERS_CONFIG)
+        self._update_listeners: List[Callable[[], None]] = []
         self.config_file = os.getenv(
             "CONFIG_PATH", os.path.join(USER_DATA_DIR, "config.toml")
         )
@@ -158,6 +159,8 @@ class ConfigService:
             with open(self.config_file, "w") as f:
                 toml.dump(data, f)
             self.app_config = data
+            for listener in self._update_listeners:
+                listener()
 
             return {
                 "status": "success",
@@ -167,6 +170,10 @@ class ConfigService:
             traceback.print_exc()
             return {"status": "error", "message": str(e)}
 
+    def add_update_listener(self, listener: Callable[[], None]) -> None:
+        """注册配置更新后的回调（例如清空依赖配置的缓存）"""
+        self._update_listeners.append(listener)
+
     def exists_config(self) -> bool:
         return os.path.exists(self.config_file)
 
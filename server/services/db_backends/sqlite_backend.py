@@ -0,0 +1,439 @@
+import os
+import json
+import sqlite3
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Sequence, AsyncGenerator, Tuple
+import aiosqlite
+from models.db_model import CanvasOp, CanvasElementGeometry, CANVAS_GEOMETRY_FIELDS, GenerationJob
+from services.config_service import USER_DATA_DIR
+from services.db_service import DatabaseService, DB_POOL_SIZE
+from services.migrations.manager import MigrationManager, CURRENT_VERSION
+from utils.canvas import apply_canvas_ops
+
+logger = logging.getLogger(__name__)
+
+SQLITE_DB_PATH = os.environ.get("SQLITE_DB_PATH", os.path.join(USER_DATA_DIR, "jaaz.db"))
+
+NOW_SQL = "STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+
+def _geometry_json(expr: str) -> str:
+    """Ekspresi SQL yang memproyeksikan elemen JSON ke field geometrinya saja"""
+    fields = ", ".join(f"'{name}', json_extract({expr}, '$.{name}')" for name in CANVAS_GEOMETRY_FIELDS)
+    return f"json_object({fields})"
+
+
+# Operasi patch yang belum dipadatkan untuk canvas c, sebagai satu array JSON
+_PENDING_OPS_SQL = """
+    (SELECT json_group_array(json_object('op', o.op, 'element_id', o.element_id, 'payload', {payload}))
+     FROM (SELECT op, element_id, payload FROM canvas_ops
+           WHERE canvas_id = c.id AND seq > c.ops_seq {op_filter} ORDER BY seq ASC) o)
+"""
+
+_CANVAS_DATA_SQL = f"""
+    SELECT c.data, c.name,
+        {_PENDING_OPS_SQL.format(payload="json(o.payload)", op_filter="")} AS ops,
+        (SELECT json_group_array(json_object(
+                'id', s.id, 'title', s.title, 'model', s.model, 'provider', s.provider,
+                'created_at', s.created_at, 'updated_at', s.updated_at))
+         FROM (SELECT * FROM chat_sessions WHERE canvas_id = c.id ORDER BY updated_at DESC) s) AS sessions
+    FROM canvases c
+    WHERE c.id = ?
+"""
+
+_CANVAS_ELEMENTS_SQL = f"""
+    SELECT
+        (SELECT json_group_array({_geometry_json("e.value")}) FROM json_each(c.data, '$.elements') e) AS elements,
+        {_PENDING_OPS_SQL.format(
+            payload=f"CASE WHEN o.payload IS NULL THEN NULL ELSE {_geometry_json('o.payload')} END",
+            op_filter="AND op IN ('append', 'update', 'delete')",
+        )} AS ops
+    FROM canvases c
+    WHERE c.id = ?
+"""
+
+
+def _loads(value: Optional[str]) -> Any:
+    """Kolom JSON disimpan sebagai TEXT di SQLite"""
+    if value is None or value == '':
+        return None
+    try:
+        return json.loads(value)
+    except (TypeError, json.JSONDecodeError):
+        return value
+
+
+class SQLiteDatabaseService(DatabaseService):
+    """
+    Layanan database lokal berbasis SQLite (aiosqlite), pengganti Supabase untuk pengembangan/self-hosted.
+    Menggunakan pool koneksi terbatas (DB_POOL_SIZE) dan mode WAL agar pembaca tidak memblokir penulis.
+    """
+
+    def __init__(self, db_path: str = SQLITE_DB_PATH):
+        super().__init__()
+        self.db_path = db_path
+        self._pool: Optional[asyncio.Queue[aiosqlite.Connection]] = None
+        self._connections: List[aiosqlite.Connection] = []
+        self._init_lock = asyncio.Lock()
+
+    async def initialize(self) -> None:
+        if self._pool is not None:
+            return
+
+        async with self._init_lock:
+            if self._pool is not None:
+                return
+
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            await asyncio.to_thread(self._migrate)
+
+            pool: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+            for _ in range(DB_POOL_SIZE):
+                conn = await aiosqlite.connect(self.db_path)
+                conn.row_factory = aiosqlite.Row
+                await conn.execute("PRAGMA journal_mode=WAL")
+                await conn.execute("PRAGMA busy_timeout=5000")
+                self._connections.append(conn)
+                pool.put_nowait(conn)
+            self._pool = pool
+            logger.info(f"SQLite database initialized at {self.db_path} (pool size {DB_POOL_SIZE}).")
+
+    def _migrate(self) -> None:
+        """Jalankan migrasi skema (sinkron, di thread terpisah saat startup)"""
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS db_version (version INTEGER PRIMARY KEY)")
+            row = conn.execute("SELECT version FROM db_version").fetchone()
+            if row is None:
+                conn.execute("INSERT INTO db_version (version) VALUES (0)")
+                current_version = 0
+            else:
+                current_version = row[0]
+
+            if current_version < CURRENT_VERSION:
+                MigrationManager().migrate(conn, current_version, CURRENT_VERSION)
+            conn.commit()
+
+    async def close(self) -> None:
+        for conn in self._connections:
+            await conn.close()
+        self._connections.clear()
+        self._pool = None
+
+    @asynccontextmanager
+    async def _connection(self) -> AsyncGenerator[aiosqlite.Connection, None]:
+        await self.initialize()
+        assert self._pool is not None
+        conn = await self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put_nowait(conn)
+
+    async def _fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        async with self._connection() as conn:
+            async with conn.execute(sql, params) as cursor:
+                rows = await cursor.fetchall()
+        return [dict(row) for row in rows]
+
+    async def _fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+        async with self._connection() as conn:
+            async with conn.execute(sql, params) as cursor:
+                row = await cursor.fetchone()
+        return dict(row) if row else None
+
+    async def _execute(self, sql: str, params: Sequence[Any] = ()) -> Optional[int]:
+        async with self._connection() as conn:
+            try:
+                cursor = await conn.execute(sql, params)
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+            return cursor.lastrowid
+
+    def _row_to_op(self, row: Dict[str, Any]) -> CanvasOp:
+        return {
+            'op': row['op'],
+            'element_id': row.get('element_id'),
+            'payload': _loads(row.get('payload')),
+        }
+
+    # --- Metode untuk User & Autentikasi ---
+    async def create_user(self, username: str, email: str, hashed_password: str, role: str = 'user') -> int:
+        user_id = await self._execute(
+            "INSERT INTO users (username, email, hashed_password, role) VALUES (?, ?, ?, ?)",
+            (username, email, hashed_password, role)
+        )
+        if user_id is None:
+            raise Exception("User creation failed, no data returned.")
+        return user_id
+
+    async def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        return await self._fetchone("SELECT * FROM users WHERE id = ?", (user_id,))
+
+    async def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
+        return await self._fetchone("SELECT * FROM users WHERE username = ?", (username,))
+
+    async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        return await self._fetchone("SELECT * FROM users WHERE email = ?", (email,))
+
+    async def get_user_api_keys(self, user_id: int) -> Dict[str, Any]:
+        row = await self._fetchone("SELECT providers_config FROM user_api_keys WHERE user_id = ?", (user_id,))
+        return (_loads(row['providers_config']) or {}) if row else {}
+
+    async def update_user_api_keys(self, user_id: int, configs: Dict[str, Any]):
+        await self._execute(f"""
+            INSERT INTO user_api_keys (user_id, providers_config) VALUES (?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET providers_config = excluded.providers_config, updated_at = {NOW_SQL}
+        """, (user_id, json.dumps(configs)))
+
+    # --- Metode untuk Canvas ---
+    async def create_canvas(self, id: str, name: str):
+        await self._execute("INSERT INTO canvases (id, name) VALUES (?, ?)", (id, name))
+
+    async def list_canvases(self) -> List[Dict[str, Any]]:
+        return await self._fetchall("""
+            SELECT id, name, description, thumbnail, created_at, updated_at
+            FROM canvases
+            ORDER BY updated_at DESC
+        """)
+
+    async def get_canvas_data(self, id: str) -> Optional[Dict[str, Any]]:
+        row = await self._fetchone(_CANVAS_DATA_SQL, (id,))
+        if not row:
+            return None
+
+        data = _loads(row.get('data')) or {}
+        ops: List[CanvasOp] = _loads(row['ops'])
+        if ops:
+            data = apply_canvas_ops(data, ops)
+            self._note_uncompacted_ops(id, len(ops))
+
+        return {
+            'data': data,
+            'name': row.get('name'),
+            'sessions': _loads(row['sessions'])
+        }
+
+    async def get_canvas_elements(self, id: str) -> Optional[List[CanvasElementGeometry]]:
+        row = await self._fetchone(_CANVAS_ELEMENTS_SQL, (id,))
+        if not row:
+            return None
+
+        ops: List[CanvasOp] = _loads(row['ops'])
+        elements = _loads(row['elements'])
+        if ops:
+            elements = apply_canvas_ops({'elements': elements}, ops)['elements']
+        # json_extract mengembalikan NULL untuk field yang tidak ada
+        return [{k: v for k, v in element.items() if v is not None} for element in elements]
+
+    async def get_canvas_revision(self, id: str) -> Optional[Tuple[int, int]]:
+        row = await self._fetchone(
+            "SELECT version, (SELECT COUNT(*) FROM canvas_ops WHERE canvas_id = ?) AS op_count FROM canvases WHERE id = ?",
+            (id, id)
+        )
+        if not row:
+            return None
+        return row['version'], row['op_count']
+
+    async def save_canvas_data(self, id: str, data: str, thumbnail: Optional[str] = None):
+        # Snapshot penuh menggantikan semua operasi yang sudah ada
+        async with self._connection() as conn:
+            try:
+                await conn.execute(f"""
+                    UPDATE canvases
+                    SET data = ?, thumbnail = ?, version = version + 1,
+                        ops_seq = COALESCE((SELECT MAX(seq) FROM canvas_ops WHERE canvas_id = ?), ops_seq),
+                        updated_at = {NOW_SQL}
+                    WHERE id = ?
+                """, (data, thumbnail, id, id))
+                await conn.execute(
+                    "DELETE FROM canvas_ops WHERE canvas_id = ? AND seq <= (SELECT ops_seq FROM canvases WHERE id = ?)",
+                    (id, id)
+                )
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+        self._uncompacted_ops.pop(id, None)
+
+    async def update_canvas_thumbnail(self, id: str, thumbnail: str):
+        await self._execute(f"UPDATE canvases SET thumbnail = ?, updated_at = {NOW_SQL} WHERE id = ?", (thumbnail, id))
+
+    async def append_canvas_ops(self, id: str, ops: List[CanvasOp]):
+        async with self._connection() as conn:
+            try:
+                await conn.executemany(
+                    "INSERT INTO canvas_ops (canvas_id, op, element_id, payload) VALUES (?, ?, ?, ?)",
+                    [
+                        (id, op['op'], op.get('element_id'),
+                         json.dumps(op['payload']) if op.get('payload') is not None else None)
+                        for op in ops
+                    ]
+                )
+                await conn.execute(f"UPDATE canvases SET updated_at = {NOW_SQL} WHERE id = ?", (id,))
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+    async def compact_canvas(self, id: str) -> bool:
+        row = await self._fetchone("SELECT data, version, ops_seq FROM canvases WHERE id = ?", (id,))
+        if not row:
+            return False
+        op_rows = await self._fetchall(
+            "SELECT seq, op, element_id, payload FROM canvas_ops WHERE canvas_id = ? AND seq > ? ORDER BY seq ASC",
+            (id, row['ops_seq'])
+        )
+        if not op_rows:
+            return True
+
+        data = apply_canvas_ops(_loads(row.get('data')) or {}, [self._row_to_op(op_row) for op_row in op_rows])
+        last_seq = op_rows[-1]['seq']
+
+        async with self._connection() as conn:
+            try:
+                cursor = await conn.execute(
+                    "UPDATE canvases SET data = ?, version = version + 1, ops_seq = ? WHERE id = ? AND version = ?",
+                    (json.dumps(data), last_seq, id, row['version'])
+                )
+                if cursor.rowcount == 0:
+                    await conn.rollback()
+                    return False
+                await conn.execute("DELETE FROM canvas_ops WHERE canvas_id = ? AND seq <= ?", (id, last_seq))
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+        return True
+
+    async def rename_canvas(self, id: str, name: str):
+        await self._execute(f"UPDATE canvases SET name = ?, updated_at = {NOW_SQL} WHERE id = ?", (name, id))
+
+    async def delete_canvas(self, id: str):
+        await self._execute("DELETE FROM canvas_ops WHERE canvas_id = ?", (id,))
+        await self._execute("DELETE FROM canvases WHERE id = ?", (id,))
+
+    # --- Metode untuk Chat ---
+    async def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
+        rows = await self._fetchall(
+            "SELECT message FROM chat_messages WHERE session_id = ? ORDER BY id ASC", (session_id,)
+        )
+        return [_loads(row['message']) for row in rows if row.get('message')]
+
+    async def count_chat_messages(self, session_id: str) -> int:
+        row = await self._fetchone(
+            "SELECT COUNT(*) AS count FROM chat_messages WHERE session_id = ? AND message IS NOT NULL AND message != ''",
+            (session_id,)
+        )
+        return row['count'] if row else 0
+
+    async def list_sessions(self, canvas_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        if canvas_id:
+            return await self._fetchall("""
+                SELECT id, title, model, provider, created_at, updated_at
+                FROM chat_sessions
+                WHERE canvas_id = ?
+                ORDER BY updated_at DESC
+            """, (canvas_id,))
+        return await self._fetchall("""
+            SELECT id, title, model, provider, created_at, updated_at
+            FROM chat_sessions
+            ORDER BY updated_at DESC
+        """)
+
+    async def create_chat_session(self, session_id: str, model: str, provider: str, canvas_id: str, title: str):
+        await self._execute(
+            "INSERT INTO chat_sessions (id, model, provider, canvas_id, title) VALUES (?, ?, ?, ?, ?)",
+            (session_id, model, provider, canvas_id, title)
+        )
+
+    async def create_message(self, session_id: str, role: str, message: str):
+        await self._execute(
+            "INSERT INTO chat_messages (session_id, role, message) VALUES (?, ?, ?)",
+            (session_id, role, message)
+        )
+
+    async def create_messages(self, session_id: str, messages: List[Tuple[str, str]]):
+        async with self._connection() as conn:
+            try:
+                await conn.executemany(
+                    "INSERT INTO chat_messages (session_id, role, message) VALUES (?, ?, ?)",
+                    [(session_id, role, message) for role, message in messages]
+                )
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+
+    # --- Metode untuk Generation Jobs ---
+    async def create_generation_job(self, job: GenerationJob):
+        columns = list(job.keys())
+        await self._execute(
+            f"INSERT INTO generation_jobs ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+            [job[c] for c in columns]  # type: ignore
+        )
+
+    async def update_generation_job(self, id: str, fields: Dict[str, Any]):
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        await self._execute(
+            f"UPDATE generation_jobs SET {assignments}, updated_at = {NOW_SQL} WHERE id = ?",
+            (*fields.values(), id)
+        )
+
+    async def claim_generation_job(self, id: str, owner_id: str, now: float, stale_before: float) -> bool:
+        async with self._connection() as conn:
+            try:
+                cursor = await conn.execute(f"""
+                    UPDATE generation_jobs SET status = 'resuming', owner_id = ?, heartbeat_at = ?, updated_at = {NOW_SQL}
+                    WHERE id = ? AND status IN ('submitted', 'running', 'resuming')
+                      AND (heartbeat_at IS NULL OR heartbeat_at < ?)
+                """, (owner_id, now, id, stale_before))
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+            return cursor.rowcount == 1
+
+    async def heartbeat_generation_jobs(self, owner_id: str, now: float):
+        await self._execute(
+            "UPDATE generation_jobs SET heartbeat_at = ? WHERE owner_id = ? AND status IN ('submitted', 'running', 'resuming')",
+            (now, owner_id)
+        )
+
+    async def release_generation_jobs(self, owner_id: str):
+        await self._execute(
+            "UPDATE generation_jobs SET heartbeat_at = NULL WHERE owner_id = ? AND status IN ('submitted', 'running', 'resuming')",
+            (owner_id,)
+        )
+
+    async def list_unfinished_generation_jobs(self) -> List[GenerationJob]:
+        rows = await self._fetchall(
+            "SELECT * FROM generation_jobs WHERE status IN ('submitted', 'running', 'resuming') ORDER BY created_at ASC"
+        )
+        return rows  # type: ignore
+
+    # --- Metode untuk Comfy Workflows ---
+    async def create_comfy_workflow(self, name: str, api_json: str, description: str, inputs: str, outputs: str):
+        await self._execute(
+            "INSERT INTO comfy_workflows (name, api_json, description, inputs, outputs) VALUES (?, ?, ?, ?, ?)",
+            (name, api_json, description, inputs, outputs)
+        )
+
+    async def list_comfy_workflows(self) -> List[Dict[str, Any]]:
+        rows = await self._fetchall("SELECT * FROM comfy_workflows ORDER BY updated_at DESC")
+        for row in rows:
+            for key in ('api_json', 'inputs', 'outputs'):
+                row[key] = _loads(row.get(key))
+        return rows
+
+    async def get_comfy_workflow(self, workflow_id: int) -> Optional[Dict[str, Any]]:
+        row = await self._fetchone("SELECT api_json FROM comfy_workflows WHERE id = ?", (workflow_id,))
+        if row and row.get('api_json'):
+            return _loads(row['api_json'])
+        return None
+
+    async def delete_comfy_workflow(self, workflow_id: int):
+        await self._execute("DELETE FROM comfy_workflows WHERE id = ?", (workflow_id,))
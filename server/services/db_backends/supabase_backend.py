@@ -0,0 +1,395 @@
+import os
+import json
+import asyncio
+import logging
+from typing import List, Dict, Any, Optional, Tuple
+import httpx
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
+from gotrue.errors import AuthApiError
+from models.db_model import CanvasOp, CanvasElementGeometry, CANVAS_GEOMETRY_FIELDS, GenerationJob
+from services.db_service import DatabaseService, DB_POOL_SIZE
+from utils.canvas import apply_canvas_ops
+from utils.http_client import HttpClient
+
+logger = logging.getLogger(__name__)
+
+# Berapa kali save_canvas_data membaca ulang versi saat bentrok dengan penulisan lain
+SAVE_CANVAS_MAX_RETRIES = 3
+
+
+class SupabaseDatabaseService(DatabaseService):
+    """
+    Layanan database berbasis klien Supabase/PostgREST async.
+    Semua query berjalan melalui satu httpx.AsyncClient dengan pool koneksi terbatas (DB_POOL_SIZE).
+
+    Patch canvas membutuhkan skema berikut di Supabase:
+        ALTER TABLE canvases ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 0;
+        ALTER TABLE canvases ADD COLUMN IF NOT EXISTS ops_seq bigint NOT NULL DEFAULT 0;
+        CREATE TABLE IF NOT EXISTS canvas_ops (
+            seq bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+            canvas_id text NOT NULL REFERENCES canvases(id) ON DELETE CASCADE,
+            op text NOT NULL,
+            element_id text,
+            payload jsonb,
+            created_at timestamptz DEFAULT now()
+        );
+        CREATE INDEX IF NOT EXISTS idx_canvas_ops_canvas_id_seq ON canvas_ops (canvas_id, seq);
+
+    get_canvas_data meng-embed chat_sessions, sehingga chat_sessions.canvas_id harus
+    memiliki foreign key ke canvases(id).
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.url = os.environ.get("SUPABASE_URL")
+        self.key = os.environ.get("SUPABASE_SERVICE_KEY")
+
+        if not self.url or not self.key:
+            raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in the environment.")
+
+        self._client: Optional[AsyncClient] = None
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._init_lock = asyncio.Lock()
+
+    async def initialize(self) -> None:
+        await self._get_client()
+
+    async def _get_client(self) -> AsyncClient:
+        if self._client is not None:
+            return self._client
+
+        async with self._init_lock:
+            if self._client is None:
+                self._http_client = HttpClient.create_async_client(
+                    timeout=httpx.Timeout(30.0, pool=60.0),
+                    limits=httpx.Limits(
+                        max_connections=DB_POOL_SIZE,
+                        max_keepalive_connections=DB_POOL_SIZE,
+                        keepalive_expiry=30,
+                    ),
+                )
+                self._client = await acreate_client(
+                    self.url, self.key,  # type: ignore
+                    options=AsyncClientOptions(httpx_client=self._http_client),
+                )
+                logger.info(f"Supabase async client initialized (pool size {DB_POOL_SIZE}).")
+        return self._client
+
+    async def close(self) -> None:
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._client = None
+        self._http_client = None
+
+    # --- Metode untuk User & Autentikasi ---
+    async def create_user(self, username: str, email: str, hashed_password: str, role: str = 'user') -> int:
+        client = await self._get_client()
+        try:
+            response = await client.table('users').insert({
+                "username": username,
+                "email": email,
+                "hashed_password": hashed_password,
+                "role": role
+            }).execute()
+
+            if response.data:
+                return response.data[0]['id']
+            raise Exception("User creation failed, no data returned.")
+        except AuthApiError as e:
+            logger.error(f"Error creating user in Supabase: {e.message}")
+            raise
+        except Exception as e:
+            logger.error(f"An unexpected error occurred during user creation: {e}")
+            raise
+
+    async def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        client = await self._get_client()
+        response = await client.table('users').select("*").eq('id', user_id).maybe_single().execute()
+        return response.data if response and response.data else None
+
+    async def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
+        client = await self._get_client()
+        response = await client.table('users').select("*").eq('username', username).maybe_single().execute()
+        return response.data if response and response.data else None
+
+    async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        client = await self._get_client()
+        response = await client.table('users').select("*").eq('email', email).maybe_single().execute()
+        return response.data if response and response.data else None
+
+    async def get_user_api_keys(self, user_id: int) -> Dict[str, Any]:
+        client = await self._get_client()
+        response = await client.table('user_api_keys').select("providers_config").eq('user_id', user_id).maybe_single().execute()
+        return response.data['providers_config'] if response and response.data and response.data.get('providers_config') else {}
+
+    async def update_user_api_keys(self, user_id: int, configs: Dict[str, Any]):
+        client = await self._get_client()
+        await client.table('user_api_keys').upsert({
+            "user_id": user_id,
+            "providers_config": configs
+        }, on_conflict="user_id").execute()
+
+    # --- Metode untuk Canvas ---
+    async def create_canvas(self, id: str, name: str):
+        client = await self._get_client()
+        await client.table('canvases').insert({"id": id, "name": name}).execute()
+
+    async def list_canvases(self) -> List[Dict[str, Any]]:
+        client = await self._get_client()
+        response = await client.table('canvases').select("*").order('updated_at', desc=True).execute()
+        return response.data
+
+    async def get_canvas_data(self, id: str) -> Optional[Dict[str, Any]]:
+        # Canvas, operasi patch dan sesi diambil dalam satu request (resource embedding PostgREST)
+        client = await self._get_client()
+        response = await client.table('canvases').select(
+            "data, name, ops_seq, "
+            "canvas_ops(seq, op, element_id, payload), "
+            "chat_sessions(id, title, model, provider, created_at, updated_at)"
+        ).eq('id', id) \
+            .order('seq', foreign_table='canvas_ops') \
+            .order('updated_at', desc=True, foreign_table='chat_sessions') \
+            .maybe_single().execute()
+
+        if not response or not response.data:
+            return None
+
+        data = response.data.get('data') or {}
+        ops = self._pending_ops(response.data)
+        if ops:
+            data = apply_canvas_ops(data, ops)
+            self._note_uncompacted_ops(id, len(ops))
+
+        return {
+            'data': data,
+            'name': response.data.get('name'),
+            'sessions': response.data.get('chat_sessions') or []
+        }
+
+    async def get_canvas_elements(self, id: str) -> Optional[List[CanvasElementGeometry]]:
+        client = await self._get_client()
+        response = await client.table('canvases').select(
+            "elements:data->elements, ops_seq, canvas_ops(seq, op, element_id, payload)"
+        ).eq('id', id) \
+            .in_('canvas_ops.op', ['append', 'update', 'delete']) \
+            .order('seq', foreign_table='canvas_ops') \
+            .maybe_single().execute()
+
+        if not response or not response.data:
+            return None
+
+        elements = response.data.get('elements') or []
+        ops = self._pending_ops(response.data)
+        if ops:
+            elements = apply_canvas_ops({'elements': elements}, ops)['elements']
+        return [
+            {name: element[name] for name in CANVAS_GEOMETRY_FIELDS if name in element}  # type: ignore
+            for element in elements
+        ]
+
+    def _pending_ops(self, canvas: Dict[str, Any]) -> List[CanvasOp]:
+        ops_seq = canvas.get('ops_seq') or 0
+        return [op for op in canvas.get('canvas_ops') or [] if op['seq'] > ops_seq]
+
+    async def _get_last_op_seq(self, client: AsyncClient, id: str) -> Optional[int]:
+        response = await client.table('canvas_ops').select("seq").eq('canvas_id', id).order('seq', desc=True).limit(1).execute()
+        return response.data[0]['seq'] if response.data else None
+
+    async def get_canvas_revision(self, id: str) -> Optional[Tuple[int, int]]:
+        client = await self._get_client()
+        canvas_response, ops_response = await asyncio.gather(
+            client.table('canvases').select("version").eq('id', id).maybe_single().execute(),
+            client.table('canvas_ops').select("seq", count="exact").eq('canvas_id', id).limit(1).execute(),
+        )
+        if not canvas_response or not canvas_response.data:
+            return None
+        return canvas_response.data.get('version') or 0, ops_response.count or 0
+
+    async def save_canvas_data(self, id: str, data: str, thumbnail: Optional[str] = None):
+        # Data sudah dalam format JSON string, Supabase client akan menanganinya
+        client = await self._get_client()
+        parsed_data = json.loads(data)
+        for _ in range(SAVE_CANVAS_MAX_RETRIES):
+            canvas_response, last_seq = await asyncio.gather(
+                client.table('canvases').select("version").eq('id', id).maybe_single().execute(),
+                self._get_last_op_seq(client, id),
+            )
+            if not canvas_response or not canvas_response.data:
+                return
+            version = canvas_response.data.get('version') or 0
+
+            update: Dict[str, Any] = {
+                "data": parsed_data,
+                "thumbnail": thumbnail,
+                "version": version + 1,
+                "updated_at": "now()"
+            }
+            if last_seq is not None:
+                update["ops_seq"] = last_seq
+            # Pemeriksaan versi optimistis, sama seperti compact_canvas: baca ulang jika snapshot berubah
+            update_response = await client.table('canvases').update(update) \
+                .eq('id', id).eq('version', version).execute()
+            if update_response.data:
+                break
+        else:
+            raise Exception(f"Canvas {id} was modified concurrently, save aborted")
+
+        # Snapshot penuh menggantikan semua operasi sebelumnya
+        if last_seq is not None:
+            await client.table('canvas_ops').delete().eq('canvas_id', id).lte('seq', last_seq).execute()
+        self._uncompacted_ops.pop(id, None)
+
+    async def update_canvas_thumbnail(self, id: str, thumbnail: str):
+        client = await self._get_client()
+        await client.table('canvases').update({"thumbnail": thumbnail, "updated_at": "now()"}).eq('id', id).execute()
+
+    async def append_canvas_ops(self, id: str, ops: List[CanvasOp]):
+        client = await self._get_client()
+        await client.table('canvas_ops').insert([
+            {"canvas_id": id, "op": op['op'], "element_id": op.get('element_id'), "payload": op.get('payload')}
+            for op in ops
+        ]).execute()
+        await client.table('canvases').update({"updated_at": "now()"}).eq('id', id).execute()
+
+    async def compact_canvas(self, id: str) -> bool:
+        client = await self._get_client()
+        response = await client.table('canvases').select("data, version, ops_seq").eq('id', id).maybe_single().execute()
+        if not response or not response.data:
+            return False
+
+        version = response.data.get('version') or 0
+        ops_response = await client.table('canvas_ops').select("seq, op, element_id, payload") \
+            .eq('canvas_id', id).gt('seq', response.data.get('ops_seq') or 0) \
+            .order('seq', desc=False).execute()
+        if not ops_response.data:
+            return True
+
+        data = apply_canvas_ops(response.data.get('data') or {}, ops_response.data)
+        last_seq = ops_response.data[-1]['seq']
+
+        # Pemeriksaan versi optimistis: gagal jika snapshot berubah sejak dibaca
+        update_response = await client.table('canvases').update({
+            "data": data,
+            "version": version + 1,
+            "ops_seq": last_seq
+        }).eq('id', id).eq('version', version).execute()
+        if not update_response.data:
+            return False
+
+        await client.table('canvas_ops').delete().eq('canvas_id', id).lte('seq', last_seq).execute()
+        return True
+
+    async def rename_canvas(self, id: str, name: str):
+        client = await self._get_client()
+        await client.table('canvases').update({"name": name, "updated_at": "now()"}).eq('id', id).execute()
+
+    async def delete_canvas(self, id: str):
+        client = await self._get_client()
+        await client.table('canvases').delete().eq('id', id).execute()
+
+    # --- Metode untuk Chat ---
+    async def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
+        client = await self._get_client()
+        response = await client.table('chat_messages').select("message").eq('session_id', session_id).order('id', desc=False).execute()
+        return [row['message'] for row in response.data if row.get('message')]
+
+    async def count_chat_messages(self, session_id: str) -> int:
+        client = await self._get_client()
+        response = await client.table('chat_messages').select("id", count="exact") \
+            .eq('session_id', session_id).not_.is_('message', 'null').limit(1).execute()
+        return response.count or 0
+
+    async def list_sessions(self, canvas_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        client = await self._get_client()
+        query = client.table('chat_sessions').select("id, title, model, provider, created_at, updated_at")
+        if canvas_id:
+            query = query.eq('canvas_id', canvas_id)
+        response = await query.order('updated_at', desc=True).execute()
+        return response.data
+
+    async def create_chat_session(self, session_id: str, model: str, provider: str, canvas_id: str, title: str):
+        client = await self._get_client()
+        await client.table('chat_sessions').insert({
+            "id": session_id,
+            "model": model,
+            "provider": provider,
+            "canvas_id": canvas_id,
+            "title": title
+        }).execute()
+
+    async def create_message(self, session_id: str, role: str, message: str):
+        # Pesan sudah dalam format JSON string, Supabase client akan menanganinya
+        client = await self._get_client()
+        parsed_message = json.loads(message)
+        await client.table('chat_messages').insert({
+            "session_id": session_id,
+            "role": role,
+            "message": parsed_message
+        }).execute()
+
+    async def create_messages(self, session_id: str, messages: List[Tuple[str, str]]):
+        client = await self._get_client()
+        await client.table('chat_messages').insert([
+            {"session_id": session_id, "role": role, "message": json.loads(message)}
+            for role, message in messages
+        ]).execute()
+
+    # --- Metode untuk Generation Jobs ---
+    async def create_generation_job(self, job: GenerationJob):
+        client = await self._get_client()
+        await client.table('generation_jobs').insert(dict(job)).execute()
+
+    async def update_generation_job(self, id: str, fields: Dict[str, Any]):
+        client = await self._get_client()
+        await client.table('generation_jobs').update({**fields, "updated_at": "now()"}).eq('id', id).execute()
+
+    async def claim_generation_job(self, id: str, owner_id: str, now: float, stale_before: float) -> bool:
+        client = await self._get_client()
+        response = await client.table('generation_jobs') \
+            .update({"status": "resuming", "owner_id": owner_id, "heartbeat_at": now, "updated_at": "now()"}) \
+            .eq('id', id).in_('status', ['submitted', 'running', 'resuming']) \
+            .or_(f"heartbeat_at.is.null,heartbeat_at.lt.{stale_before}").execute()
+        return bool(response.data)
+
+    async def heartbeat_generation_jobs(self, owner_id: str, now: float):
+        client = await self._get_client()
+        await client.table('generation_jobs').update({"heartbeat_at": now}) \
+            .eq('owner_id', owner_id).in_('status', ['submitted', 'running', 'resuming']).execute()
+
+    async def release_generation_jobs(self, owner_id: str):
+        client = await self._get_client()
+        await client.table('generation_jobs').update({"heartbeat_at": None}) \
+            .eq('owner_id', owner_id).in_('status', ['submitted', 'running', 'resuming']).execute()
+
+    async def list_unfinished_generation_jobs(self) -> List[GenerationJob]:
+        client = await self._get_client()
+        response = await client.table('generation_jobs').select("*") \
+            .in_('status', ['submitted', 'running', 'resuming']).order('created_at', desc=False).execute()
+        return response.data
+
+    # --- Metode untuk Comfy Workflows ---
+    async def create_comfy_workflow(self, name: str, api_json: str, description: str, inputs: str, outputs: str):
+        client = await self._get_client()
+        await client.table('comfy_workflows').insert({
+            "name": name,
+            "api_json": json.loads(api_json),
+            "description": description,
+            "inputs": json.loads(inputs),
+            "outputs": json.loads(outputs)
+        }).execute()
+
+    async def list_comfy_workflows(self) -> List[Dict[str, Any]]:
+        client = await self._get_client()
+        response = await client.table('comfy_workflows').select("*").order('updated_at', desc=True).execute()
+        return response.data
+
+    async def get_comfy_workflow(self, workflow_id: int) -> Optional[Dict[str, Any]]:
+        client = await self._get_client()
+        response = await client.table('comfy_workflows').select("*").eq('id', workflow_id).maybe_single().execute()
+        if response and response.data and response.data.get('api_json'):
+            return response.data['api_json']
+        return None
+
+    async def delete_comfy_workflow(self, workflow_id: int):
+        client = await self._get_client()
+        await client.table('comfy_workflows').delete().eq('id', workflow_id).execute()
@@ -1,158 +1,253 @@
 import os
-import json
+import asyncio
 import logging
-from typing import List, Dict, Any, Optional
-from supabase import create_client, Client
-from gotrue.errors import AuthApiError
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Tuple
+from models.db_model import CanvasOp, CanvasElementGeometry, GenerationJob
 
 # --- Konfigurasi Awal ---
 logger = logging.getLogger(__name__)
 
-class DatabaseService:
+# Jumlah maksimum koneksi database yang boleh aktif bersamaan
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+# Jumlah operasi patch canvas sebelum dipadatkan ke snapshot
+CANVAS_COMPACT_THRESHOLD = int(os.environ.get("CANVAS_COMPACT_THRESHOLD", 200))
+
+
+class DatabaseService(ABC):
     """
-    Kelas layanan untuk mengelola semua interaksi dengan database Supabase.
+    Kelas dasar layanan database.
+
+    Semua metode benar-benar non-blocking: implementasi backend (Supabase async
+    atau SQLite lokal) tidak boleh memanggil I/O sinkron di event loop.
+    Pilih backend melalui variabel lingkungan DB_BACKEND ('supabase' | 'sqlite').
+
+    Canvas disimpan sebagai snapshot (canvases.data, canvases.version) ditambah log operasi
+    (canvas_ops) per elemen. Menambah satu elemen hanya menulis satu baris log; log dipadatkan
+    ke snapshot secara berkala dengan pemeriksaan versi optimistis.
     """
-    def __init__(self):
-        url = os.environ.get("SUPABASE_URL")
-        key = os.environ.get("SUPABASE_SERVICE_KEY")
 
-        if not url or not key:
-            raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_KEY must be set in the environment.")
+    def __init__(self) -> None:
+        self._uncompacted_ops: Dict[str, int] = {}
+        self._compaction_tasks: Dict[str, asyncio.Task[None]] = {}
+
+    async def initialize(self) -> None:
+        """Buka pool koneksi. Dipanggil saat startup; metode lain juga memanggilnya secara lazy."""
 
-        self.client: Client = create_client(url, key)
-        logger.info("Supabase client initialized successfully.")
+    async def close(self) -> None:
+        """Tutup pool koneksi saat shutdown."""
 
     # --- Metode untuk User & Autentikasi ---
+    @abstractmethod
     async def create_user(self, username: str, email: str, hashed_password: str, role: str = 'user') -> int:
-        try:
-            response = self.client.table('users').insert({
-                "username": username,
-                "email": email,
-                "hashed_password": hashed_password,
-                "role": role
-            }).execute()
-            
-            if response.data:
-                return response.data[0]['id']
-            raise Exception("User creation failed, no data returned.")
-        except AuthApiError as e:
-            logger.error(f"Error creating user in Supabase: {e.message}")
-            raise
-        except Exception as e:
-            logger.error(f"An unexpected error occurred during user creation: {e}")
-            raise
+        pass
 
+    @abstractmethod
     async def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
-        response = self.client.table('users').select("*").eq('id', user_id).maybe_single().execute()
-        return response.data if response.data else None
+        pass
 
+    @abstractmethod
     async def get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
-        response = self.client.table('users').select("*").eq('username', username).maybe_single().execute()
-        return response.data if response.data else None
-        
+        pass
+
+    @abstractmethod
     async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
-        response = self.client.table('users').select("*").eq('email', email).maybe_single().execute()
-        return response.data if response.data else None
+        pass
 
+    @abstractmethod
     async def get_user_api_keys(self, user_id: int) -> Dict[str, Any]:
-        response = self.client.table('user_api_keys').select("providers_config").eq('user_id', user_id).maybe_single().execute()
-        return response.data['providers_config'] if response.data and response.data.get('providers_config') else {}
+        pass
 
+    @abstractmethod
     async def update_user_api_keys(self, user_id: int, configs: Dict[str, Any]):
-        self.client.table('user_api_keys').upsert({
-            "user_id": user_id,
-            "providers_config": configs
-        }, on_conflict="user_id").execute()
+        pass
 
     # --- Metode untuk Canvas ---
+    @abstractmethod
     async def create_canvas(self, id: str, name: str):
-        self.client.table('canvases').insert({"id": id, "name": name}).execute()
+        pass
 
+    @abstractmethod
     async def list_canvases(self) -> List[Dict[str, Any]]:
-        response = self.client.table('canvases').select("*").order('updated_at', desc=True).execute()
-        return response.data
-            
-    async def get_canvas_data(self, id: str) -> Optional[Dict[str, Any]]:
-        response = self.client.table('canvases').select("data, name").eq('id', id).single().execute()
-        
-        if not response.data:
-            return None
-        
-        sessions = await self.list_sessions(id)
-        
-        return {
-            'data': response.data.get('data') or {},
-            'name': response.data.get('name'),
-            'sessions': sessions
-        }
+        pass
 
+    @abstractmethod
+    async def get_canvas_data(self, id: str) -> Optional[Dict[str, Any]]:
+        """Canvas data beserta daftar sesinya, diambil dalam satu query"""
+        pass
+
+    @abstractmethod
+    async def get_canvas_elements(self, id: str) -> Optional[List[CanvasElementGeometry]]:
+        """Proyeksi ringan untuk pemanggil internal: hanya geometri elemen, tanpa files dan sesi"""
+        pass
+
+    @abstractmethod
+    async def get_canvas_revision(self, id: str) -> Optional[Tuple[int, int]]:
+        """
+        (versi snapshot, jumlah operasi di log patch). Setiap penulisan canvas mengubah nilai ini:
+        operasi baru menambah jumlahnya, penulisan snapshot menaikkan versi.
+        """
+        pass
+
+    @abstractmethod
     async def save_canvas_data(self, id: str, data: str, thumbnail: Optional[str] = None):
-        # Data sudah dalam format JSON string, Supabase client akan menanganinya
-        parsed_data = json.loads(data)
-        self.client.table('canvases').update({
-            "data": parsed_data, 
-            "thumbnail": thumbnail,
-            "updated_at": "now()"
-        }).eq('id', id).execute()
-            
+        pass
+
+    @abstractmethod
     async def rename_canvas(self, id: str, name: str):
-        self.client.table('canvases').update({"name": name, "updated_at": "now()"}).eq('id', id).execute()
+        pass
+
+    @abstractmethod
+    async def update_canvas_thumbnail(self, id: str, thumbnail: str):
+        pass
+
+    @abstractmethod
+    async def append_canvas_ops(self, id: str, ops: List[CanvasOp]):
+        """Tambahkan operasi ke log patch canvas (satu penulisan, tidak bergantung ukuran canvas)"""
+        pass
+
+    @abstractmethod
+    async def compact_canvas(self, id: str) -> bool:
+        """
+        Padatkan log patch ke snapshot. Hanya menulis bila versi snapshot tidak berubah sejak dibaca;
+        mengembalikan False jika kalah balapan dengan penulisan snapshot lain.
+        """
+        pass
+
+    async def patch_canvas(self, id: str, ops: List[CanvasOp], thumbnail: Optional[str] = None):
+        if ops:
+            await self.append_canvas_ops(id, ops)
+            self._note_uncompacted_ops(id, self._uncompacted_ops.get(id, 0) + len(ops))
+        if thumbnail is not None:
+            await self.update_canvas_thumbnail(id, thumbnail)
+
+    async def add_canvas_elements(self, id: str, elements: List[Dict[str, Any]], files: Optional[Dict[str, Any]] = None) -> int:
+        """Tambahkan elemen dan file sebagai operasi patch; mengembalikan jumlah operasi yang ditulis"""
+        ops: List[CanvasOp] = [
+            {'op': 'file', 'element_id': file_id, 'payload': file}
+            for file_id, file in (files or {}).items()
+        ]
+        ops.extend(
+            {'op': 'append', 'element_id': element['id'], 'payload': element}
+            for element in elements
+        )
+        await self.patch_canvas(id, ops)
+        return len(ops)
+
+    def _note_uncompacted_ops(self, id: str, count: int) -> None:
+        """Catat jumlah operasi yang belum dipadatkan dan jadwalkan pemadatan bila melewati ambang"""
+        self._uncompacted_ops[id] = count
+        if count >= CANVAS_COMPACT_THRESHOLD and id not in self._compaction_tasks:
+            task = asyncio.create_task(self._run_compaction(id))
+            self._compaction_tasks[id] = task
+            task.add_done_callback(lambda _: self._compaction_tasks.pop(id, None))
+
+    async def _run_compaction(self, id: str) -> None:
+        try:
+            if await self.compact_canvas(id):
+                self._uncompacted_ops.pop(id, None)
+        except Exception as e:
+            logger.error(f"Error compacting canvas {id}: {e}")
 
+    @abstractmethod
     async def delete_canvas(self, id: str):
-        self.client.table('canvases').delete().eq('id', id).execute()
+        pass
 
     # --- Metode untuk Chat ---
+    @abstractmethod
     async def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
-        response = self.client.table('chat_messages').select("message").eq('session_id', session_id).order('id', desc=False).execute()
-        return [row['message'] for row in response.data if row.get('message')]
-        
+        pass
+
+    @abstractmethod
+    async def count_chat_messages(self, session_id: str) -> int:
+        """Jumlah pesan tersimpan satu sesi (sama dengan panjang get_chat_history)"""
+        pass
+
+    @abstractmethod
     async def list_sessions(self, canvas_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        query = self.client.table('chat_sessions').select("id, title, model, provider, created_at, updated_at")
-        if canvas_id:
-            query = query.eq('canvas_id', canvas_id)
-        response = query.order('updated_at', desc=True).execute()
-        return response.data
+        pass
 
+    @abstractmethod
     async def create_chat_session(self, session_id: str, model: str, provider: str, canvas_id: str, title: str):
-        self.client.table('chat_sessions').insert({
-            "id": session_id,
-            "model": model,
-            "provider": provider,
-            "canvas_id": canvas_id,
-            "title": title
-        }).execute()
+        pass
 
+    @abstractmethod
     async def create_message(self, session_id: str, role: str, message: str):
-        # Pesan sudah dalam format JSON string, Supabase client akan menanganinya
-        parsed_message = json.loads(message)
-        self.client.table('chat_messages').insert({
-            "session_id": session_id,
-            "role": role,
-            "message": parsed_message
-        }).execute()
-        
+        pass
+
+    @abstractmethod
+    async def create_messages(self, session_id: str, messages: List[Tuple[str, str]]):
+        """Simpan beberapa pesan (role, JSON pesan) sekaligus dalam satu penulisan, sesuai urutan"""
+        pass
+
+    # --- Metode untuk Generation Jobs ---
+    @abstractmethod
+    async def create_generation_job(self, job: GenerationJob):
+        pass
+
+    @abstractmethod
+    async def update_generation_job(self, id: str, fields: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    async def claim_generation_job(self, id: str, owner_id: str, now: float, stale_before: float) -> bool:
+        """
+        Ambil alih job yang belum selesai (status menjadi 'resuming') hanya bila heartbeat pemiliknya
+        lebih lama dari stale_before atau tidak ada; False bila pemiliknya masih hidup atau sudah
+        diambil proses lain
+        """
+        pass
+
+    @abstractmethod
+    async def heartbeat_generation_jobs(self, owner_id: str, now: float):
+        """Perbarui heartbeat semua job yang belum selesai milik owner_id"""
+        pass
+
+    @abstractmethod
+    async def release_generation_jobs(self, owner_id: str):
+        """Hapus heartbeat job milik owner_id agar bisa langsung diambil alih (saat shutdown)"""
+        pass
+
+    @abstractmethod
+    async def list_unfinished_generation_jobs(self) -> List[GenerationJob]:
+        pass
+
     # --- Metode untuk Comfy Workflows ---
+    @abstractmethod
     async def create_comfy_workflow(self, name: str, api_json: str, description: str, inputs: str, outputs: str):
-        self.client.table('comfy_workflows').insert({
-            "name": name,
-            "api_json": json.loads(api_json),
-            "description": description,
-            "inputs": json.loads(inputs),
-            "outputs": json.loads(outputs)
-        }).execute()
+        pass
 
+    @abstractmethod
     async def list_comfy_workflows(self) -> List[Dict[str, Any]]:
-        response = self.client.table('comfy_workflows').select("*").order('updated_at', desc=True).execute()
-        return response.data
+        pass
 
+    @abstractmethod
     async def get_comfy_workflow(self, workflow_id: int) -> Optional[Dict[str, Any]]:
-        response = self.client.table('comfy_workflows').select("*").eq('id', workflow_id).maybe_single().execute()
-        if response.data and response.data.get('api_json'):
-            return response.data['api_json']
-        return None
+        pass
 
+    @abstractmethod
     async def delete_comfy_workflow(self, workflow_id: int):
-        self.client.table('comfy_workflows').delete().eq('id', workflow_id).execute()
+        pass
+
+
+def create_db_service() -> DatabaseService:
+    """
+    Buat instance layanan database sesuai DB_BACKEND.
+    Jika DB_BACKEND tidak diatur, gunakan Supabase bila SUPABASE_URL tersedia, selain itu SQLite lokal.
+    """
+    backend = os.environ.get("DB_BACKEND", "").lower()
+    if not backend:
+        backend = "supabase" if os.environ.get("SUPABASE_URL") else "sqlite"
+
+    if backend == "supabase":
+        from services.db_backends.supabase_backend import SupabaseDatabaseService
+        return SupabaseDatabaseService()
+    if backend == "sqlite":
+        from services.db_backends.sqlite_backend import SQLiteDatabaseService
+        return SQLiteDatabaseService()
+
+    raise ValueError(f"Unknown DB_BACKEND: {backend}")
+
 
 # --- Singleton Instance ---
-db_service = DatabaseService()
\ No newline at end of file
+db_service = create_db_service()
@@ -0,0 +1,158 @@
+import os
+import asyncio
+import hashlib
+from typing import Dict, Optional, Tuple
+
+from services.config_service import FILES_DIR
+from services.image_processing_service import image_processing_service
+from tools.utils.image_processing import make_derivative
+
+# Turunan (thumbnail/preview WebP) disimpan di FILES_DIR/derivatives/<2 hex>/<2 hex>/<kunci>_w<lebar>.webp
+DERIVATIVES_DIR = os.path.join(FILES_DIR, "derivatives")
+# Lebar yang didukung; permintaan dibulatkan ke atas agar jumlah varian tetap terbatas
+DERIVATIVE_WIDTHS = (128, 256, 512, 1024, 2048)
+DERIVATIVE_CACHE_MAX_BYTES = int(os.environ.get("DERIVATIVE_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+# Setelah eviksi, ukuran cache diturunkan sampai fraksi ini dari batas maksimum
+DERIVATIVE_CACHE_LOW_WATERMARK = 0.8
+
+DERIVATIVE_SOURCE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif', '.bmp', '.tiff')
+
+
+def snap_width(width: int) -> int:
+    for allowed in DERIVATIVE_WIDTHS:
+        if width <= allowed:
+            return allowed
+    return DERIVATIVE_WIDTHS[-1]
+
+
+class DerivativeService:
+    """
+    Thumbnail dan preview WebP yang dibuat secara lazy dan di-cache di disk.
+
+    Turunan dibuat di process pool gambar, dikunci dengan hash konten sumber (atau path
+    dan mtime untuk file di luar asset store) sehingga file yang sama berbagi turunan.
+    Waktu modifikasi file turunan diperbarui setiap kali dilayani; saat total ukuran
+    melebihi DERIVATIVE_CACHE_MAX_BYTES, turunan yang paling lama tidak dipakai dihapus.
+    """
+
+    def __init__(self, max_bytes: int = DERIVATIVE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._total_bytes: Optional[int] = None
+        self._inflight: Dict[str, asyncio.Future[str]] = {}
+        self._evicting = False
+        self.hits = 0
+        self.misses = 0
+
+    def derivative_path(self, key: str, width: int) -> str:
+        return os.path.join(DERIVATIVES_DIR, key[:2], key[2:4], f"{key}_w{width}.webp")
+
+    @staticmethod
+    def source_key(source_path: str, sha256: Optional[str] = None) -> str:
+        """Kunci turunan: hash konten jika diketahui, selain itu hash dari path dan mtime"""
+        if sha256:
+            return sha256
+        stat = os.stat(source_path)
+        return hashlib.sha256(f"{source_path}:{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()
+
+    @staticmethod
+    def supports(source_path: str) -> bool:
+        return os.path.splitext(source_path)[1].lower() in DERIVATIVE_SOURCE_EXTENSIONS
+
+    async def get(self, source_path: str, width: int, sha256: Optional[str] = None) -> str:
+        """Path turunan WebP untuk source_path dengan lebar maksimum width; dibuat jika belum ada"""
+        width = snap_width(width)
+        key = self.source_key(source_path, sha256)
+        path = self.derivative_path(key, width)
+
+        if os.path.exists(path):
+            self.hits += 1
+            self._touch(path)
+            return path
+
+        # Permintaan bersamaan untuk turunan yang sama menunggu satu pekerjaan
+        pending = self._inflight.get(path)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
+        self._inflight[path] = future
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            await image_processing_service.run(make_derivative, source_path, path, width)
+            future.set_result(path)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Hindari peringatan "exception never retrieved" bila tidak ada yang menunggu
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(path, None)
+
+        await self._account(path)
+        return path
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'bytes': self._total_bytes or 0,
+            'max_bytes': self.max_bytes,
+        }
+
+    def _touch(self, path: str) -> None:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    async def _account(self, new_path: str) -> None:
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in await asyncio.to_thread(self._scan))
+        else:
+            self._total_bytes += os.path.getsize(new_path)
+        if self._total_bytes > self.max_bytes and not self._evicting:
+            self._evicting = True
+            try:
+                await asyncio.to_thread(self._evict, new_path)
+            finally:
+                self._evicting = False
+
+    def _scan(self) -> list[Tuple[str, int, float]]:
+        entries = []
+        for root, _, files in os.walk(DERIVATIVES_DIR):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self, keep_path: str) -> None:
+        """Hapus turunan yang paling lama tidak dipakai sampai di bawah low watermark, kecuali keep_path"""
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * DERIVATIVE_CACHE_LOW_WATERMARK
+        removed = 0
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= target:
+                break
+            if path == keep_path:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._total_bytes = total
+        print(f"🖼️ Derivative cache evicted {removed} files, {total / 1024 / 1024:.1f}MB kept")
+
+
+# --- Singleton Instance ---
+derivative_service = DerivativeService()
@@ -0,0 +1,228 @@
+import os
+import time
+import asyncio
+import traceback
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, Literal, Optional
+
+from nanoid import generate
+
+from models.db_model import GenerationJob
+from services.db_service import db_service
+from services.websocket_service import send_to_websocket
+
+# Interval (detik) pemilik memperbarui heartbeat job-nya dan memeriksa job yatim
+GENERATION_JOB_HEARTBEAT_INTERVAL = float(os.environ.get("GENERATION_JOB_HEARTBEAT_INTERVAL", 30))
+# Job yang heartbeat-nya lebih lama dari ini dianggap tanpa pemilik dan boleh diambil alih
+GENERATION_JOB_STALE_AFTER = float(os.environ.get("GENERATION_JOB_STALE_AFTER", GENERATION_JOB_HEARTBEAT_INTERVAL * 3))
+
+# Fungsi yang menyambung kembali ke task remote dan mengembalikan URL hasilnya
+Resumer = Callable[[GenerationJob], Awaitable[str]]
+
+# Job milik generasi yang sedang berjalan di task (tool call) ini
+_current_job: ContextVar[Optional[GenerationJob]] = ContextVar('current_generation_job', default=None)
+
+
+class GenerationJobService:
+    """
+    Antrean job generasi yang tahan restart.
+
+    Setiap generasi gambar/video dicatat di tabel generation_jobs (provider, task ID remote, canvas,
+    sesi, status). Provider memanggil attach_remote_task() begitu task remote dibuat; job yang
+    sedang berjalan diambil dari context tool call, sehingga provider tidak perlu tahu canvas/sesi.
+    Setiap job dimiliki oleh satu worker (owner_id) yang memperbarui heartbeat-nya secara berkala.
+    Saat startup dan setiap interval heartbeat, job yang belum selesai dan heartbeat-nya sudah basi
+    (pemiliknya berhenti atau crash) diambil alih secara atomik: yang sudah memiliki task ID
+    disambung kembali melalui resumer per provider, lalu hasilnya disimpan ke canvas dan sesi
+    diberi tahu. Job milik worker lain yang masih hidup tidak disentuh.
+    """
+
+    def __init__(self):
+        self.owner_id = 'worker_' + generate(size=10)
+        self._resumers: Dict[str, Resumer] = {}
+        self._tasks: Dict[str, asyncio.Task[None]] = {}
+        self._heartbeat: Optional[asyncio.Task[None]] = None
+        # Server sedang berhenti: generasi yang dibatalkan karena shutdown tetap bisa dilanjutkan
+        self._stopping = False
+
+    def register_resumer(self, kind: Literal['image', 'video'], provider: str, resumer: Resumer) -> None:
+        self._resumers[f"{kind}:{provider}"] = resumer
+
+    @asynccontextmanager
+    async def track(
+        self,
+        kind: Literal['image', 'video'],
+        provider: str,
+        model: str,
+        canvas_id: str,
+        session_id: str,
+    ) -> AsyncGenerator[GenerationJob, None]:
+        """Catat satu generasi selama blok berjalan; status akhir ditulis saat blok selesai"""
+        job: GenerationJob = {
+            'id': 'job_' + generate(size=10),
+            'kind': kind,
+            'provider': provider,
+            'model': model,
+            'canvas_id': canvas_id,
+            'session_id': session_id,
+            'status': 'submitted',
+            'owner_id': self.owner_id,
+            'heartbeat_at': time.time(),
+        }
+        try:
+            await db_service.create_generation_job(job)
+        except Exception as e:
+            # Pencatatan job tidak boleh menggagalkan generasi
+            print(f"Error creating generation job: {e}")
+            yield job
+            return
+
+        token = _current_job.set(job)
+        try:
+            yield job
+        except asyncio.CancelledError:
+            # Dibatalkan pengguna: task remote tidak dilanjutkan setelah restart
+            if not self._stopping:
+                await self._update(job, {'status': 'failed', 'error': 'cancelled'})
+            raise
+        except Exception as e:
+            await self._update(job, {'status': 'failed', 'error': str(e)[:1000]})
+            raise
+        else:
+            await self._update(job, {'status': 'succeeded'})
+        finally:
+            _current_job.reset(token)
+
+    async def attach_remote_task(self, remote_task_id: str) -> None:
+        """Simpan task ID remote untuk job yang sedang berjalan (tidak melakukan apa-apa di luar job)"""
+        job = _current_job.get()
+        if job is None or job.get('remote_task_id') == remote_task_id:
+            return
+        job['remote_task_id'] = remote_task_id
+        job['status'] = 'running'
+        await self._update(job, {'remote_task_id': remote_task_id, 'status': 'running'})
+
+    async def _update(self, job: GenerationJob, fields: Dict[str, Any]) -> None:
+        try:
+            await db_service.update_generation_job(job['id'], fields)
+        except Exception as e:
+            print(f"Error updating generation job {job['id']}: {e}")
+
+    # --- Melanjutkan job setelah restart ---
+
+    async def start(self) -> None:
+        """Sambungkan kembali job yang pemiliknya sudah berhenti, lalu mulai heartbeat"""
+        await self._resume_stale_jobs()
+        self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop(self) -> None:
+        """Dipanggil sebelum stream dibatalkan saat shutdown, agar job yang berjalan tetap bisa dilanjutkan"""
+        self._stopping = True
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        # Job yang dibatalkan di sini tetap berstatus 'resuming' dan dilanjutkan pada startup berikutnya
+        for task in list(self._tasks.values()):
+            task.cancel()
+        self._tasks.clear()
+        # Lepaskan kepemilikan agar worker lain (atau proses ini setelah restart) langsung bisa melanjutkan
+        try:
+            await db_service.release_generation_jobs(self.owner_id)
+        except Exception as e:
+            print(f"Error releasing generation jobs: {e}")
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(GENERATION_JOB_HEARTBEAT_INTERVAL)
+            try:
+                await db_service.heartbeat_generation_jobs(self.owner_id, time.time())
+                await self._resume_stale_jobs()
+            except Exception as e:
+                print(f"Error in generation job heartbeat: {e}")
+                traceback.print_exc()
+
+    async def _resume_stale_jobs(self) -> None:
+        now = time.time()
+        stale_before = now - GENERATION_JOB_STALE_AFTER
+        for job in await db_service.list_unfinished_generation_jobs():
+            if job['id'] in self._tasks or job.get('owner_id') == self.owner_id:
+                continue
+            heartbeat_at = job.get('heartbeat_at')
+            if heartbeat_at is not None and heartbeat_at >= stale_before:
+                # Pemiliknya masih hidup
+                continue
+            if not await db_service.claim_generation_job(job['id'], self.owner_id, now, stale_before):
+                continue
+            if not job.get('remote_task_id'):
+                # Pemilik berhenti sebelum provider menerima task: tidak ada yang bisa dilanjutkan
+                await self._update(job, {'status': 'failed', 'error': 'interrupted before the remote task was created'})
+                continue
+            if f"{job['kind']}:{job['provider']}" not in self._resumers:
+                await self._update(job, {'status': 'failed', 'error': f"{job['kind']} jobs of {job['provider']} cannot be resumed"})
+                continue
+            print(f"♻️ Resuming {job['kind']} generation {job['id']} ({job['provider']} task {job['remote_task_id']})")
+            task = asyncio.create_task(self._resume(job))
+            self._tasks[job['id']] = task
+            task.add_done_callback(lambda _, job_id=job['id']: self._tasks.pop(job_id, None))
+
+    async def _resume(self, job: GenerationJob) -> None:
+        try:
+            result_url = await self._resumers[f"{job['kind']}:{job['provider']}"](job)
+            message = await self._save_result(job, result_url)
+            await self._update(job, {'status': 'succeeded', 'result_url': result_url})
+            await self._notify(job, message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            traceback.print_exc()
+            await self._update(job, {'status': 'failed', 'error': str(e)[:1000]})
+            await send_to_websocket(job['session_id'], {
+                'type': 'error',
+                'error': f"Resumed {job['kind']} generation failed: {e}",
+            })
+
+    async def _save_result(self, job: GenerationJob, result_url: str) -> str:
+        """Simpan hasil ke canvas seperti alur tool biasa; mengembalikan pesan hasil"""
+        # Impor lambat: modul tools mengimpor layanan ini
+        if job['kind'] == 'video':
+            from tools.video_generation.video_canvas_utils import process_video_result
+            return await process_video_result(
+                video_url=result_url,
+                session_id=job['session_id'],
+                canvas_id=job['canvas_id'],
+                provider_name=f"{job.get('model')} ({job['provider']})",
+            )
+
+        from common import DEFAULT_PORT
+        from services.config_service import FILES_DIR
+        from tools.utils.image_utils import get_image_info_and_save, generate_image_id
+        from tools.utils.image_canvas_utils import save_image_to_canvas
+        image_id = generate_image_id()
+        mime_type, width, height, extension = await get_image_info_and_save(
+            result_url, os.path.join(FILES_DIR, image_id))
+        filename = f'{image_id}.{extension}'
+        image_url = await save_image_to_canvas(
+            job['session_id'], job['canvas_id'], filename, mime_type, width, height)
+        return f"image generated successfully ![image_id: {filename}](http://localhost:{DEFAULT_PORT}{image_url})"
+
+    async def _notify(self, job: GenerationJob, message: str) -> None:
+        """Hasil tool call aslinya hilang saat restart: catat sebagai pesan asisten di sesi"""
+        from services.chat_history_service import chat_history_service
+        assistant_message = {'role': 'assistant', 'content': message}
+        await chat_history_service.save_message(job['session_id'], assistant_message)
+        await send_to_websocket(job['session_id'], {
+            'type': 'generation_job_resumed',
+            'job_id': job['id'],
+            'kind': job['kind'],
+            'message': assistant_message,
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'resuming': len(self._tasks),
+            'resumable_providers': sorted(self._resumers),
+        }
+
+
+generation_job_service = GenerationJobService()
@@ -0,0 +1,304 @@
+"""
+生成任务调度器
+
+图像 / 视频生成请求在发送给 provider 之前先经过调度器，按 provider + api_key 分组：
+- 每组限制同时进行的生成数（max_concurrency）和提交速率（令牌桶，requests_per_minute）；
+- 超出限制的请求排队，按会话轮流出队，单个会话的大量工具调用不会占满整个 provider；
+- provider 返回 429 时，整组按 Retry-After 暂停，请求重新排到该会话队首后自动重试；
+- 排队中的请求通过 WebSocket 向会话推送排队位置（generation_queue 事件）。
+
+限制可在 config 的 provider 配置中用 max_concurrency / requests_per_minute 覆盖默认值，
+配置更新后立即对已有队列生效。
+"""
+
+import time
+import hashlib
+import asyncio
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Mapping, Optional, Set, TypeVar
+from services.config_service import config_service
+from services.websocket_service import send_to_websocket
+
+# 429 后最多自动重试次数
+GENERATION_MAX_RETRIES = 3
+# provider 未返回 Retry-After 时的暂停时间（秒）
+GENERATION_DEFAULT_RETRY_AFTER = 10.0
+# Retry-After 上限（秒），避免异常值让请求长时间挂起
+GENERATION_MAX_RETRY_AFTER = 120.0
+
+T = TypeVar('T')
+
+
+@dataclass
+class ProviderLimits:
+    max_concurrency: int = 4
+    requests_per_minute: float = 60.0
+    # 令牌桶容量，允许的突发请求数
+    burst: int = 4
+
+
+# 各 provider 的默认限制
+PROVIDER_LIMITS: Dict[str, ProviderLimits] = {
+    'jaaz': ProviderLimits(max_concurrency=6, requests_per_minute=120, burst=6),
+    'replicate': ProviderLimits(max_concurrency=8, requests_per_minute=300, burst=8),
+    'volces': ProviderLimits(max_concurrency=4, requests_per_minute=60, burst=4),
+    'wavespeed': ProviderLimits(max_concurrency=4, requests_per_minute=60, burst=4),
+    'openai': ProviderLimits(max_concurrency=4, requests_per_minute=30, burst=2),
+}
+
+
+class RateLimitError(Exception):
+    """provider 返回 429；retry_after 为建议的等待秒数"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或 HTTP 日期）"""
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def rate_limit_retry_after(error: BaseException) -> Optional[float]:
+    """异常是否为限流错误；是则返回等待秒数，否则返回 None"""
+    if isinstance(error, RateLimitError):
+        retry_after = error.retry_after
+    else:
+        # openai / httpx 的状态码异常带有 response
+        response = getattr(error, 'response', None)
+        if getattr(response, 'status_code', None) != 429:
+            return None
+        retry_after = parse_retry_after(getattr(response, 'headers', {}))
+    if retry_after is None:
+        retry_after = GENERATION_DEFAULT_RETRY_AFTER
+    return min(retry_after, GENERATION_MAX_RETRY_AFTER)
+
+
+class _TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: int):
+        self.rate = rate_per_second
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """距离下一个令牌可用的秒数"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else GENERATION_DEFAULT_RETRY_AFTER
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+@dataclass(eq=False)
+class _Waiter:
+    session_id: str
+    future: 'asyncio.Future[None]'
+    # 最近一次推送给会话的排队位置，0 表示尚未推送
+    position: int = 0
+
+
+@dataclass
+class _ProviderQueue:
+    provider: str
+    limits: ProviderLimits
+    bucket: _TokenBucket
+    active: int = 0
+    # 会话 -> 排队中的请求；出队时轮流选择会话
+    waiting: 'OrderedDict[str, Deque[_Waiter]]' = field(default_factory=OrderedDict)
+    blocked_until: float = 0.0
+    timer: Optional[asyncio.TimerHandle] = None
+    rate_limited: int = 0
+
+
+class GenerationScheduler:
+    """按 provider + api_key 限流的生成请求调度器"""
+
+    def __init__(self):
+        self._queues: Dict[str, _ProviderQueue] = {}
+        self._notify_tasks: Set[asyncio.Task[None]] = set()
+
+    @staticmethod
+    def _limits(provider: str) -> ProviderLimits:
+        default = PROVIDER_LIMITS.get(provider, ProviderLimits())
+        config = config_service.app_config.get(provider, {})
+        max_concurrency = max(1, int(config.get('max_concurrency') or default.max_concurrency))
+        return ProviderLimits(
+            max_concurrency=max_concurrency,
+            requests_per_minute=float(config.get('requests_per_minute') or default.requests_per_minute),
+            burst=min(default.burst, max_concurrency),
+        )
+
+    def invalidate(self) -> None:
+        """配置更新后重新读取限制；空闲队列直接丢弃（api_key 可能已变化）"""
+        for key, queue in list(self._queues.items()):
+            if not queue.active and not queue.waiting and queue.timer is None:
+                del self._queues[key]
+                continue
+            # 进行中和排队的请求留在原队列，只更新限制
+            queue.limits = self._limits(queue.provider)
+            queue.bucket.rate = queue.limits.requests_per_minute / 60
+            queue.bucket.capacity = max(1, queue.limits.burst)
+            queue.bucket.tokens = min(queue.bucket.tokens, queue.bucket.capacity)
+            self._dispatch(queue)
+
+    def _queue(self, provider: str) -> _ProviderQueue:
+        # 同一 provider 的不同 api_key 各自限流
+        api_key = str(config_service.app_config.get(provider, {}).get('api_key', ''))
+        key = f"{provider}:{hashlib.sha256(api_key.encode()).hexdigest()[:12]}"
+        queue = self._queues.get(key)
+        if queue is None:
+            limits = self._limits(provider)
+            queue = self._queues[key] = _ProviderQueue(
+                provider=provider,
+                limits=limits,
+                bucket=_TokenBucket(limits.requests_per_minute / 60, limits.burst),
+            )
+        return queue
+
+    async def run(
+        self,
+        provider: str,
+        session_id: str,
+        call: Callable[[], Awaitable[T]],
+    ) -> T:
+        """在 provider 的限制内执行 call()；遇到 429 时按 Retry-After 暂停后重试"""
+        queue = self._queue(provider)
+        attempt = 0
+        while True:
+            await self._acquire(queue, session_id, retry=attempt > 0)
+            try:
+                return await call()
+            except Exception as e:
+                retry_after = rate_limit_retry_after(e)
+                if retry_after is None or attempt >= GENERATION_MAX_RETRIES:
+                    raise
+                attempt += 1
+                queue.rate_limited += 1
+                queue.blocked_until = max(queue.blocked_until, time.monotonic() + retry_after)
+                print(f"⏳ {provider} rate limited, retrying in {retry_after:.1f}s ({attempt}/{GENERATION_MAX_RETRIES})")
+            finally:
+                queue.active -= 1
+                self._dispatch(queue)
+
+    async def _acquire(self, queue: _ProviderQueue, session_id: str, retry: bool = False) -> None:
+        waiter = _Waiter(session_id=session_id, future=asyncio.get_running_loop().create_future())
+        waiters = queue.waiting.setdefault(session_id, deque())
+        # 重试的请求排在本会话队首
+        if retry:
+            waiters.appendleft(waiter)
+        else:
+            waiters.append(waiter)
+        self._dispatch(queue)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 已分配到名额但调用方被取消：归还名额
+                queue.active -= 1
+            else:
+                self._remove(queue, waiter)
+            self._dispatch(queue)
+            raise
+        if waiter.position:
+            self._notify(queue, waiter, 0)
+
+    @staticmethod
+    def _remove(queue: _ProviderQueue, waiter: _Waiter) -> None:
+        waiters = queue.waiting.get(waiter.session_id)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            pass
+        if not waiters:
+            del queue.waiting[waiter.session_id]
+
+    def _dispatch(self, queue: _ProviderQueue) -> None:
+        """在限制允许时让排队的请求出队"""
+        while queue.waiting and queue.active < queue.limits.max_concurrency:
+            now = time.monotonic()
+            delay = max(queue.blocked_until - now, queue.bucket.delay(now))
+            if delay > 0:
+                if queue.timer is None:
+                    queue.timer = asyncio.get_running_loop().call_later(delay, self._on_timer, queue)
+                break
+            session_id, waiters = next(iter(queue.waiting.items()))
+            waiter = waiters.popleft()
+            if waiters:
+                # 轮到下一个会话
+                queue.waiting.move_to_end(session_id)
+            else:
+                del queue.waiting[session_id]
+            if waiter.future.done():
+                continue
+            queue.bucket.take(now)
+            queue.active += 1
+            waiter.future.set_result(None)
+        self._report_positions(queue)
+
+    def _on_timer(self, queue: _ProviderQueue) -> None:
+        queue.timer = None
+        self._dispatch(queue)
+
+    @staticmethod
+    def _dispatch_order(queue: _ProviderQueue) -> List[_Waiter]:
+        """排队中请求的出队顺序（各会话轮流）"""
+        order: List[_Waiter] = []
+        depth = max((len(w) for w in queue.waiting.values()), default=0)
+        for i in range(depth):
+            for waiters in queue.waiting.values():
+                if i < len(waiters):
+                    order.append(waiters[i])
+        return order
+
+    def _report_positions(self, queue: _ProviderQueue) -> None:
+        for position, waiter in enumerate(self._dispatch_order(queue), start=1):
+            if waiter.position != position:
+                self._notify(queue, waiter, position)
+
+    def _notify(self, queue: _ProviderQueue, waiter: _Waiter, position: int) -> None:
+        """推送排队位置；position 为 0 表示已开始生成"""
+        waiter.position = position
+        task = asyncio.create_task(send_to_websocket(waiter.session_id, {
+            'type': 'generation_queue',
+            'provider': queue.provider,
+            'position': position,
+        }))
+        self._notify_tasks.add(task)
+        task.add_done_callback(self._notify_tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        providers: Dict[str, Dict[str, int]] = {}
+        for queue in self._queues.values():
+            entry = providers.setdefault(queue.provider, {'active': 0, 'queued': 0, 'rate_limited': 0})
+            entry['active'] += queue.active
+            entry['queued'] += sum(len(w) for w in queue.waiting.values())
+            entry['rate_limited'] += queue.rate_limited
+        return providers
+
+
+generation_scheduler = GenerationScheduler()
+# provider 的限制或 api_key 变化后，队列需要重新读取配置
+config_service.add_update_listener(generation_scheduler.invalidate)
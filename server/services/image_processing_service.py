@@ -0,0 +1,98 @@
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar('T')
+
+# Jumlah proses worker untuk decode/encode gambar (default: jumlah core)
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", os.cpu_count() or 1))
+# Jumlah tugas yang boleh berada di pool sekaligus; sisanya menunggu di antrian asyncio
+IMAGE_MAX_IN_FLIGHT = int(os.environ.get("IMAGE_MAX_IN_FLIGHT", IMAGE_WORKERS * 2))
+# Cetak peringatan bila antrian melebihi batas ini
+IMAGE_QUEUE_WARN_DEPTH = int(os.environ.get("IMAGE_QUEUE_WARN_DEPTH", IMAGE_WORKERS * 4))
+
+
+class ImageProcessingService:
+    """
+    Executor pemrosesan gambar berbasis process pool terbatas.
+
+    Pekerjaan PIL (decode, konversi mode warna, encode PNG dengan optimize) dijalankan di
+    proses terpisah agar event loop dan stream WebSocket tidak membeku. Jika coroutine
+    pemanggil dibatalkan (misalnya tugas chat dibatalkan), tugas yang belum mulai
+    dikeluarkan dari antrian; hasil tugas yang sudah berjalan diabaikan.
+    """
+
+    def __init__(self, max_workers: int = IMAGE_WORKERS, max_in_flight: int = IMAGE_MAX_IN_FLIGHT):
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: aman dipakai dari proses yang memiliki thread (aiosqlite, event loop);
+            # proses anak hanya mengimpor ulang main.py yang ringan, bukan aplikasi di app.py
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return self._executor
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Jalankan fn(*args) di process pool; fn dan argumennya harus bisa di-pickle"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        self._queued += 1
+        if self._queued > IMAGE_QUEUE_WARN_DEPTH:
+            print(f"⚠️ Image processing queue depth {self._queued} (workers: {self.max_workers})")
+        try:
+            await self._slots.acquire()
+        except asyncio.CancelledError:
+            self._cancelled += 1
+            raise
+        finally:
+            self._queued -= 1
+
+        self._running += 1
+        future = self._get_executor().submit(fn, *args)
+        try:
+            result = await asyncio.wrap_future(future)
+            self._completed += 1
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            self._cancelled += 1
+            raise
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._running -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'workers': self.max_workers,
+            'queue_depth': self._queued,
+            'running': self._running,
+            'completed': self._completed,
+            'failed': self._failed,
+            'cancelled': self._cancelled,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# --- Singleton Instance ---
+image_processing_service = ImageProcessingService()
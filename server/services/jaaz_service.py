@@ -1,10 +1,64 @@
 # services/OpenAIAgents_service/jaaz_service.py
 
-import asyncio
+import hashlib
 import aiohttp
 from typing import Dict, Any, Optional, List
 from utils.http_client import HttpClient
 from services.config_service import config_service
+from services.generation_job_service import generation_job_service
+from models.db_model import GenerationJob
+from services.task_tracker import (
+    TaskBackend, TaskUpdate, PollProfile, task_tracker,
+    pending_update, succeeded_update, failed_update,
+)
+
+
+class JaazTaskBackend(TaskBackend):
+    """Jaaz 云端任务状态查询（API 只支持按 ID 单个查询）"""
+    provider = 'jaaz'
+    profile = PollProfile(min_interval=2.0, max_interval=15.0, timeout=600.0)
+
+    def __init__(self, api_url: str, api_token: str):
+        self.api_url = api_url
+        self.api_token = api_token
+
+    @property
+    def key(self) -> str:
+        token_hash = hashlib.sha256(self.api_token.encode()).hexdigest()[:12]
+        return f"{self.provider}:{self.api_url}:{token_hash}"
+
+    async def fetch(self, task_ids: List[str]) -> Dict[str, TaskUpdate]:
+        return {task_id: await self._fetch_one(task_id) for task_id in task_ids}
+
+    async def _fetch_one(self, task_id: str) -> TaskUpdate:
+        async with HttpClient.create_aiohttp() as session:
+            async with session.get(
+                f"{self.api_url}/task/{task_id}",
+                headers={"Authorization": f"Bearer {self.api_token}"},
+                timeout=aiohttp.ClientTimeout(total=20.0)
+            ) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to get task status: HTTP {response.status}")
+                data = await response.json()
+
+        if not (data.get('success') and data.get('data', {}).get('found')):
+            return failed_update("Task not found")
+        return parse_jaaz_task(data['data']['task'])
+
+
+def parse_jaaz_task(task: Dict[str, Any]) -> TaskUpdate:
+    """把 Jaaz 任务数据转换为统一的任务状态"""
+    status = task.get('status')
+    if status == 'succeeded':
+        print(f"✅ Task {task.get('id')} completed successfully")
+        return succeeded_update(task)
+    elif status == 'failed':
+        return failed_update(f"Task failed: {task.get('error', 'Unknown error')}", task)
+    elif status == 'cancelled':
+        return failed_update("Task was cancelled", task)
+    elif status in ('pending', 'processing'):
+        return pending_update(task)
+    return failed_update(f"Unknown task status: {status}", task)
 
 
 class JaazService:
@@ -145,15 +199,17 @@ class JaazService:
         self,
         task_id: str,
         max_attempts: Optional[int] = None,
-        interval: Optional[float] = None
+        interval: Optional[float] = None,
+        model: str = ''
     ) -> Dict[str, Any]:
         """
-        等待任务完成并返回结果
+        等待任务完成并返回结果（由 task_tracker 统一轮询）
 
         Args:
             task_id: 任务 ID
-            max_attempts: 最大轮询次数
-            interval: 轮询间隔（秒）
+            max_attempts: 最大轮询次数，与 interval 一起决定超时时间
+            interval: 原固定轮询间隔（秒），现在只用于计算超时时间
+            model: 模型名，用于按历史耗时调整轮询时间
 
         Returns:
             Dict[str, Any]: 任务结果
@@ -161,43 +217,11 @@ class JaazService:
         Raises:
             Exception: 当任务失败或超时时抛出异常
         """
-        max_attempts = max_attempts or 150  # 默认最多轮询 150 次
-        interval = interval or 2.0  # 默认轮询间隔 2 秒
-
-        async with HttpClient.create_aiohttp() as session:
-            for _ in range(max_attempts):
-                async with session.get(
-                    f"{self.api_url}/task/{task_id}",
-                    headers=self._build_headers(),
-                    timeout=aiohttp.ClientTimeout(total=20.0)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get('success') and data.get('data', {}).get('found'):
-                            task = data['data']['task']
-                            status = task.get('status')
-
-                            if status == 'succeeded':
-                                print(
-                                    f"✅ Task {task_id} completed successfully")
-                                return task
-                            elif status == 'failed':
-                                error_msg = task.get('error', 'Unknown error')
-                                raise Exception(f"Task failed: {error_msg}")
-                            elif status == 'cancelled':
-                                raise Exception("Task was cancelled")
-                            elif status == 'processing':
-                                # 继续轮询
-                                await asyncio.sleep(interval)
-                                continue
-                            else:
-                                raise Exception(f"Unknown task status: {status}")
-                        else:
-                            raise Exception("Task not found")
-                    else:
-                        raise Exception(f"Failed to get task status: HTTP {response.status}")
-
-            raise Exception(f"Task polling timeout after {max_attempts} attempts")
+        timeout = (max_attempts or 150) * (interval or 2.0)
+        # 记录远程任务 ID，服务重启后可继续等待
+        await generation_job_service.attach_remote_task(task_id)
+        return await task_tracker.wait(
+            JaazTaskBackend(self.api_url, self.api_token), task_id, model=model, timeout=timeout)
 
     async def generate_magic_image(self, image_content: str) -> Optional[Dict[str, Any]]:
         """
@@ -217,7 +241,7 @@ class JaazService:
                 return {"error": "Failed to create magic task"}
 
             # 2. 等待任务完成
-            result = await self.poll_for_task_completion(task_id, max_attempts=120, interval=5.0) # 10 分钟
+            result = await self.poll_for_task_completion(task_id, max_attempts=120, interval=5.0, model='magic') # 10 分钟
             if not result:
                 print("❌ Magic generation failed")
                 return {"error": "Magic generation failed"}
@@ -279,7 +303,7 @@ class JaazService:
             raise Exception("Failed to create video task")
 
         # 2. 等待任务完成
-        result = await self.poll_for_task_completion(task_id)
+        result = await self.poll_for_task_completion(task_id, model=model)
         if not result:
             raise Exception("Video generation failed")
 
@@ -353,7 +377,7 @@ class JaazService:
         print(f"✅ Seedance video task created: {task_id}")
 
         # 2. 等待任务完成
-        result = await self.poll_for_task_completion(task_id)
+        result = await self.poll_for_task_completion(task_id, model=model)
         if not result:
             raise Exception("Seedance video generation failed")
 
@@ -443,7 +467,7 @@ class JaazService:
             raise Exception("Failed to create Midjourney task")
 
         # 2. 等待任务完成
-        task_result = await self.poll_for_task_completion(task_id, max_attempts=150, interval=2.0)
+        task_result = await self.poll_for_task_completion(task_id, max_attempts=150, interval=2.0, model=model)
         print(f"🎨 Midjourney task result: {task_result}")
         if not task_result:
             raise Exception("Midjourney image generation failed")
@@ -466,3 +490,15 @@ class JaazService:
             bool: 配置是否有效
         """
         return self._is_configured()
+
+
+async def _resume_jaaz_video_job(job: GenerationJob) -> str:
+    """重启后继续等待之前创建的 Jaaz 视频任务"""
+    result = await JaazService().poll_for_task_completion(job['remote_task_id'], model=job.get('model', ''))
+    video_url = result.get('result_url')
+    if not video_url:
+        raise Exception("No video URL returned from generation")
+    return video_url
+
+
+generation_job_service.register_resumer('video', 'jaaz', _resume_jaaz_video_job)
@@ -1,9 +1,16 @@
 # type: ignore[import]
 import traceback
 from typing import Optional, List, Dict, Any, Callable, Awaitable
-from langchain_core.messages import AIMessageChunk, ToolCall, convert_to_openai_messages, ToolMessage
-from langgraph.graph import StateGraph
-import json
+from langchain_core.messages import AIMessageChunk, BaseMessage, ToolCall, convert_to_openai_messages, ToolMessage
+from langgraph.graph.state import CompiledStateGraph
+from nanoid import generate
+from .stream_buffer import StreamOutputBuffer
+from services.tool_confirmation_policy import tool_confirmation_policy
+from services.chat_history_service import chat_history_service
+
+
+# 正在运行的流式处理器，按 session_id 索引，用于消息重新同步
+active_stream_processors: Dict[str, 'StreamProcessor'] = {}
 
 
 class StreamProcessor:
@@ -13,33 +20,61 @@ class StreamProcessor:
         self.session_id = session_id
         self.db_service = db_service
         self.websocket_service = websocket_service
+        # token 级别的 delta 合并成帧后发送
+        self.output = StreamOutputBuffer(session_id, websocket_service)
         self.tool_calls: List[ToolCall] = []
         self.last_saved_message_index = 0
         self.last_streaming_tool_call_id: Optional[str] = None
-
-    async def process_stream(self, swarm: StateGraph, messages: List[Dict[str, Any]], context: Dict[str, Any]) -> None:
+        # 工具确认策略按用户匹配规则
+        self.user_id: Optional[int] = None
+        # 已转换并发送的消息：原始消息与其 OpenAI 格式一一对应，只转换新增或变化的消息
+        self.run_id = generate(size=10)
+        self.message_seq = 0
+        self._raw_messages: List[BaseMessage] = []
+        self._converted_messages: List[List[Dict[str, Any]]] = []
+        self._sent_messages: List[Dict[str, Any]] = []
+        # 模型窗口之前的历史消息，以及窗口开头注入的摘要消息数量；发给前端的始终是完整列表
+        self.history_prefix: List[Dict[str, Any]] = []
+        self.injected = 0
+
+    async def process_stream(self, compiled_swarm: CompiledStateGraph, messages: List[Dict[str, Any]], context: Dict[str, Any],
+                             history_prefix: Optional[List[Dict[str, Any]]] = None, injected: int = 0) -> None:
         """处理整个流式响应
 
         Args:
-            swarm: 智能体群组
-            messages: 消息列表
+            compiled_swarm: 已编译的智能体群组（可能来自缓存，在会话间共享）
+            messages: 送入模型的消息窗口
             context: 上下文信息
+            history_prefix: 窗口之前的历史消息
+            injected: 窗口开头不属于历史的消息数量（历史摘要）
         """
-        self.last_saved_message_index = len(messages) - 1
-
-        compiled_swarm = swarm.compile()
-
-        async for chunk in compiled_swarm.astream(
-            {"messages": messages},
-            config=context,
-            stream_mode=["messages", "custom", 'values']
-        ):
-            await self._handle_chunk(chunk)
+        self.history_prefix = history_prefix or []
+        self.injected = injected
+        self.last_saved_message_index = len(self.history_prefix) + len(messages) - injected - 1
+        self.user_id = context.get('user_id')
+        # 前端已持有本轮之前保存的历史（最后一条是刚发送的用户消息），第一帧也只发送相对它的增量
+        stored = self.history_prefix + messages[injected:]
+        self._sent_messages = stored[:max(0, len(stored) - 1)]
+
+        active_stream_processors[self.session_id] = self
+        try:
+            async for chunk in compiled_swarm.astream(
+                {"messages": messages},
+                config=context,
+                stream_mode=["messages", "custom", 'values']
+            ):
+                await self._handle_chunk(chunk)
+        finally:
+            await self.output.flush()
+            if active_stream_processors.get(self.session_id) is self:
+                del active_stream_processors[self.session_id]
 
         # 发送完成事件
-        await self.websocket_service(self.session_id, {
+        await self.output.push({
             'type': 'done'
         })
+        stats = self.output.stats()
+        print(f"📦 session {self.session_id}: {stats['chunks_received']} delta chunks -> {stats['frames_emitted']} frames")
 
     async def _handle_chunk(self, chunk: Any) -> None:
         # print('👇chunk', chunk)
@@ -51,29 +86,61 @@ class StreamProcessor:
         else:
             await self._handle_message_chunk(chunk[1][0])
 
+    def _convert_messages(self, all_messages: List[BaseMessage]) -> List[Dict[str, Any]]:
+        """增量转换：未变化的原始消息直接复用上一次的转换结果"""
+        converted: List[List[Dict[str, Any]]] = []
+        for i, message in enumerate(all_messages):
+            if i < len(self._raw_messages) and self._raw_messages[i] is message:
+                converted.append(self._converted_messages[i])
+            else:
+                oai = convert_to_openai_messages([message])
+                converted.append(oai if isinstance(oai, list) else [oai])
+        self._raw_messages = list(all_messages)
+        self._converted_messages = converted
+        return [oai for group in converted for oai in group]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """完整消息列表，供前端在丢失增量时重新同步"""
+        return {
+            'type': 'all_messages',
+            'session_id': self.session_id,
+            'run_id': self.run_id,
+            'seq': self.message_seq,
+            'messages': self._sent_messages,
+        }
+
     async def _handle_values_chunk(self, chunk_data: Dict[str, Any]) -> None:
         """处理 values 类型的 chunk"""
         all_messages = chunk_data.get('messages', [])
-        oai_messages = convert_to_openai_messages(all_messages)
-        # 确保 oai_messages 是列表类型
-        if not isinstance(oai_messages, list):
-            oai_messages = [oai_messages] if oai_messages else []
-
-        # 发送所有消息到前端
-        await self.websocket_service(self.session_id, {
-            'type': 'all_messages',
-            'messages': oai_messages
-        })
+        # 去掉注入的摘要消息，补上窗口之前的历史
+        oai_messages = self.history_prefix + \
+            self._convert_messages(all_messages[self.injected:])
+
+        previous = self._sent_messages
+        self._sent_messages = oai_messages
+        self.message_seq += 1
+
+        # 只发送新增或变化的消息；完整列表只在前端重新同步时通过 snapshot() 发送
+        updates = [
+            {'index': i, 'message': message}
+            for i, message in enumerate(oai_messages)
+            if i >= len(previous) or (message is not previous[i] and message != previous[i])
+        ]
+        event: Dict[str, Any] = {
+            'type': 'messages_delta',
+            'run_id': self.run_id,
+            'seq': self.message_seq,
+            'total': len(oai_messages),
+            'updates': updates
+        }
+        if self.message_seq == 1:
+            # 本轮第一帧：前端至少需要持有 base 条已保存的消息
+            event['base'] = len(previous)
+        await self.output.push(event)
 
         # 保存新消息到数据库
         for i in range(self.last_saved_message_index + 1, len(oai_messages)):
-            new_message = oai_messages[i]
-            if len(oai_messages) > 0:  # 确保有消息才保存
-                await self.db_service.create_message(
-                    self.session_id,
-                    new_message.get('role', 'user'),
-                    json.dumps(new_message)
-                )
+            await chat_history_service.save_message(self.session_id, oai_messages[i])
             self.last_saved_message_index = i
 
     async def _handle_message_chunk(self, ai_message_chunk: AIMessageChunk) -> None:
@@ -86,14 +153,14 @@ class StreamProcessor:
                 # 工具调用结果之后会在 values 类型中发送到前端，这里会更快出现一些
                 oai_message = convert_to_openai_messages([ai_message_chunk])[0]
                 print('👇toolcall res oai_message', oai_message)
-                await self.websocket_service(self.session_id, {
+                await self.output.push({
                     'type': 'tool_call_result',
                     'id': ai_message_chunk.tool_call_id,
                     'message': oai_message
                 })
             elif content:
                 # 发送文本内容
-                await self.websocket_service(self.session_id, {
+                await self.output.push({
                     'type': 'delta',
                     'text': content
                 })
@@ -113,28 +180,17 @@ class StreamProcessor:
         self.tool_calls = [tc for tc in tool_calls if tc.get('name')]
         print('😘tool_call event', tool_calls)
 
-        # 需要确认的工具列表
-        TOOLS_REQUIRING_CONFIRMATION = {
-            # 'generate_video_by_kling_v2_jaaz',
-            # 'generate_video_by_seedance_v1_pro_volces',
-            # 'generate_video_by_seedance_v1_lite_i2v',
-            # 'generate_video_by_seedance_v1_lite_t2v',
-            # 'generate_video_by_seedance_v1_jaaz',
-            # 'generate_video_by_hailuo_02_jaaz',
-            'generate_video_by_veo3_fast_jaaz',
-        }
-
         for tool_call in self.tool_calls:
             tool_name = tool_call.get('name')
 
-            # 检查是否需要确认
-            if tool_name in TOOLS_REQUIRING_CONFIRMATION:
-                # 对于需要确认的工具，不在这里发送事件，让工具函数自己处理
+            # 检查是否需要确认（与 AgentManager 包装工具时的 request_confirmation 使用同一策略）
+            if tool_confirmation_policy.requires_confirmation(tool_name, self.user_id):
+                # 对于需要确认的工具，不在这里发送事件，由确认请求发送 tool_call_pending_confirmation
                 print(
                     f'🔄 Tool {tool_name} requires confirmation, skipping StreamProcessor event')
                 continue
             else:
-                await self.websocket_service(self.session_id, {
+                await self.output.push({
                     'type': 'tool_call',
                     'id': tool_call.get('id'),
                     'name': tool_name,
@@ -149,7 +205,7 @@ class StreamProcessor:
                 self.last_streaming_tool_call_id = tool_call_chunk.get('id')
             else:
                 if self.last_streaming_tool_call_id:
-                    await self.websocket_service(self.session_id, {
+                    await self.output.push({
                         'type': 'tool_call_arguments',
                         'id': self.last_streaming_tool_call_id,
                         'text': tool_call_chunk.get('args')
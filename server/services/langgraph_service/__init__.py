@@ -1,3 +1,3 @@
-from .agent_service import langgraph_multi_agent
+from .agent_service import langgraph_multi_agent, summarize_chat_history
 
-__all__ = ['langgraph_multi_agent']
+__all__ = ['langgraph_multi_agent', 'summarize_chat_history']
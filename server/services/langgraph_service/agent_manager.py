@@ -6,6 +6,7 @@ from models.tool_model import ToolInfoJson
 from services.langgraph_service.configs.image_vide_creator_config import ImageVideoCreatorAgentConfig
 from .configs import PlannerAgentConfig, create_handoff_tool, BaseAgentConfig
 from services.tool_service import tool_service
+from services.tool_confirmation_manager import with_confirmation
 
 
 class AgentManager:
@@ -90,11 +91,11 @@ class AgentManager:
             if tool:
                 business_tools.append(tool)
 
-        # 创建并返回 LangGraph 智能体
+        # 创建并返回 LangGraph 智能体；所有工具统一按确认策略在执行前请求确认
         return create_react_agent(
             name=config.name,
             model=model,
-            tools=[*business_tools, *handoff_tools],
+            tools=[with_confirmation(tool) for tool in [*business_tools, *handoff_tools]],
             prompt=config.system_prompt
         )
 
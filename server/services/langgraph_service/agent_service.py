@@ -2,9 +2,13 @@ from models.tool_model import ToolInfoJson
 from services.db_service import db_service
 from .StreamProcessor import StreamProcessor
 from .agent_manager import AgentManager
+from .swarm_cache import swarm_cache
+from services.tool_service import tool_service
+import time
 import traceback
-from utils.http_client import HttpClient
+from utils.llm_client_registry import llm_client_registry
 from langgraph_swarm import create_swarm  # type: ignore
+from langgraph.graph.state import CompiledStateGraph
 from langchain_openai import ChatOpenAI
 from langchain_ollama import ChatOllama
 from services.websocket_service import send_to_websocket  # type: ignore
@@ -13,6 +17,10 @@ from typing import Optional, List, Dict, Any, cast, Set, TypedDict
 from models.config_model import ModelInfo
 
 
+# 生成历史摘要时单条消息的最大字符数
+SUMMARY_MESSAGE_MAX_CHARS = 2000
+
+
 class ContextInfo(TypedDict):
     """Context information passed to tools"""
     canvas_id: str
@@ -81,67 +89,150 @@ async def langgraph_multi_agent(
     session_id: str,
     text_model: ModelInfo,
     tool_list: List[ToolInfoJson],
-    system_prompt: Optional[str] = None
+    system_prompt: Optional[str] = None,
+    history_prefix: Optional[List[Dict[str, Any]]] = None,
+    injected: int = 0,
+    user_id: Optional[int] = None
 ) -> None:
     """多智能体处理函数
 
     Args:
-        messages: 消息历史
+        messages: 送入模型的消息窗口（最近的消息，可能以历史摘要开头）
         canvas_id: 画布ID
         session_id: 会话ID
         text_model: 文本模型配置
         tool_list: 工具模型配置列表（图像或视频模型）
         system_prompt: 系统提示词
+        history_prefix: 窗口之前、未送入模型的历史消息，前端仍需完整列表
+        injected: 窗口开头注入的非历史消息数量（历史摘要）
+        user_id: 登录用户，工具确认策略按用户匹配规则
     """
     try:
         # 0. 修复消息历史
         fixed_messages = _fix_chat_history(messages)
+        history_prefix = history_prefix or []
 
-        # 2. 文本模型
-        text_model_instance = _create_text_model(text_model)
-
-        # 3. 创建智能体
-        agents = AgentManager.create_agents(
-            text_model_instance,
-            tool_list,  # 传入所有注册的工具
-            system_prompt or ""
-        )
-        agent_names = [agent.name for agent in agents]
-        print('👇agent_names', agent_names)
-        last_agent = AgentManager.get_last_active_agent(
-            fixed_messages, agent_names)
-
-        print('👇last_agent', last_agent)
-
-        # 4. 创建智能体群组
-        swarm = create_swarm(
-            agents=agents,  # type: ignore
-            default_active_agent=last_agent if last_agent else agent_names[0]
-        )
+        # 2-4. 获取已编译的智能体群组（按模型与工具列表缓存）
+        build_start = time.perf_counter()
+        compiled_swarm = _get_compiled_swarm(
+            history_prefix + fixed_messages, text_model, tool_list, system_prompt or "")
+        swarm_cache.record_build_time((time.perf_counter() - build_start) * 1000)
+        print(f"🧩 Swarm ready in {swarm_cache.last_build_ms:.1f}ms", swarm_cache.stats())
 
         # 5. 创建上下文
         context = {
             'canvas_id': canvas_id,
             'session_id': session_id,
             'tool_list': tool_list,
+            'user_id': user_id,
         }
 
         # 6. 流处理
         processor = StreamProcessor(
             session_id, db_service, send_to_websocket)  # type: ignore
-        await processor.process_stream(swarm, fixed_messages, context)
+        await processor.process_stream(
+            compiled_swarm, fixed_messages, context, history_prefix, injected)
 
     except Exception as e:
         await _handle_error(e, session_id)
 
 
+def _get_compiled_swarm(
+    messages: List[Dict[str, Any]],
+    text_model: ModelInfo,
+    tool_list: List[ToolInfoJson],
+    system_prompt: str
+) -> CompiledStateGraph:
+    """从缓存获取已编译的智能体群组，未命中时创建智能体并编译"""
+    swarm_cache.sync_tools_version(tool_service.version)
+    key = swarm_cache.make_key(
+        text_model.get('provider'), text_model.get('model'), text_model.get('url'),
+        _text_model_api_key(text_model), tool_list, system_prompt)
+
+    agents = None
+    agent_names = swarm_cache.get_agent_names(key)
+    if agent_names is None:
+        # 3. 创建智能体
+        agents = _create_agents(text_model, tool_list, system_prompt)
+        agent_names = [agent.name for agent in agents]
+    print('👇agent_names', agent_names)
+    last_agent = AgentManager.get_last_active_agent(messages, agent_names)
+    print('👇last_agent', last_agent)
+    default_agent = last_agent if last_agent else agent_names[0]
+
+    compiled_swarm = swarm_cache.get(key, default_agent)
+    if compiled_swarm is None:
+        if agents is None:
+            agents = _create_agents(text_model, tool_list, system_prompt)
+        # 4. 创建智能体群组
+        swarm = create_swarm(
+            agents=agents,  # type: ignore
+            default_active_agent=default_agent
+        )
+        compiled_swarm = swarm.compile()
+        swarm_cache.put(key, default_agent, compiled_swarm, agent_names)
+    return compiled_swarm
+
+
+async def summarize_chat_history(
+    text_model: ModelInfo,
+    previous_summary: Optional[str],
+    messages: List[Dict[str, Any]]
+) -> str:
+    """把滑出上下文窗口的旧消息合并进滚动摘要（复用共享的文本模型实例）"""
+    model = swarm_cache.get_text_model(
+        swarm_cache.make_key(text_model.get('provider'), text_model.get('model'),
+                             text_model.get('url'), _text_model_api_key(text_model)),
+        lambda: _create_text_model(text_model))
+
+    transcript: List[str] = []
+    for msg in messages:
+        content = msg.get('content')
+        if isinstance(content, list):
+            content = ' '.join(part.get('text', '[image]') for part in content if isinstance(part, dict))
+        line = f"{msg.get('role')}: {content or ''}"
+        for tool_call in msg.get('tool_calls') or []:
+            function = tool_call.get('function', {})
+            line += f" [tool call {function.get('name')}: {function.get('arguments', '')}]"
+        # 单条消息过长时截断，工具结果中的大段内容对摘要意义不大
+        transcript.append(line[:SUMMARY_MESSAGE_MAX_CHARS])
+
+    prompt = (
+        "Summarize the conversation below for your own future reference. Keep the user's goals, "
+        "preferences and decisions, the images/videos generated (with their file names) and any "
+        "open tasks. Be concise and write in the language of the conversation.\n\n"
+    )
+    if previous_summary:
+        prompt += f"Summary of the conversation before this part:\n{previous_summary}\n\n"
+    prompt += "Conversation:\n" + "\n".join(transcript)
+
+    response = await model.ainvoke([{'role': 'user', 'content': prompt}])
+    return str(response.content)
+
+
+def _create_agents(text_model: ModelInfo, tool_list: List[ToolInfoJson], system_prompt: str) -> List[Any]:
+    text_model_instance = swarm_cache.get_text_model(
+        swarm_cache.make_key(text_model.get('provider'), text_model.get('model'),
+                             text_model.get('url'), _text_model_api_key(text_model)),
+        lambda: _create_text_model(text_model))
+    return AgentManager.create_agents(
+        text_model_instance,
+        tool_list,  # 传入所有注册的工具
+        system_prompt
+    )
+
+
+def _text_model_api_key(text_model: ModelInfo) -> str:
+    return config_service.app_config.get(  # type: ignore
+        text_model.get('provider'), {}).get("api_key", "")
+
+
 def _create_text_model(text_model: ModelInfo) -> Any:
-    """创建语言模型实例"""
+    """创建语言模型实例（由 swarm_cache 共享）"""
     model = text_model.get('model')
     provider = text_model.get('provider')
     url = text_model.get('url')
-    api_key = config_service.app_config.get(  # type: ignore
-        provider, {}).get("api_key", "")
+    api_key = _text_model_api_key(text_model)
 
     # TODO: Verify if max token is working
     # max_tokens = text_model.get('max_tokens', 8148)
@@ -152,9 +243,9 @@ def _create_text_model(text_model: ModelInfo) -> Any:
             base_url=url,
         )
     else:
-        # Create httpx client with SSL configuration for ChatOpenAI
-        http_client = HttpClient.create_sync_client()
-        http_async_client = HttpClient.create_async_client()
+        # 同一 provider + base URL 共享带并发上限的连接池
+        http_client = llm_client_registry.get_sync_client(provider, url)
+        http_async_client = llm_client_registry.get_async_client(provider, url)
         return ChatOpenAI(
             model=model,
             api_key=api_key,  # type: ignore
@@ -0,0 +1,97 @@
+# type: ignore[import]
+import os
+import asyncio
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+# 合并 delta 的时间窗口（毫秒）与大小上限（字节）
+STREAM_FLUSH_INTERVAL_MS = float(os.environ.get("STREAM_FLUSH_INTERVAL_MS", 16))
+STREAM_FLUSH_BYTES = int(os.environ.get("STREAM_FLUSH_BYTES", 4096))
+
+# 可合并的事件类型：相同类型（和相同 id）的连续文本会拼接成一帧
+COALESCED_EVENT_TYPES = ('delta', 'tool_call_arguments')
+
+
+class StreamOutputBuffer:
+    """会话输出缓冲 - 将 token 级别的 delta 合并成帧后再发送
+
+    连续的 delta / tool_call_arguments 文本在时间窗口内或达到大小上限前累积为一帧；
+    其他事件（tool_call、done 等）会先刷新缓冲，保证事件顺序不变。
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        websocket_service: Callable[[str, Dict[str, Any]], Awaitable[None]],
+        flush_interval_ms: float = STREAM_FLUSH_INTERVAL_MS,
+        flush_bytes: int = STREAM_FLUSH_BYTES,
+    ):
+        self.session_id = session_id
+        self.websocket_service = websocket_service
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_bytes = flush_bytes
+        self._pending: Optional[Dict[str, Any]] = None
+        self._pending_parts: list[str] = []
+        self._pending_size = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock = asyncio.Lock()
+        # 统计：收到的 chunk 数与实际发送的帧数
+        self.chunks_received = 0
+        self.frames_emitted = 0
+
+    async def push(self, event: Dict[str, Any]) -> None:
+        """缓冲可合并的文本事件，其余事件先刷新再立即发送"""
+        if event.get('type') not in COALESCED_EVENT_TYPES:
+            await self.send(event)
+            return
+
+        self.chunks_received += 1
+        text = event.get('text') or ''
+        if self._pending is not None and not self._same_frame(event):
+            await self.flush()
+
+        if self._pending is None:
+            self._pending = {k: v for k, v in event.items() if k != 'text'}
+            self._schedule_flush()
+        self._pending_parts.append(text)
+        self._pending_size += len(text.encode('utf-8'))
+
+        if self._pending_size >= self.flush_bytes:
+            await self.flush()
+
+    async def send(self, event: Dict[str, Any]) -> None:
+        """刷新缓冲后发送一个事件"""
+        await self.flush()
+        async with self._lock:
+            self.frames_emitted += 1
+            await self.websocket_service(self.session_id, event)
+
+    async def flush(self) -> None:
+        self._cancel_timer()
+        async with self._lock:
+            if self._pending is None:
+                return
+            frame = {**self._pending, 'text': ''.join(self._pending_parts)}
+            self._pending = None
+            self._pending_parts = []
+            self._pending_size = 0
+            self.frames_emitted += 1
+            await self.websocket_service(self.session_id, frame)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'chunks_received': self.chunks_received,
+            'frames_emitted': self.frames_emitted,
+        }
+
+    def _same_frame(self, event: Dict[str, Any]) -> bool:
+        return event.get('type') == self._pending.get('type') and event.get('id') == self._pending.get('id')
+
+    def _schedule_flush(self) -> None:
+        if self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval, lambda: asyncio.ensure_future(self.flush()))
+
+    def _cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,107 @@
+import os
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from langgraph.graph.state import CompiledStateGraph
+from services.config_service import config_service
+
+# 缓存的已编译智能体群组数量上限
+SWARM_CACHE_SIZE = int(os.environ.get("SWARM_CACHE_SIZE", 16))
+
+
+class SwarmCache:
+    """已编译智能体群组的 LRU 缓存
+
+    相同模型、provider、工具列表和系统提示词的对话复用同一个编译好的图，以及同一个
+    文本模型实例（及其 HTTP 连接池）。编译后的图不含 checkpointer，可在多个会话间并发使用。
+    配置更新时整体失效。
+    """
+
+    def __init__(self, max_size: int = SWARM_CACHE_SIZE):
+        self.max_size = max_size
+        self._swarms: 'OrderedDict[str, CompiledStateGraph]' = OrderedDict()
+        self._agent_names: Dict[str, List[str]] = {}
+        self._text_models: Dict[str, Any] = {}
+        self._tools_version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.turns = 0
+        self.last_build_ms = 0.0
+        self.total_build_ms = 0.0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        return json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+
+    def get_text_model(self, key: str, factory: Callable[[], Any]) -> Any:
+        """共享的文本模型实例"""
+        model = self._text_models.get(key)
+        if model is None:
+            model = factory()
+            self._text_models[key] = model
+        return model
+
+    def get_agent_names(self, key: str) -> Optional[List[str]]:
+        return self._agent_names.get(key)
+
+    def get(self, key: str, default_agent: str) -> Optional[CompiledStateGraph]:
+        full_key = self.make_key(key, default_agent)
+        swarm = self._swarms.get(full_key)
+        if swarm is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._swarms.move_to_end(full_key)
+        return swarm
+
+    def put(self, key: str, default_agent: str, swarm: CompiledStateGraph, agent_names: List[str]) -> None:
+        """缓存已编译群组
+
+        Args:
+            key: 模型 / 工具列表签名
+            default_agent: 默认激活的智能体，作为键的一部分
+            swarm: 已编译群组
+            agent_names: 群组中的智能体名称，下次无需构建即可判断默认智能体
+        """
+        self._agent_names[key] = agent_names
+        self._swarms[self.make_key(key, default_agent)] = swarm
+        while len(self._swarms) > self.max_size:
+            self._swarms.popitem(last=False)
+
+    def record_build_time(self, elapsed_ms: float) -> None:
+        """记录本轮获取智能体群组的耗时（命中缓存时接近 0）"""
+        self.last_build_ms = elapsed_ms
+        self.total_build_ms += elapsed_ms
+        self.turns += 1
+
+    def sync_tools_version(self, version: int) -> None:
+        """工具集重新加载（如保存 API key 后）时清空缓存"""
+        if self._tools_version is not None and version != self._tools_version:
+            self.invalidate()
+        self._tools_version = version
+
+    def invalidate(self) -> None:
+        """清空缓存（配置或工具变化时调用）"""
+        self._swarms.clear()
+        self._agent_names.clear()
+        self._text_models.clear()
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'size': len(self._swarms),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'text_models': len(self._text_models),
+            'turns': self.turns,
+            'last_build_ms': round(self.last_build_ms, 2),
+            'total_build_ms': round(self.total_build_ms, 2),
+        }
+
+
+swarm_cache = SwarmCache()
+# 模型或 API key 变化后，缓存的文本模型与群组都需要重建
+config_service.add_update_listener(swarm_cache.invalidate)
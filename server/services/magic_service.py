@@ -2,11 +2,12 @@
 
 # Import necessary modules
 import asyncio
-import json
 from typing import Dict, Any, List
 
 # Import service modules
 from services.db_service import db_service
+from services.message_journal import message_journal
+from services.chat_history_service import chat_history_service
 from services.OpenAIAgents_service import create_jaaz_response
 from services.websocket_service import send_to_websocket  # type: ignore
 from services.stream_service import add_stream_task, remove_stream_task
@@ -47,11 +48,10 @@ async def handle_magic(data: Dict[str, Any]) -> None:
         prompt = messages[0].get('content', '')
         await db_service.create_chat_session(session_id, 'gpt', 'jaaz', canvas_id, (prompt[:200] if isinstance(prompt, str) else ''))
 
-    # Save user message to database
+    # Journal user message; it is written together with the AI response.
+    # Going through the history service keeps the session's cached history in sync
     if len(messages) > 0:
-        await db_service.create_message(
-            session_id, messages[-1].get('role', 'user'), json.dumps(messages[-1])
-        )
+        await chat_history_service.save_message(session_id, messages[-1])
 
     # Create and start magic generation task
     task = asyncio.create_task(_process_magic_generation(messages, session_id, canvas_id))
@@ -66,6 +66,8 @@ async def handle_magic(data: Dict[str, Any]) -> None:
     finally:
         # Always remove the task from stream_tasks after completion/cancellation
         remove_stream_task(session_id)
+        # Persist the journaled messages in one batch
+        await message_journal.flush(session_id)
         # Notify frontend WebSocket that magic generation is done
         await send_to_websocket(session_id, {'type': 'done'})
 
@@ -88,8 +90,8 @@ async def _process_magic_generation(
 
     ai_response = await create_jaaz_response(messages, session_id, canvas_id)
 
-    # Save AI response to database
-    await db_service.create_message(session_id, 'assistant', json.dumps(ai_response))
+    # Save AI response to database and the cached history
+    await chat_history_service.save_message(session_id, ai_response)
 
     # Send messages to frontend immediately
     all_messages = messages + [ai_response]
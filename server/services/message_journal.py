@@ -0,0 +1,265 @@
+import os
+import glob
+import json
+import asyncio
+import traceback
+from typing import IO, Any, Dict, List, Optional, TypedDict
+
+from services.config_service import USER_DATA_DIR
+from services.db_service import db_service
+
+# File WAL lokal (append-only, satu baris JSON per entri). Setiap proses menulis ke
+# <nama>.<pid><ext> miliknya sendiri, misalnya message_journal.1234.wal
+MESSAGE_JOURNAL_PATH = os.environ.get(
+    "MESSAGE_JOURNAL_PATH", os.path.join(USER_DATA_DIR, "message_journal.wal"))
+# Interval flush latar belakang (detik)
+MESSAGE_FLUSH_INTERVAL = float(os.environ.get("MESSAGE_FLUSH_INTERVAL", 1.0))
+# Flush segera bila satu sesi memiliki sebanyak ini pesan tertunda
+MESSAGE_FLUSH_BATCH = int(os.environ.get("MESSAGE_FLUSH_BATCH", 32))
+
+
+def _journal_path(base: str, pid: int) -> str:
+    root, ext = os.path.splitext(base)
+    return f"{root}.{pid}{ext}"
+
+
+def _journal_files(base: str) -> List[str]:
+    """Semua file WAL milik proses mana pun (termasuk file lama tanpa pid), terlama dulu"""
+    root, ext = os.path.splitext(base)
+    paths = set(glob.glob(f"{glob.escape(root)}.*{ext}"))
+    if os.path.exists(base):
+        paths.add(base)
+    return sorted(paths, key=lambda path: os.path.getmtime(path) if os.path.exists(path) else 0)
+
+
+def _try_lock(f: IO[str]) -> bool:
+    """
+    Kunci eksklusif tanpa menunggu pada file WAL yang terbuka. Proses pemilik memegang
+    kuncinya selama berjalan; kunci lepas otomatis saat proses berhenti atau crash.
+    """
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _read_uncommitted(f: IO[str]) -> List['JournalEntry']:
+    """Entri WAL yang belum di-commit, berurutan menurut seq"""
+    entries: List[JournalEntry] = []
+    committed: Dict[str, int] = {}
+    f.seek(0)
+    for line in f:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            # Baris terakhir bisa terpotong saat crash
+            continue
+        if 'commit' in record:
+            committed[record['session_id']] = max(committed.get(record['session_id'], 0), record['commit'])
+        else:
+            entries.append(record)
+    return [e for e in sorted(entries, key=lambda e: e['seq']) if e['seq'] > committed.get(e['session_id'], 0)]
+
+
+class JournalEntry(TypedDict):
+    session_id: str
+    seq: int
+    role: str
+    message: str
+
+
+class MessageJournal:
+    """
+    Jurnal pesan chat write-behind.
+
+    Pesan baru langsung dicatat ke WAL lokal lalu dikembalikan tanpa menunggu database;
+    pesan yang tertunda disimpan per sesi dengan satu bulk insert (saat batch penuh, setiap
+    MESSAGE_FLUSH_INTERVAL detik, dan ketika stream selesai atau dibatalkan). Setiap entri
+    memiliki nomor urut (seq) yang naik monoton, dan flush per sesi berjalan berurutan sehingga
+    urutan pesan di chat_messages tetap terjaga. Setelah flush berhasil, WAL mencatat baris
+    commit; saat startup, entri yang belum di-commit diputar ulang ke database.
+
+    Setiap proses (worker) memiliki file WAL dan nomor urutnya sendiri, dikunci selama proses
+    berjalan. Saat startup hanya file yang kuncinya bisa diambil (pemiliknya sudah berhenti)
+    yang diputar ulang dan diambil alih; file milik proses lain yang masih hidup tidak pernah
+    dibaca, dipotong, atau dihapus.
+
+    WAL ditulis ke OS tanpa fsync per pesan: bertahan dari crash proses, bukan dari mati listrik.
+    Jika crash terjadi tepat di antara bulk insert dan baris commit, pesan bisa tersimpan dua kali.
+    """
+
+    def __init__(self, path: str = MESSAGE_JOURNAL_PATH):
+        self.base_path = path
+        self.path = _journal_path(path, os.getpid())
+        self._seq = 0
+        self._pending: Dict[str, List[JournalEntry]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._wal: Optional[Any] = None
+        self._flusher: Optional[asyncio.Task[None]] = None
+        self._flush_tasks: Dict[str, asyncio.Task[None]] = {}
+        self.flushes = 0
+        self.flushed_messages = 0
+        self.failed_flushes = 0
+
+    async def start(self) -> None:
+        """Ambil alih entri WAL yang belum di-commit dari proses yang sudah berhenti, lalu mulai flush latar belakang"""
+        self._open_wal()
+        orphans = self._replay()
+        # Tulis ulang WAL sendiri hanya dengan entri yang belum tersimpan
+        assert self._wal is not None
+        self._wal.seek(0)
+        self._wal.truncate()
+        for entries in self._pending.values():
+            for entry in entries:
+                self._write_wal(dict(entry))
+        # Entri yatim sudah tercatat di WAL sendiri: kosongkan dulu (masih terkunci) lalu hapus
+        for f in orphans:
+            f.truncate(0)
+            f.close()
+            try:
+                os.remove(f.name)
+            except OSError:
+                pass
+        await self.flush_all()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        if self._flusher:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush_all()
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        # Semua pesan sudah tersimpan: WAL proses ini tidak lagi diperlukan
+        if not any(self._pending.values()) and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _open_wal(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._wal = open(self.path, 'a+', encoding='utf-8')
+        if not _try_lock(self._wal):
+            print(f"⚠️ Message journal {self.path} is locked by another process")
+        self._wal.seek(0, os.SEEK_END)
+
+    def _write_wal(self, record: Dict[str, Any]) -> None:
+        if self._wal is None:
+            self._open_wal()
+        assert self._wal is not None
+        self._wal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._wal.flush()
+
+    def _replay(self) -> List[IO[str]]:
+        """
+        Muat entri yang belum di-commit dari WAL sendiri (pid yang dipakai ulang) dan dari WAL
+        yang pemiliknya sudah berhenti. Entri diberi nomor urut baru milik proses ini.
+        Mengembalikan file yatim yang sudah dikunci, untuk dihapus setelah entrinya tersimpan.
+        """
+        assert self._wal is not None
+        orphans: List[IO[str]] = []
+        recovered: List[JournalEntry] = list(_read_uncommitted(self._wal))
+        for path in _journal_files(self.base_path):
+            if os.path.abspath(path) == os.path.abspath(self.path):
+                continue
+            try:
+                f = open(path, 'a+', encoding='utf-8')
+            except OSError:
+                continue
+            if not _try_lock(f):
+                # Dipakai proses yang masih berjalan
+                f.close()
+                continue
+            recovered.extend(_read_uncommitted(f))
+            orphans.append(f)
+
+        for entry in recovered:
+            self._seq += 1
+            self._pending.setdefault(entry['session_id'], []).append({**entry, 'seq': self._seq})
+        for session_id, session_entries in self._pending.items():
+            print(f"📒 Recovering {len(session_entries)} unsaved messages of session {session_id} from journal")
+        return orphans
+
+    def append(self, session_id: str, role: str, message: str) -> int:
+        """Catat pesan ke WAL dan antrean tertunda; mengembalikan nomor urutnya"""
+        self._seq += 1
+        entry: JournalEntry = {'session_id': session_id, 'seq': self._seq, 'role': role, 'message': message}
+        self._write_wal(dict(entry))
+        pending = self._pending.setdefault(session_id, [])
+        pending.append(entry)
+        if len(pending) >= MESSAGE_FLUSH_BATCH and session_id not in self._flush_tasks:
+            task = asyncio.create_task(self.flush(session_id))
+            self._flush_tasks[session_id] = task
+            task.add_done_callback(lambda _: self._flush_tasks.pop(session_id, None))
+        return self._seq
+
+    async def read_session(self, session_id: str) -> List[Dict[str, Any]]:
+        """Riwayat sesi dari database ditambah pesan yang belum di-flush"""
+        async with self._lock(session_id):
+            messages = await db_service.get_chat_history(session_id)
+            messages.extend(json.loads(e['message']) for e in self._pending.get(session_id, []))
+            return messages
+
+    async def count_session(self, session_id: str) -> int:
+        """Jumlah pesan sesi (tersimpan ditambah tertunda), sama dengan panjang read_session"""
+        async with self._lock(session_id):
+            return await db_service.count_chat_messages(session_id) + len(self._pending.get(session_id, []))
+
+    def _lock(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks.get(session_id)
+        if lock is None:
+            lock = self._locks[session_id] = asyncio.Lock()
+        return lock
+
+    async def flush(self, session_id: str) -> None:
+        """Simpan semua pesan tertunda satu sesi dengan satu bulk insert"""
+        async with self._lock(session_id):
+            batch = list(self._pending.get(session_id, []))
+            if not batch:
+                return
+            try:
+                await db_service.create_messages(session_id, [(e['role'], e['message']) for e in batch])
+            except Exception as e:
+                # Pesan tetap tertunda dan dicoba lagi pada flush berikutnya
+                self.failed_flushes += 1
+                print(f"Error flushing {len(batch)} messages of session {session_id}: {e}")
+                traceback.print_exc()
+                return
+            pending = self._pending[session_id]
+            del pending[:len(batch)]
+            if not pending:
+                del self._pending[session_id]
+            self._write_wal({'session_id': session_id, 'commit': batch[-1]['seq']})
+            self.flushes += 1
+            self.flushed_messages += len(batch)
+
+    async def flush_all(self) -> None:
+        for session_id in list(self._pending):
+            await self.flush(session_id)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(MESSAGE_FLUSH_INTERVAL)
+            await self.flush_all()
+            # Tidak ada pesan tertunda: kosongkan WAL agar tidak tumbuh tanpa batas
+            if not self._pending and self._wal is not None and self._wal.tell() > 0:
+                self._wal.seek(0)
+                self._wal.truncate()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending_sessions': len(self._pending),
+            'pending_messages': sum(len(entries) for entries in self._pending.values()),
+            'flushes': self.flushes,
+            'flushed_messages': self.flushed_messages,
+            'failed_flushes': self.failed_flushes,
+        }
+
+
+message_journal = MessageJournal()
@@ -4,10 +4,14 @@ from services.migrations.v1_initial_schema import V1InitialSchema
 from services.migrations.v2_add_canvases import V2AddCanvases
 from services.migrations.v4_add_user_auth_tables import V4AddUserAuthTables
 from services.migrations.v5_add_user_roles_and_root import V5AddUserRolesAndRoot
+from services.migrations.v6_add_comfy_workflows import V6AddComfyWorkflows
+from services.migrations.v7_add_canvas_ops import V7AddCanvasOps
+from services.migrations.v8_add_generation_jobs import V8AddGenerationJobs
+from services.migrations.v9_add_generation_job_owner import V9AddGenerationJobOwner
 from . import Migration
 
 # Database version
-CURRENT_VERSION = 5
+CURRENT_VERSION = 9
 
 ALL_MIGRATIONS = [
     {
@@ -26,6 +30,22 @@ ALL_MIGRATIONS = [
         'version': 5, 
         'migration': V5AddUserRolesAndRoot, 
     },
+    {
+        'version': 6,
+        'migration': V6AddComfyWorkflows,
+    },
+    {
+        'version': 7,
+        'migration': V7AddCanvasOps,
+    },
+    {
+        'version': 8,
+        'migration': V8AddGenerationJobs,
+    },
+    {
+        'version': 9,
+        'migration': V9AddGenerationJobOwner,
+    },
 ]
 class MigrationManager:
     def get_migrations_to_apply(self, current_version: int, target_version: int) -> List[Type[Migration]]:
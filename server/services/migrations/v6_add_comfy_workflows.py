@@ -0,0 +1,28 @@
+from . import Migration
+import sqlite3
+
+
+class V6AddComfyWorkflows(Migration):
+    version = 6
+    description = "Add comfy_workflows table"
+
+    def up(self, conn: sqlite3.Connection) -> None:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS comfy_workflows (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                api_json TEXT,
+                description TEXT,
+                inputs TEXT,
+                outputs TEXT,
+                created_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now')),
+                updated_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now'))
+            )
+        """)
+
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_comfy_workflows_updated_at ON comfy_workflows(updated_at DESC, id DESC)
+        """)
+
+    def down(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DROP TABLE IF EXISTS comfy_workflows")
@@ -0,0 +1,36 @@
+from . import Migration
+import sqlite3
+
+
+class V7AddCanvasOps(Migration):
+    version = 7
+    description = "Add canvas patch log and snapshot versioning"
+
+    def up(self, conn: sqlite3.Connection) -> None:
+        cursor = conn.execute("PRAGMA table_info(canvases)")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        # version is bumped by every snapshot write (full save or compaction)
+        if 'version' not in columns:
+            conn.execute("ALTER TABLE canvases ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        # ops_seq is the last canvas_ops.seq already folded into the snapshot
+        if 'ops_seq' not in columns:
+            conn.execute("ALTER TABLE canvases ADD COLUMN ops_seq INTEGER NOT NULL DEFAULT 0")
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS canvas_ops (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                canvas_id TEXT NOT NULL,
+                op TEXT NOT NULL,
+                element_id TEXT,
+                payload TEXT,
+                created_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now'))
+            )
+        """)
+
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_canvas_ops_canvas_id_seq ON canvas_ops(canvas_id, seq)
+        """)
+
+    def down(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DROP TABLE IF EXISTS canvas_ops")
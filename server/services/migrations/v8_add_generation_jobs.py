@@ -0,0 +1,33 @@
+from . import Migration
+import sqlite3
+
+
+class V8AddGenerationJobs(Migration):
+    version = 8
+    description = "Add generation_jobs table for resumable image/video generations"
+
+    def up(self, conn: sqlite3.Connection) -> None:
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS generation_jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                model TEXT,
+                remote_task_id TEXT,
+                canvas_id TEXT,
+                session_id TEXT,
+                status TEXT NOT NULL,
+                result_url TEXT,
+                error TEXT,
+                created_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now')),
+                updated_at TEXT DEFAULT (STRFTIME('%Y-%m-%dT%H:%M:%fZ', 'now'))
+            )
+        """)
+
+        # Startup only looks for jobs that have not finished yet
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_generation_jobs_status ON generation_jobs(status)
+        """)
+
+    def down(self, conn: sqlite3.Connection) -> None:
+        conn.execute("DROP TABLE IF EXISTS generation_jobs")
@@ -0,0 +1,22 @@
+from . import Migration
+import sqlite3
+
+
+class V9AddGenerationJobOwner(Migration):
+    version = 9
+    description = "Add owner and heartbeat to generation_jobs"
+
+    def up(self, conn: sqlite3.Connection) -> None:
+        cursor = conn.execute("PRAGMA table_info(generation_jobs)")
+        columns = [column[1] for column in cursor.fetchall()]
+
+        # Worker process that is running or resuming the job
+        if 'owner_id' not in columns:
+            conn.execute("ALTER TABLE generation_jobs ADD COLUMN owner_id TEXT")
+        # Unix time of the owner's last heartbeat; NULL means no live owner
+        if 'heartbeat_at' not in columns:
+            conn.execute("ALTER TABLE generation_jobs ADD COLUMN heartbeat_at REAL")
+
+    def down(self, conn: sqlite3.Connection) -> None:
+        conn.execute("ALTER TABLE generation_jobs DROP COLUMN heartbeat_at")
+        conn.execute("ALTER TABLE generation_jobs DROP COLUMN owner_id")
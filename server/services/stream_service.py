@@ -1,10 +1,202 @@
 # services/stream_service.py
-from typing import Dict, Optional, Any
+from typing import Awaitable, Callable, Dict, Optional, Any, Set
 import asyncio
+import json
+import os
+import traceback
+from nanoid import generate
+from services.websocket_state import MESSAGE_QUEUE_URL
 
-# Dictionary to store active stream tasks, keyed by session_id
+# Dictionary to store active stream tasks of this worker, keyed by session_id
 stream_tasks: Dict[str, asyncio.Task[Any]] = {}
 
+STREAM_TASKS_KEY = os.environ.get("STREAM_TASKS_KEY", "jaaz:stream_tasks")
+STREAM_CONTROL_CHANNEL = os.environ.get("STREAM_CONTROL_CHANNEL", "jaaz:stream_control")
+# Each live worker refreshes STREAM_WORKER_KEY_PREFIX<worker id> with a TTL; sessions owned
+# by a worker whose key expired are treated as not running
+STREAM_WORKER_KEY_PREFIX = os.environ.get("STREAM_WORKER_KEY_PREFIX", "jaaz:stream_worker:")
+STREAM_WORKER_HEARTBEAT_INTERVAL = 10
+STREAM_WORKER_TTL = 30
+
+# Handlers for control messages, keyed by type. Messages with a session_id only reach the
+# worker running that session; broadcasts reach every other worker. 'cancel' is handled
+# by the registry itself.
+StreamControlHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+stream_control_handlers: Dict[str, StreamControlHandler] = {}
+
+
+def register_stream_control_handler(message_type: str, handler: StreamControlHandler) -> None:
+    stream_control_handlers[message_type] = handler
+
+
+class StreamTaskRegistry:
+    """
+    In-memory registry of running stream tasks. Cancellation only reaches tasks of
+    this worker; RedisStreamTaskRegistry extends it across workers.
+    """
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def add(self, session_id: str, task: asyncio.Task[Any]) -> None:
+        stream_tasks[session_id] = task
+
+    def remove(self, session_id: str) -> None:
+        stream_tasks.pop(session_id, None)
+
+    def get(self, session_id: str) -> Optional[asyncio.Task[Any]]:
+        return stream_tasks.get(session_id)
+
+    def cancel_local(self, session_id: str) -> bool:
+        task = stream_tasks.get(session_id)
+        if task and not task.done():
+            task.cancel()
+            return True
+        return False
+
+    async def cancel(self, session_id: str) -> bool:
+        return self.cancel_local(session_id)
+
+    async def forward(self, session_id: str, message: Dict[str, Any]) -> bool:
+        """
+        Deliver a control message to the worker running the session's stream.
+        Returns False if no other worker runs it.
+        """
+        return False
+
+    async def broadcast(self, message: Dict[str, Any]) -> bool:
+        """Deliver a control message to every other worker. Returns False without a message queue."""
+        return False
+
+
+class RedisStreamTaskRegistry(StreamTaskRegistry):
+    """
+    Registry shared through a Redis-compatible server: running sessions are recorded in a
+    hash (session_id -> worker id) and control messages (cancel, resync, tool confirmations)
+    are published to every worker; only the worker running the session acts on them.
+
+    A session is only forwarded to if its worker's heartbeat key is still alive; entries of
+    dead workers are dropped so callers fall back to "not found".
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as aioredis  # optional dependency, only needed with MESSAGE_QUEUE_URL
+
+        self._redis = aioredis.from_url(url)
+        self.worker_id = generate(size=10)
+        self._listener: Optional[asyncio.Task[None]] = None
+        self._heartbeat: Optional[asyncio.Task[None]] = None
+        self._pending_writes: Set[asyncio.Task[Any]] = set()
+
+    @staticmethod
+    def _worker_key(worker_id: str) -> str:
+        return f"{STREAM_WORKER_KEY_PREFIX}{worker_id}"
+
+    async def start(self) -> None:
+        await self._redis.set(self._worker_key(self.worker_id), 1, ex=STREAM_WORKER_TTL)
+        self._listener = asyncio.create_task(self._listen())
+        self._heartbeat = asyncio.create_task(self._beat())
+
+    async def stop(self) -> None:
+        if self._listener:
+            self._listener.cancel()
+        if self._heartbeat:
+            self._heartbeat.cancel()
+        if stream_tasks:
+            await self._redis.hdel(STREAM_TASKS_KEY, *stream_tasks.keys())
+        await self._redis.delete(self._worker_key(self.worker_id))
+        await self._redis.aclose()
+
+    async def _beat(self) -> None:
+        while True:
+            await asyncio.sleep(STREAM_WORKER_HEARTBEAT_INTERVAL)
+            try:
+                await self._redis.set(self._worker_key(self.worker_id), 1, ex=STREAM_WORKER_TTL)
+            except Exception as e:
+                print(f"Stream worker heartbeat error: {e}")
+
+    def add(self, session_id: str, task: asyncio.Task[Any]) -> None:
+        super().add(session_id, task)
+        self._write(self._redis.hset(STREAM_TASKS_KEY, session_id, self.worker_id))
+
+    def remove(self, session_id: str) -> None:
+        super().remove(session_id)
+        self._write(self._redis.hdel(STREAM_TASKS_KEY, session_id))
+
+    async def cancel(self, session_id: str) -> bool:
+        if self.cancel_local(session_id):
+            return True
+        return await self.forward(session_id, {'type': 'cancel'})
+
+    async def forward(self, session_id: str, message: Dict[str, Any]) -> bool:
+        owner = await self._redis.hget(STREAM_TASKS_KEY, session_id)
+        if owner is None:
+            return False
+        owner = owner.decode() if isinstance(owner, bytes) else str(owner)
+        if not await self._redis.exists(self._worker_key(owner)):
+            # The owning worker died without removing its sessions
+            await self._redis.hdel(STREAM_TASKS_KEY, session_id)
+            return False
+        await self._redis.publish(STREAM_CONTROL_CHANNEL, json.dumps({**message, 'session_id': session_id}))
+        return True
+
+    async def broadcast(self, message: Dict[str, Any]) -> bool:
+        await self._redis.publish(STREAM_CONTROL_CHANNEL, json.dumps({**message, 'origin': self.worker_id}))
+        return True
+
+    def _write(self, coro: Any) -> None:
+        # add/remove are called synchronously by the chat handlers
+        task = asyncio.ensure_future(coro)
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    await pubsub.subscribe(STREAM_CONTROL_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message.get('type') == 'message':
+                            await self._handle_control(json.loads(message['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Stream cancel listener error: {e}")
+                traceback.print_exc()
+                await asyncio.sleep(1)
+
+    async def _handle_control(self, message: Dict[str, Any]) -> None:
+        session_id = message.get('session_id')
+        if session_id is not None and session_id not in stream_tasks:
+            return
+        if message.get('origin') == self.worker_id:
+            return
+        if message['type'] == 'cancel':
+            self.cancel_local(session_id)
+            return
+        handler = stream_control_handlers.get(message['type'])
+        if handler is None:
+            print(f"Unknown stream control message: {message['type']}")
+            return
+        try:
+            await handler(message)
+        except Exception as e:
+            print(f"Stream control handler error ({message['type']}): {e}")
+            traceback.print_exc()
+
+
+def create_stream_task_registry() -> StreamTaskRegistry:
+    if MESSAGE_QUEUE_URL and not MESSAGE_QUEUE_URL.startswith("memory://"):
+        return RedisStreamTaskRegistry(MESSAGE_QUEUE_URL)
+    return StreamTaskRegistry()
+
+
+stream_task_registry = create_stream_task_registry()
+
+
 def add_stream_task(session_id: str, task: asyncio.Task[Any]) -> None:
     """
     Add a stream task for the given session_id.
@@ -13,7 +205,7 @@ def add_stream_task(session_id: str, task: asyncio.Task[Any]) -> None:
         session_id (str): Unique identifier for the session.
         task: The task object to associate with the session.
     """
-    stream_tasks[session_id] = task
+    stream_task_registry.add(session_id, task)
 
 def remove_stream_task(session_id: str) -> None:
     """
@@ -22,11 +214,11 @@ def remove_stream_task(session_id: str) -> None:
     Args:
         session_id (str): Unique identifier for the session.
     """
-    stream_tasks.pop(session_id, None)
+    stream_task_registry.remove(session_id)
 
 def get_stream_task(session_id: str) -> Optional[asyncio.Task[Any]]:
     """
-    Retrieve the stream task associated with the given session_id.
+    Retrieve the stream task associated with the given session_id on this worker.
 
     Args:
         session_id (str): Unique identifier for the session.
@@ -34,6 +226,43 @@ def get_stream_task(session_id: str) -> Optional[asyncio.Task[Any]]:
     Returns:
         The task object if found, otherwise None.
     """
-    return stream_tasks.get(session_id)
+    return stream_task_registry.get(session_id)
+
+async def forward_to_stream_worker(session_id: str, message: Dict[str, Any]) -> bool:
+    """
+    Send a control message to the worker running the stream of the given session_id.
+
+    Args:
+        session_id (str): Unique identifier for the session.
+        message: Payload with a 'type' registered through register_stream_control_handler.
+
+    Returns:
+        True if another worker runs the session and the message was published.
+    """
+    return await stream_task_registry.forward(session_id, message)
+
+async def broadcast_to_workers(message: Dict[str, Any]) -> bool:
+    """
+    Send a control message to every other worker.
+
+    Args:
+        message: Payload with a 'type' registered through register_stream_control_handler.
+
+    Returns:
+        True if the message was published (a message queue is configured).
+    """
+    return await stream_task_registry.broadcast(message)
+
+async def cancel_stream_task(session_id: str) -> bool:
+    """
+    Cancel the stream task of the given session_id, whichever worker runs it.
+
+    Args:
+        session_id (str): Unique identifier for the session.
+
+    Returns:
+        True if a running task was found and cancellation was requested.
+    """
+    return await stream_task_registry.cancel(session_id)
 
 # 你也可以加一个 list_stream_tasks() 返回所有 session_id
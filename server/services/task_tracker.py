@@ -0,0 +1,311 @@
+"""
+长时间运行的生成任务跟踪服务
+
+Jaaz、Volces、Replicate 等 provider 的生成任务提交后需要查询状态直到完成。所有等待中的任务
+按 provider + 凭据分组，每组只有一个轮询循环：
+- 轮询间隔按指数退避增长并加入随机抖动，避免大量任务同时查询；
+- 首次查询时间根据该 provider / 模型的历史完成耗时估算（EWMA，持久化到 USER_DATA_DIR）；
+- API 支持时，同一组中到期的任务合并为一次批量查询；
+- provider 通过 webhook 推送完成结果时（/api/webhooks/{provider}），直接结束等待，不再轮询。
+"""
+
+import os
+import json
+import time
+import random
+import asyncio
+import traceback
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple, TypedDict
+from services.config_service import USER_DATA_DIR
+
+# 历史完成耗时文件
+TASK_TIMINGS_PATH = os.path.join(USER_DATA_DIR, "task_timings.json")
+# 对外可访问的服务地址，配置后 provider 可通过 webhook 推送任务结果
+TASK_WEBHOOK_BASE_URL = os.environ.get("TASK_WEBHOOK_BASE_URL", "").rstrip("/")
+# webhook 校验令牌，未配置时不接受 webhook
+TASK_WEBHOOK_SECRET = os.environ.get("TASK_WEBHOOK_SECRET", "")
+# 连续查询失败多少次后放弃任务
+TASK_MAX_POLL_ERRORS = 5
+# 历史耗时 EWMA 的平滑系数
+TASK_TIMING_ALPHA = 0.3
+
+TaskState = Literal['pending', 'succeeded', 'failed']
+
+
+class TaskUpdate(TypedDict):
+    state: TaskState
+    # provider 返回的任务数据
+    data: Dict[str, Any]
+    error: Optional[str]
+
+
+# webhook 解析器：请求体 -> (任务 ID, 状态)，无法识别时返回 None
+WebhookParser = Callable[[Dict[str, Any]], Optional[Tuple[str, TaskUpdate]]]
+
+
+@dataclass
+class PollProfile:
+    """轮询参数（秒）"""
+    min_interval: float = 2.0
+    max_interval: float = 30.0
+    factor: float = 1.5
+    # 间隔的随机抖动比例
+    jitter: float = 0.2
+    timeout: float = 600.0
+
+
+class TaskBackend(ABC):
+    """查询某个 provider 任务状态的后端
+
+    子类实现 fetch()；key 相同的后端共用一个轮询循环（通常为 provider + 地址 + 凭据）。
+    """
+    provider: str = ''
+    # 单次查询最多包含的任务数，1 表示 API 不支持批量查询
+    max_batch: int = 1
+    profile: PollProfile = PollProfile()
+
+    @property
+    def key(self) -> str:
+        return self.provider
+
+    @abstractmethod
+    async def fetch(self, task_ids: List[str]) -> Dict[str, TaskUpdate]:
+        """查询任务状态；结果中缺少的任务视为仍在进行中"""
+        pass
+
+
+@dataclass
+class _Watch:
+    task_id: str
+    model: str
+    future: 'asyncio.Future[Dict[str, Any]]'
+    submitted_at: float
+    next_poll: float
+    attempts: int = 0
+    errors: int = 0
+
+
+@dataclass
+class _PollGroup:
+    backend: TaskBackend
+    watches: Dict[str, _Watch] = field(default_factory=dict)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional['asyncio.Task[None]'] = None
+
+
+def pending_update(data: Optional[Dict[str, Any]] = None) -> TaskUpdate:
+    return {'state': 'pending', 'data': data or {}, 'error': None}
+
+
+def succeeded_update(data: Dict[str, Any]) -> TaskUpdate:
+    return {'state': 'succeeded', 'data': data, 'error': None}
+
+
+def failed_update(error: str, data: Optional[Dict[str, Any]] = None) -> TaskUpdate:
+    return {'state': 'failed', 'data': data or {}, 'error': error}
+
+
+class TaskTracker:
+    """集中的任务轮询器"""
+
+    def __init__(self):
+        self._groups: Dict[str, _PollGroup] = {}
+        self._timings: Dict[str, float] = {}
+        self._webhook_parsers: Dict[str, WebhookParser] = {}
+        self.polls = 0
+        self.webhook_completions = 0
+
+    async def start(self) -> None:
+        """加载历史完成耗时"""
+        if not os.path.exists(TASK_TIMINGS_PATH):
+            return
+        try:
+            with open(TASK_TIMINGS_PATH, 'r', encoding='utf-8') as f:
+                self._timings = json.load(f)
+        except Exception as e:
+            print(f"❌ Failed to load task timings: {e}")
+
+    async def stop(self) -> None:
+        for group in self._groups.values():
+            if group.task:
+                group.task.cancel()
+        self._groups.clear()
+        try:
+            os.makedirs(os.path.dirname(TASK_TIMINGS_PATH), exist_ok=True)
+            with open(TASK_TIMINGS_PATH, 'w', encoding='utf-8') as f:
+                json.dump(self._timings, f)
+        except Exception as e:
+            print(f"❌ Failed to save task timings: {e}")
+
+    # ========== 历史耗时 ==========
+
+    @staticmethod
+    def _timing_key(provider: str, model: str) -> str:
+        return f"{provider}/{model}"
+
+    def expected_duration(self, provider: str, model: str) -> Optional[float]:
+        return self._timings.get(self._timing_key(provider, model))
+
+    def _record_duration(self, provider: str, model: str, seconds: float) -> None:
+        key = self._timing_key(provider, model)
+        previous = self._timings.get(key)
+        self._timings[key] = seconds if previous is None else \
+            previous + TASK_TIMING_ALPHA * (seconds - previous)
+
+    def _first_delay(self, backend: TaskBackend, model: str) -> float:
+        """首次查询：在预计完成时间的 80% 左右查询，没有历史数据时使用最小间隔"""
+        profile = backend.profile
+        expected = self.expected_duration(backend.provider, model)
+        if expected is None:
+            return profile.min_interval
+        return max(profile.min_interval, expected * 0.8)
+
+    @staticmethod
+    def _next_delay(profile: PollProfile, attempts: int) -> float:
+        delay = min(profile.max_interval, profile.min_interval * profile.factor ** attempts)
+        return delay * random.uniform(1 - profile.jitter, 1 + profile.jitter)
+
+    # ========== 等待任务 ==========
+
+    async def wait(
+        self,
+        backend: TaskBackend,
+        task_id: str,
+        model: str = '',
+        timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """等待任务完成，返回 provider 的任务数据
+
+        Raises:
+            Exception: 任务失败、多次查询出错或超时
+        """
+        group = self._groups.get(backend.key)
+        if group is None:
+            group = self._groups[backend.key] = _PollGroup(backend=backend)
+        if group.task is None or group.task.done():
+            group.task = asyncio.create_task(self._run_group(backend.key, group))
+
+        now = time.monotonic()
+        watch = _Watch(
+            task_id=task_id,
+            model=model,
+            future=asyncio.get_running_loop().create_future(),
+            submitted_at=now,
+            next_poll=now + self._first_delay(backend, model),
+        )
+        group.watches[task_id] = watch
+        group.wakeup.set()
+
+        timeout = timeout or backend.profile.timeout
+        try:
+            return await asyncio.wait_for(asyncio.shield(watch.future), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"Task {task_id} polling timeout after {timeout:.0f}s")
+        finally:
+            group.watches.pop(task_id, None)
+
+    def _resolve(self, provider: str, watch: _Watch, update: TaskUpdate) -> None:
+        if watch.future.done():
+            return
+        if update['state'] == 'succeeded':
+            self._record_duration(provider, watch.model, time.monotonic() - watch.submitted_at)
+            watch.future.set_result(update['data'])
+        else:
+            watch.future.set_exception(Exception(update['error'] or 'Task failed'))
+
+    async def _run_group(self, key: str, group: _PollGroup) -> None:
+        backend = group.backend
+        while True:
+            active = [w for w in group.watches.values() if not w.future.done()]
+            if not active:
+                break
+            now = time.monotonic()
+            # 支持批量查询时，把即将到期的任务也并入本次查询
+            horizon = now + (backend.profile.min_interval / 2 if backend.max_batch > 1 else 0)
+            due = [w for w in active if w.next_poll <= horizon]
+            if not due:
+                next_poll = min(w.next_poll for w in active)
+                group.wakeup.clear()
+                try:
+                    await asyncio.wait_for(group.wakeup.wait(), timeout=max(0.0, next_poll - horizon))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            batches = [due[i:i + backend.max_batch] for i in range(0, len(due), backend.max_batch)]
+            await asyncio.gather(*(self._poll_batch(backend, batch) for batch in batches))
+
+        if self._groups.get(key) is group:
+            del self._groups[key]
+
+    async def _poll_batch(self, backend: TaskBackend, batch: List[_Watch]) -> None:
+        self.polls += 1
+        try:
+            updates = await backend.fetch([w.task_id for w in batch])
+            error = None
+        except Exception as e:
+            traceback.print_exc()
+            updates = {}
+            error = str(e)
+
+        # 同一批次的任务使用相同的下次查询时间，下次仍合并查询
+        next_poll = time.monotonic() + self._next_delay(backend.profile, max(w.attempts for w in batch) + 1)
+        for watch in batch:
+            update = updates.get(watch.task_id)
+            if error is not None:
+                watch.errors += 1
+                if watch.errors >= TASK_MAX_POLL_ERRORS:
+                    self._resolve(backend.provider, watch, failed_update(f"Failed to get task status: {error}"))
+                    continue
+            elif update is not None and update['state'] != 'pending':
+                self._resolve(backend.provider, watch, update)
+                continue
+            else:
+                watch.errors = 0
+            watch.attempts += 1
+            watch.next_poll = next_poll
+
+    # ========== webhook ==========
+
+    def register_webhook(self, provider: str, parser: WebhookParser) -> None:
+        self._webhook_parsers[provider] = parser
+
+    def webhook_url(self, provider: str) -> Optional[str]:
+        """provider 推送结果的地址；未配置公开地址或令牌时返回 None，只使用轮询"""
+        if not TASK_WEBHOOK_BASE_URL or not TASK_WEBHOOK_SECRET or provider not in self._webhook_parsers:
+            return None
+        return f"{TASK_WEBHOOK_BASE_URL}/api/webhooks/{provider}?token={TASK_WEBHOOK_SECRET}"
+
+    def handle_webhook(self, provider: str, payload: Dict[str, Any]) -> bool:
+        """处理 provider 推送的结果，返回是否结束了某个等待中的任务"""
+        parser = self._webhook_parsers.get(provider)
+        parsed = parser(payload) if parser else None
+        if parsed is None:
+            return False
+        task_id, update = parsed
+        if update['state'] == 'pending':
+            return False
+        for group in self._groups.values():
+            watch = group.watches.get(task_id)
+            if watch is not None and group.backend.provider == provider:
+                self._resolve(provider, watch, update)
+                self.webhook_completions += 1
+                return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        pending: Dict[str, int] = {}
+        for group in self._groups.values():
+            provider = group.backend.provider
+            pending[provider] = pending.get(provider, 0) + len(group.watches)
+        return {
+            'pending': pending,
+            'polls': self.polls,
+            'webhook_completions': self.webhook_completions,
+            'expected_durations': {k: round(v, 1) for k, v in self._timings.items()},
+        }
+
+
+task_tracker = TaskTracker()
@@ -1,7 +1,16 @@
+import json
 import asyncio
 from typing import Dict, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool
+from services.tool_confirmation_policy import tool_confirmation_policy
+from services.websocket_service import send_to_websocket
+
+# 后台清理过期确认请求的间隔（秒）
+CONFIRMATION_REAP_INTERVAL = 30
 
 
 @dataclass
@@ -12,75 +21,159 @@ class ToolConfirmationRequest:
     arguments: Dict[str, Any]
     created_at: datetime
     confirmed: Optional[bool] = None
+    # 用户确认/取消时直接完成，等待方立即被唤醒
+    future: Optional['asyncio.Future[bool]'] = field(default=None, repr=False)
 
 
 class ToolConfirmationManager:
-    """工具确认管理器"""
+    """工具确认管理器
+
+    每个待确认的工具调用持有一个 future，/api/tool_confirmation 确认或取消时直接完成它，
+    不再轮询。是否需要确认由 tool_confirmation_policy 决定；后台清理任务会处理超时的请求。
+    """
 
     def __init__(self):
         self.pending_confirmations: Dict[str, ToolConfirmationRequest] = {}
         self.confirmation_timeout = timedelta(minutes=5)  # 5分钟超时
+        self._reaper: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        self._reaper = asyncio.create_task(self._reap_expired())
+
+    async def stop(self) -> None:
+        if self._reaper:
+            self._reaper.cancel()
+            self._reaper = None
+        # 关闭时取消所有仍在等待的确认
+        for tool_call_id in list(self.pending_confirmations):
+            self.cancel_confirmation(tool_call_id)
+
+    async def request_confirmation(self, tool_call_id: str, session_id: str, tool_name: str, arguments: Dict[str, Any], user_id: Optional[int] = None) -> bool:
+        """请求工具确认，返回是否已确认；策略允许自动批准时直接返回 True"""
+        if not tool_confirmation_policy.requires_confirmation(tool_name, user_id):
+            print(f'🔐 Tool {tool_name} auto-approved by confirmation policy')
+            return True
 
-    async def request_confirmation(self, tool_call_id: str, session_id: str, tool_name: str, arguments: Dict[str, Any]) -> bool:
-        """请求工具确认，返回是否已确认"""
         request = ToolConfirmationRequest(
             tool_call_id=tool_call_id,
             session_id=session_id,
             tool_name=tool_name,
             arguments=arguments,
-            created_at=datetime.now()
+            created_at=datetime.now(),
+            future=asyncio.get_running_loop().create_future(),
         )
-
         self.pending_confirmations[tool_call_id] = request
 
+        # 通知前端显示确认框
+        await send_to_websocket(session_id, {
+            'type': 'tool_call_pending_confirmation',
+            'id': tool_call_id,
+            'name': tool_name,
+            'arguments': json.dumps(arguments)
+        })
+
         # 等待确认或超时
         try:
-            await asyncio.wait_for(
-                self._wait_for_confirmation(tool_call_id),
+            return await asyncio.wait_for(
+                asyncio.shield(request.future),  # type: ignore
                 timeout=self.confirmation_timeout.total_seconds()
             )
-            return request.confirmed is True
         except asyncio.TimeoutError:
             # 超时，自动取消
             self.cancel_confirmation(tool_call_id)
             return False
+        finally:
+            self.pending_confirmations.pop(tool_call_id, None)
 
-    async def _wait_for_confirmation(self, tool_call_id: str):
-        """等待确认"""
-        while tool_call_id in self.pending_confirmations:
-            request = self.pending_confirmations[tool_call_id]
-            if request.confirmed is not None:
-                return
-            await asyncio.sleep(0.1)
+    def _resolve(self, tool_call_id: str, confirmed: bool) -> bool:
+        request = self.pending_confirmations.get(tool_call_id)
+        if request is None or request.confirmed is not None:
+            return False
+        request.confirmed = confirmed
+        if request.future is not None and not request.future.done():
+            request.future.set_result(confirmed)
+        return True
 
     def confirm_tool(self, tool_call_id: str) -> bool:
         """确认工具调用"""
-        if tool_call_id in self.pending_confirmations:
-            self.pending_confirmations[tool_call_id].confirmed = True
-            return True
-        return False
+        return self._resolve(tool_call_id, True)
 
     def cancel_confirmation(self, tool_call_id: str) -> bool:
         """取消工具调用"""
-        if tool_call_id in self.pending_confirmations:
-            self.pending_confirmations[tool_call_id].confirmed = False
-            return True
-        return False
+        return self._resolve(tool_call_id, False)
 
     def get_pending_request(self, tool_call_id: str) -> Optional[ToolConfirmationRequest]:
         """获取待确认的请求"""
         return self.pending_confirmations.get(tool_call_id)
 
-    def cleanup_expired(self):
-        """清理过期的确认请求"""
+    def cleanup_expired(self) -> int:
+        """清理过期的确认请求，等待方会收到取消结果"""
         now = datetime.now()
         expired_ids = [
             tool_call_id for tool_call_id, request in self.pending_confirmations.items()
             if now - request.created_at > self.confirmation_timeout
         ]
         for tool_call_id in expired_ids:
+            self.cancel_confirmation(tool_call_id)
             del self.pending_confirmations[tool_call_id]
+        return len(expired_ids)
+
+    async def _reap_expired(self) -> None:
+        while True:
+            await asyncio.sleep(CONFIRMATION_REAP_INTERVAL)
+            expired = self.cleanup_expired()
+            if expired:
+                print(f'🧹 Reaped {expired} expired tool confirmations')
 
 
 # 全局实例
 tool_confirmation_manager = ToolConfirmationManager()
+
+
+class ConfirmedTool(BaseTool):
+    """包装工具：按确认策略在执行前请求用户确认，用户取消时不执行工具
+
+    创建智能体时所有工具都经过这层包装，工具函数本身不再需要调用 request_confirmation。
+    """
+
+    tool: BaseTool
+
+    def __init__(self, tool: BaseTool):
+        super().__init__(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            return_direct=tool.return_direct,
+            tool=tool,
+        )
+
+    def get_input_schema(self, config: Optional[RunnableConfig] = None):
+        # ToolNode 根据输入 schema 注入 state / store 等参数
+        return self.tool.get_input_schema(config)
+
+    @property
+    def tool_call_schema(self):
+        return self.tool.tool_call_schema
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any:
+        raise NotImplementedError(f'{self.name} only supports async invocation')
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        # ToolNode 以 {"type": "tool_call", "id", "args"} 调用工具
+        if isinstance(input, dict) and input.get('type') == 'tool_call':
+            ctx = (config or {}).get('configurable', {})
+            confirmed = await tool_confirmation_manager.request_confirmation(
+                input['id'], ctx.get('session_id', ''), self.name, input.get('args', {}), ctx.get('user_id')
+            )
+            if not confirmed:
+                return ToolMessage(
+                    content=f'{self.name} was cancelled by the user.',
+                    name=self.name,
+                    tool_call_id=input['id'],
+                )
+        return await self.tool.ainvoke(input, config, **kwargs)
+
+
+def with_confirmation(tool: BaseTool) -> BaseTool:
+    """按确认策略包装工具"""
+    return tool if isinstance(tool, ConfirmedTool) else ConfirmedTool(tool)
@@ -0,0 +1,102 @@
+import os
+import json
+import traceback
+from fnmatch import fnmatch
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Literal, Optional
+from services.config_service import USER_DATA_DIR
+
+ConfirmationAction = Literal['confirm', 'auto_approve']
+
+# 可选的策略文件，格式:
+# {"default": "auto_approve", "costs": {"generate_video_*": 0.5},
+#  "rules": [{"tools": "generate_video_*", "max_cost": 1, "action": "auto_approve"}]}
+# costs 按工具名通配符给出单次调用的预估花费，供 max_cost 条件使用
+TOOL_CONFIRMATION_POLICY_PATH = os.environ.get(
+    "TOOL_CONFIRMATION_POLICY_PATH", os.path.join(USER_DATA_DIR, "tool_confirmation_policy.json"))
+
+
+@dataclass
+class ConfirmationRule:
+    """确认策略规则，所有给出的条件都满足时规则生效"""
+    action: ConfirmationAction
+    # 工具名的通配符模式
+    tools: str = '*'
+    # 只匹配指定 provider 的工具
+    provider: Optional[str] = None
+    # 只匹配预估花费不超过该值的工具（策略未配置该工具的花费时不匹配）
+    max_cost: Optional[float] = None
+    # 只匹配这些用户
+    user_ids: List[str] = field(default_factory=list)
+
+    def matches(self, tool_name: str, provider: Optional[str], cost: Optional[float], user_id: Optional[int]) -> bool:
+        if not fnmatch(tool_name, self.tools):
+            return False
+        if self.provider is not None and provider != self.provider:
+            return False
+        if self.max_cost is not None and (cost is None or cost > self.max_cost):
+            return False
+        if self.user_ids and (user_id is None or str(user_id) not in self.user_ids):
+            return False
+        return True
+
+
+# 默认规则：与之前硬编码的确认列表一致
+DEFAULT_CONFIRMATION_RULES: List[ConfirmationRule] = [
+    # ConfirmationRule(action='confirm', tools='generate_video_by_kling_v2_jaaz'),
+    # ConfirmationRule(action='confirm', tools='generate_video_by_seedance_v1_*'),
+    # ConfirmationRule(action='confirm', tools='generate_video_by_hailuo_02_jaaz'),
+    ConfirmationRule(action='confirm', tools='generate_video_by_veo3_fast_jaaz'),
+]
+
+
+class ToolConfirmationPolicy:
+    """工具确认策略 - 按顺序匹配规则，第一条命中的规则决定是否需要用户确认"""
+
+    def __init__(self, rules: Optional[List[ConfirmationRule]] = None, default: ConfirmationAction = 'auto_approve',
+                 costs: Optional[Dict[str, float]] = None):
+        self.rules = list(rules if rules is not None else DEFAULT_CONFIRMATION_RULES)
+        self.default: ConfirmationAction = default
+        # 工具名通配符 -> 单次调用的预估花费，按顺序取第一个匹配
+        self.costs: Dict[str, float] = dict(costs or {})
+
+    def load(self, path: str = TOOL_CONFIRMATION_POLICY_PATH) -> None:
+        """从策略文件加载规则；文件不存在时保持默认规则"""
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data: Dict[str, Any] = json.load(f)
+            self.rules = [ConfirmationRule(**rule) for rule in data.get('rules', [])]
+            self.default = data.get('default', 'auto_approve')
+            self.costs = {str(pattern): float(cost) for pattern, cost in data.get('costs', {}).items()}
+            print(f"🔐 Loaded {len(self.rules)} tool confirmation rules from {path}")
+        except Exception as e:
+            print(f"❌ Failed to load tool confirmation policy {path}: {e}")
+            traceback.print_exc()
+
+    def estimate_cost(self, tool_name: str) -> Optional[float]:
+        for pattern, cost in self.costs.items():
+            if fnmatch(tool_name, pattern):
+                return cost
+        return None
+
+    def decide(self, tool_name: str, user_id: Optional[int] = None) -> ConfirmationAction:
+        # 延迟导入，避免 tool_service 导入所有工具时的循环依赖
+        from services.tool_service import tool_service
+
+        tool_info = tool_service.tools.get(tool_name) or {}
+        provider = tool_info.get('provider')
+        cost = self.estimate_cost(tool_name)
+        for rule in self.rules:
+            if rule.matches(tool_name, provider, cost, user_id):
+                return rule.action
+        return self.default
+
+    def requires_confirmation(self, tool_name: str, user_id: Optional[int] = None) -> bool:
+        return self.decide(tool_name, user_id) == 'confirm'
+
+
+# 全局实例
+tool_confirmation_policy = ToolConfirmationPolicy()
+tool_confirmation_policy.load()
@@ -61,6 +61,8 @@ TOOL_MAPPING: Dict[str, ToolInfo] = {
 class ToolService:
     def __init__(self):
         self.tools: Dict[str, ToolInfo] = {}
+        # 每次重新加载工具时递增，供缓存判断工具集是否变化
+        self.version = 0
         self._register_required_tools()
 
     def _register_required_tools(self):
@@ -107,6 +109,7 @@ class ToolService:
         return self.tools.copy()
 
     def clear_tools(self):
+        self.version += 1
         self.tools.clear()
         self._register_required_tools()
 
@@ -1,12 +1,35 @@
 # services/websocket_state.py
+import os
 import socketio
 from typing import Dict
 
+# Message queue shared by all workers, e.g. redis://localhost:6379/0.
+# Any Redis-compatible server (Valkey, KeyDB, a local redis-server) works.
+# Leave empty to keep everything in-process (single worker).
+MESSAGE_QUEUE_URL = os.environ.get("MESSAGE_QUEUE_URL", "")
+SOCKETIO_CHANNEL = os.environ.get("SOCKETIO_CHANNEL", "jaaz-socketio")
+
+
+def create_client_manager():
+    """
+    Build the Socket.IO client manager.
+    In-memory by default; with MESSAGE_QUEUE_URL set, emits are published through the
+    queue so rooms reach clients connected to any worker.
+    """
+    if not MESSAGE_QUEUE_URL or MESSAGE_QUEUE_URL.startswith("memory://"):
+        return None
+    if MESSAGE_QUEUE_URL.startswith(("redis://", "rediss://", "unix://")):
+        return socketio.AsyncRedisManager(MESSAGE_QUEUE_URL, channel=SOCKETIO_CHANNEL)
+    raise ValueError(f"Unsupported MESSAGE_QUEUE_URL: {MESSAGE_QUEUE_URL}")
+
+
 sio = socketio.AsyncServer(
     cors_allowed_origins="*",
-    async_mode='asgi'
+    async_mode='asgi',
+    client_manager=create_client_manager(),
 )
 
+# Connections of this worker only; cross-worker delivery goes through rooms
 active_connections: Dict[str, dict] = {}
 
 def add_connection(socket_id: str, user_info: dict = None):
@@ -23,3 +46,9 @@ def get_all_socket_ids():
 
 def get_connection_count():
     return len(active_connections)
+
+def session_room(session_id: str) -> str:
+    return f"session:{session_id}"
+
+def canvas_room(canvas_id: str) -> str:
+    return f"canvas:{canvas_id}"
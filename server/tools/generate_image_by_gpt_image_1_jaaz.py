@@ -16,6 +16,12 @@ class GenerateImageByGptImage1InputSchema(BaseModel):
         default=None,
         description="Optional; One or multiple images to use as reference. Pass a list of image_id here, e.g. ['im_jurheut7.png', 'im_hfuiut78.png']. Best for image editing cases like: Editing specific parts of the image, Removing specific objects, Maintaining visual elements across scenes (character/object consistency), Generating new content in the style of the reference (style transfer), etc."
     )
+    num_images: int = Field(
+        default=1,
+        ge=1,
+        le=4,
+        description="Optional; Number of images to generate from the same prompt, between 1 and 4. Use more than 1 only when the user asks for several variations or options."
+    )
     tool_call_id: Annotated[str, InjectedToolCallId]
 
 
@@ -28,6 +34,7 @@ async def generate_image_by_gpt_image_1_jaaz(
     config: RunnableConfig,
     tool_call_id: Annotated[str, InjectedToolCallId],
     input_images: list[str] | None = None,
+    num_images: int = 1,
 ) -> str:
     ctx = config.get('configurable', {})
     canvas_id = ctx.get('canvas_id', '')
@@ -40,6 +47,7 @@ async def generate_image_by_gpt_image_1_jaaz(
         prompt=prompt,
         aspect_ratio=aspect_ratio,
         input_images=input_images,
+        num_images=num_images,
     )
 
 
@@ -1,11 +1,12 @@
-from typing import Annotated, List, Dict, Any
+from typing import Annotated, List, Dict, Any, Tuple
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool, InjectedToolCallId  # type: ignore
 from langchain_core.runnables import RunnableConfig
 from services.jaaz_service import JaazService
-from tools.utils.image_canvas_utils import save_image_to_canvas, send_image_start_notification, send_image_error_notification
+from tools.utils.image_canvas_utils import save_images_to_canvas, send_image_start_notification, send_image_error_notification
 from common import DEFAULT_PORT
 import os
+import asyncio
 from tools.utils.image_utils import get_image_info_and_save, generate_image_id, process_input_image
 from services.config_service import FILES_DIR
 
@@ -80,16 +81,14 @@ async def generate_image_by_midjourney_jaaz(
 
         print(f"🎨 Midjourney generated {len(images)} images")
 
-        # Save all images to canvas and collect results
-        saved_images: List[Dict[str, Any]] = []
-        for i, image_data in enumerate(images):
+        # Download all images concurrently
+        async def download_image(i: int, image_data: Dict[str, Any]) -> Tuple[str, str, int, int] | None:
             try:
                 image_url = image_data.get('url')
                 if not image_url:
                     print(f"Warning: No URL found for image {i}")
-                    continue
+                    return None
 
-                # Download and save the image
                 image_id = generate_image_id()
                 mime_type, width, height, extension = await get_image_info_and_save(
                     image_url,
@@ -104,29 +103,30 @@ async def generate_image_by_midjourney_jaaz(
                         "content_type": image_data.get('content_type'),
                     }
                 )
+                return f'{image_id}.{extension}', mime_type, width, height
+            except Exception as e:
+                print(f"Error saving image {i}: {e}")
+                # Continue with other images even if one fails
+                return None
 
-                filename = f'{image_id}.{extension}'
-
-                # Save to canvas
-                canvas_image_url = await save_image_to_canvas(
-                    session_id, canvas_id, filename, mime_type, width, height
-                )
+        downloads = await asyncio.gather(*(download_image(i, image_data) for i, image_data in enumerate(images)))
+        downloaded = [(i, d) for i, d in enumerate(downloads) if d is not None]
 
-                # Add to saved images list
+        # Save all images to canvas in a single write and collect results
+        saved_images: List[Dict[str, Any]] = []
+        if downloaded:
+            canvas_image_urls = await save_images_to_canvas(
+                session_id, canvas_id, [d for _, d in downloaded]
+            )
+            for (i, (filename, _, _, _)), canvas_image_url in zip(downloaded, canvas_image_urls):
                 saved_images.append({
                     "image_id": filename,
                     "url": canvas_image_url,
                     "index": i,
-                    "original_data": image_data
+                    "original_data": images[i]
                 })
-
                 print(f"🎨 Saved image {i+1}/{len(images)}: {filename}")
 
-            except Exception as e:
-                print(f"Error saving image {i}: {e}")
-                # Continue with other images even if one fails
-                continue
-
         if not saved_images:
             raise Exception("Failed to save any images from Midjourney generation")
 
@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from langchain_core.tools import tool, InjectedToolCallId  # type: ignore
 from langchain_core.runnables import RunnableConfig
 from services.jaaz_service import JaazService
+from services.generation_job_service import generation_job_service
 from tools.video_generation.video_canvas_utils import send_video_start_notification, process_video_result
 from .utils.image_utils import process_input_image
 
@@ -75,27 +76,28 @@ async def generate_video_by_hailuo_02_jaaz(
                     f"Failed to process input image: {first_image}. Please check if the image exists and is valid.")
 
         # Create Jaaz service and generate video
-        jaaz_service = JaazService()
-        result = await jaaz_service.generate_video(
-            prompt=prompt,
-            model="hailuo-02",
-            resolution=resolution,
-            duration=duration,
-            input_images=processed_input_images,
-            prompt_enhancer=prompt_enhancer,
-        )
+        async with generation_job_service.track("video", "jaaz", "hailuo-02", canvas_id, session_id):
+            jaaz_service = JaazService()
+            result = await jaaz_service.generate_video(
+                prompt=prompt,
+                model="hailuo-02",
+                resolution=resolution,
+                duration=duration,
+                input_images=processed_input_images,
+                prompt_enhancer=prompt_enhancer,
+            )
 
-        video_url = result.get('result_url')
-        if not video_url:
-            raise Exception("No video URL returned from generation")
+            video_url = result.get('result_url')
+            if not video_url:
+                raise Exception("No video URL returned from generation")
 
-        # Process video result (save, update canvas, notify)
-        return await process_video_result(
-            video_url=video_url,
-            session_id=session_id,
-            canvas_id=canvas_id,
-            provider_name="jaaz_hailuo",
-        )
+            # Process video result (save, update canvas, notify)
+            return await process_video_result(
+                video_url=video_url,
+                session_id=session_id,
+                canvas_id=canvas_id,
+                provider_name="jaaz_hailuo",
+            )
 
     except Exception as e:
         print(f"Error in Hailuo video generation: {e}")
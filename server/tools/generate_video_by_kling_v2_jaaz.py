@@ -3,6 +3,7 @@ from pydantic import BaseModel, Field
 from langchain_core.tools import tool, InjectedToolCallId  # type: ignore
 from langchain_core.runnables import RunnableConfig
 from services.jaaz_service import JaazService
+from services.generation_job_service import generation_job_service
 from tools.video_generation.video_canvas_utils import send_video_start_notification, process_video_result
 from .utils.image_utils import process_input_image
 
@@ -81,28 +82,29 @@ async def generate_video_by_kling_v2_jaaz(
             f"Using first input image as start image for Kling video generation: {first_image}")
 
         # Create Jaaz service and generate video
-        jaaz_service = JaazService()
-        result = await jaaz_service.generate_video(
-            prompt=prompt,
-            model="kling-v2.1-standard",
-            duration=duration,
-            aspect_ratio=aspect_ratio,
-            input_images=[processed_image],
-            negative_prompt=negative_prompt,
-            guidance_scale=guidance_scale,
-        )
+        async with generation_job_service.track("video", "jaaz", "kling-v2.1-standard", canvas_id, session_id):
+            jaaz_service = JaazService()
+            result = await jaaz_service.generate_video(
+                prompt=prompt,
+                model="kling-v2.1-standard",
+                duration=duration,
+                aspect_ratio=aspect_ratio,
+                input_images=[processed_image],
+                negative_prompt=negative_prompt,
+                guidance_scale=guidance_scale,
+            )
 
-        video_url = result.get('result_url')
-        if not video_url:
-            raise Exception("No video URL returned from generation")
+            video_url = result.get('result_url')
+            if not video_url:
+                raise Exception("No video URL returned from generation")
 
-        # Process video result (save, update canvas, notify)
-        return await process_video_result(
-            video_url=video_url,
-            session_id=session_id,
-            canvas_id=canvas_id,
-            provider_name="jaaz_kling",
-        )
+            # Process video result (save, update canvas, notify)
+            return await process_video_result(
+                video_url=video_url,
+                session_id=session_id,
+                canvas_id=canvas_id,
+                provider_name="jaaz_kling",
+            )
 
     except Exception as e:
         print(f"Error in Kling video generation: {e}")
@@ -1,8 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Optional, Any, Tuple
+from typing import Optional, Any, List, Tuple
 
 
 class ImageProviderBase(ABC):
+    # Most images generate_images() can return from a single request; 1 means the API
+    # returns one image per request and callers issue one generate() per image
+    max_images_per_request: int = 1
+
     @abstractmethod
     async def generate(
         self,
@@ -27,4 +31,28 @@ class ImageProviderBase(ABC):
         Returns:
             Tuple[str, int, int, str]: (mime_type, width, height, filename)
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def generate_images(
+        self,
+        prompt: str,
+        model: str,
+        aspect_ratio: str = "1:1",
+        input_images: Optional[list[str]] = None,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> List[Tuple[str, int, int, str]]:
+        """
+        Generate kwargs["num_images"] images
+
+        Providers whose API returns several images per request set max_images_per_request
+        and override this; the default only serves a single image.
+
+        Returns:
+            List[Tuple[str, int, int, str]]: (mime_type, width, height, filename) per image
+        """
+        num_images = int(kwargs.pop("num_images", 1))
+        if num_images > self.max_images_per_request:
+            raise ValueError(
+                f"{type(self).__name__} returns at most {self.max_images_per_request} images per request, got {num_images}")
+        return [await self.generate(prompt, model, aspect_ratio, input_images, metadata, **kwargs)]
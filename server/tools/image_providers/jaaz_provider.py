@@ -1,6 +1,7 @@
 import os
 import traceback
 import asyncio
+from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Any, Dict
 from pydantic import BaseModel
 from openai.types import Image
@@ -9,6 +10,15 @@ from ..utils.image_utils import get_image_info_and_save, generate_image_id
 from services.config_service import FILES_DIR
 from utils.http_client import HttpClient
 from services.config_service import config_service
+from services.jaaz_service import JaazService
+from services.generation_job_service import generation_job_service
+from services.generation_scheduler import RateLimitError, parse_retry_after
+from models.db_model import GenerationJob
+
+# Prompt searches when a submission response was lost
+SEARCH_MAX_RETRIES = 5
+# Tolerated clock difference (seconds) when matching a searched task to this submission
+SEARCH_CLOCK_SKEW = 30
 
 
 class JaazImagesResponse(BaseModel):
@@ -19,6 +29,9 @@ class JaazImagesResponse(BaseModel):
     data: Optional[List[Image]] = None
     """The list of generated images."""
 
+    task_id: Optional[str] = None
+    """Cloud task id, returned when the generation is still running."""
+
 
 class TaskSearchResponse(BaseModel):
     """Task search response model"""
@@ -26,6 +39,18 @@ class TaskSearchResponse(BaseModel):
     data: Dict[str, Any]
 
 
+async def _resume_jaaz_image_job(job: GenerationJob) -> str:
+    """Resume waiting for a Jaaz image task created before a restart"""
+    task = await JaazService().poll_for_task_completion(job['remote_task_id'], model=job.get('model', ''))
+    result_url = task.get('result_url')
+    if not result_url:
+        raise Exception('No result_url found in cloud task')
+    return str(result_url)
+
+
+generation_job_service.register_resumer('image', 'jaaz', _resume_jaaz_image_job)
+
+
 class JaazImageProvider(ImageProviderBase):
     """Jaaz Cloud image generation provider implementation"""
 
@@ -72,7 +97,7 @@ class JaazImageProvider(ImageProviderBase):
             prompt: The generation prompt
 
         Returns:
-            Task data if found and succeeded, None otherwise
+            Task data if found, None otherwise
         """
         try:
             url = self._build_search_url()
@@ -102,61 +127,64 @@ class JaazImageProvider(ImageProviderBase):
             print(f'🦄 Error searching cloud task: {e}')
             return None
 
-    async def _wait_for_task_completion(self, prompt: str, max_wait_time: int = 300) -> Optional[Dict[str, Any]]:
+    @staticmethod
+    def _is_own_task(task: Dict[str, Any], model: str, submitted_at: datetime) -> bool:
         """
-        Wait for cloud task to complete
+        Reject tasks of the same prompt that belong to another model or an earlier submission
+
+        A task whose creation time is missing or unparsable cannot be told apart from an
+        earlier submission of the same prompt, so it is rejected as well.
+        """
+        if task.get('model') and task['model'] != model:
+            return False
+        created_at = task.get('created_at')
+        if not isinstance(created_at, str):
+            return False
+        try:
+            created = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
+        except ValueError:
+            return False
+        if created.tzinfo is None:
+            created = created.replace(tzinfo=timezone.utc)
+        # Allow for clock skew between this server and Jaaz
+        return created >= submitted_at - timedelta(seconds=SEARCH_CLOCK_SKEW)
+
+    async def _wait_for_task(self, task_id: str, model: str) -> Dict[str, Any]:
+        """Wait for a cloud task by id through the shared task tracker"""
+        return await JaazService().poll_for_task_completion(
+            task_id, max_attempts=150, interval=2.0, model=model)
+
+    async def _recover_cloud_task(self, prompt: str, model: str, submitted_at: datetime) -> Optional[Dict[str, Any]]:
+        """
+        Recovery for a submission whose response was lost (timeout, dropped connection)
+
+        The task id is looked up once by prompt search; after that the task is tracked by id.
 
         Args:
             prompt: The generation prompt
             model: The model used
-            max_wait_time: Maximum wait time in seconds
+            submitted_at: When the generation request was sent
 
         Returns:
             Task data if succeeded, None otherwise
         """
-        start_time = asyncio.get_event_loop().time()
-        no_task_retry_count = 0
-        max_no_task_retries = 5
-
-        while True:
+        for attempt in range(SEARCH_MAX_RETRIES):
             task = await self._search_cloud_task(prompt)
+            if task and task.get('id') and self._is_own_task(task, model, submitted_at):
+                break
+            print(f'🦄 No matching cloud task found, retrying ({attempt + 1}/{SEARCH_MAX_RETRIES})...')
+            await asyncio.sleep(3)
+        else:
+            print(f'🦄 No cloud task found after {SEARCH_MAX_RETRIES} retries')
+            return None
 
-            if not task:
-                no_task_retry_count += 1
-                if no_task_retry_count <= max_no_task_retries:
-                    print(
-                        f'🦄 No cloud task found, retrying ({no_task_retry_count}/{max_no_task_retries})...')
-                    await asyncio.sleep(3)
-                    continue
-                else:
-                    print('🦄 No cloud task found after 5 retries')
-                    return None
-
-            # Reset retry count when task is found
-            no_task_retry_count = 0
-
-            status = task.get('status')
-            print(f'🦄 Cloud task status: {status}')
-
-            if status == 'succeeded':
-                print('🦄 Cloud task completed successfully')
-                return task
-            elif status == 'failed':
-                print('🦄 Cloud task failed')
-                return None
-            elif status == 'processing':
-                # Check if we've exceeded max wait time
-                elapsed = asyncio.get_event_loop().time() - start_time
-                if elapsed > max_wait_time:
-                    print(
-                        f'🦄 Timeout waiting for cloud task completion ({max_wait_time}s)')
-                    return None
-
-                print('🦄 Cloud task still processing, waiting 2 seconds...')
-                await asyncio.sleep(2)
-            else:
-                print(f'🦄 Unknown cloud task status: {status}')
-                return None
+        if task.get('status') == 'succeeded':
+            return task
+        if task.get('status') in ('failed', 'cancelled'):
+            print(f'🦄 Recovered cloud task {task["id"]} {task["status"]}')
+            return None
+        print(f'🦄 Tracking recovered cloud task {task["id"]}')
+        return await self._wait_for_task(str(task['id']), model)
 
     async def _process_cloud_task_result(self, task: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None) -> tuple[str, int, int, str]:
         """
@@ -198,6 +226,9 @@ class JaazImageProvider(ImageProviderBase):
                 f'🦄 Jaaz API request: {url}, model: {data["model"]}, prompt: {data["prompt"]}')
 
             async with session.post(url, headers=headers, json=data) as response:
+                if response.status == 429:
+                    raise RateLimitError(
+                        'Jaaz rate limit exceeded', parse_retry_after(response.headers))
                 if response.status != 200:
                     error_text = await response.text()
                     error_msg = f"HTTP {response.status}: {error_text}"
@@ -244,6 +275,46 @@ class JaazImageProvider(ImageProviderBase):
         raise Exception(
             f'{error_prefix} image generation failed: No valid image data in response')
 
+    async def _submit(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        data: Dict[str, Any],
+        error_prefix: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> tuple[str, int, int, str]:
+        """
+        Submit a generation and return the saved image
+
+        Images returned inline are saved directly. A response that only carries a task id
+        is tracked by id; the prompt search is used only if the response itself was lost.
+        """
+        submitted_at = datetime.now(timezone.utc)
+        try:
+            res = await self._make_request(url, headers, data)
+        except RateLimitError:
+            # Rejected before a task was created: nothing to recover, the scheduler retries
+            raise
+        except Exception as e:
+            print(f'🦄 {error_prefix} request failed ({e}), attempting cloud task recovery...')
+            try:
+                task = await self._recover_cloud_task(data["prompt"], data["model"], submitted_at)
+            except Exception as recovery_error:
+                print(f'🦄 Cloud task recovery failed: {recovery_error}')
+                task = None
+            if not task:
+                print('🦄 No cloud task available for recovery')
+                raise e
+            print('🦄 Successfully recovered using cloud task')
+            return await self._process_cloud_task_result(task, metadata)
+
+        if not res.data and res.task_id:
+            print(f'🦄 {error_prefix} task {res.task_id} still running, waiting via task tracker')
+            task = await self._wait_for_task(res.task_id, data["model"])
+            return await self._process_cloud_task_result(task, metadata)
+
+        return await self._process_response(res, error_prefix, metadata)
+
     async def generate(
         self,
         prompt: str,
@@ -310,26 +381,11 @@ class JaazImageProvider(ImageProviderBase):
                     print(
                         "Warning: Replicate format only supports single image input. Using first image.")
 
-            res = await self._make_request(url, headers, data)
-            return await self._process_response(res, "Jaaz", metadata)
+            return await self._submit(url, headers, data, "Jaaz", metadata)
 
         except Exception as e:
             print(f'Error generating image with Jaaz: {e}')
             traceback.print_exc()
-
-            # Always attempt cloud task fallback on any error
-            print('🦄 Attempting cloud task fallback...')
-            try:
-                task = await self._wait_for_task_completion(prompt)
-                if task:
-                    print('🦄 Successfully recovered using cloud task')
-                    return await self._process_cloud_task_result(task, metadata)
-                else:
-                    print('🦄 No cloud task available for recovery')
-            except Exception as fallback_error:
-                print(f'🦄 Cloud task fallback failed: {fallback_error}')
-
-            # If fallback fails, raise original error
             raise e
 
     async def _generate_openai_image(
@@ -368,26 +424,9 @@ class JaazImageProvider(ImageProviderBase):
                 data["input_images"] = input_images
                 print(f"Using {len(input_images)} input images for generation")
 
-            res = await self._make_request(url, headers, data)
-            return await self._process_response(res, "Jaaz OpenAI", metadata)
+            return await self._submit(url, headers, data, "Jaaz OpenAI", metadata)
 
         except Exception as e:
             print(f'Error generating image with Jaaz OpenAI: {e}')
             traceback.print_exc()
-
-            # Always attempt cloud task fallback on any error
-            print('🦄 Attempting cloud task fallback...')
-            try:
-                # For OpenAI models, use the original prompt
-                enhanced_prompt = f"{prompt} Aspect ratio: {aspect_ratio}"
-                task = await self._wait_for_task_completion(enhanced_prompt)
-                if task:
-                    print('🦄 Successfully recovered using cloud task')
-                    return await self._process_cloud_task_result(task, metadata)
-                else:
-                    print('🦄 No cloud task available for recovery')
-            except Exception as fallback_error:
-                print(f'🦄 Cloud task fallback failed: {fallback_error}')
-
-            # If fallback fails, raise original error
             raise e
@@ -1,22 +1,85 @@
 import os
+import asyncio
 import traceback
 from typing import Optional, Any
-from openai import OpenAI
+from openai import AsyncOpenAI
+from openai.types import Image
 from .image_base_provider import ImageProviderBase
 from ..utils.image_utils import get_image_info_and_save, generate_image_id
 from services.config_service import FILES_DIR
+from services.asset_store import asset_store
 from services.config_service import config_service
+from utils.llm_client_registry import llm_client_registry
+
+# Map aspect ratio to size
+SIZE_MAP = {
+    "1:1": "1024x1024",
+    "16:9": "1792x1024",
+    "9:16": "1024x1792",
+    "4:3": "1024x768",
+    "3:4": "768x1024"
+}
 
 
 class OpenAIImageProvider(ImageProviderBase):
     """OpenAI image generation provider implementation"""
 
+    # The images API accepts n up to 10
+    max_images_per_request = 10
+
+    def __init__(self):
+        # One AsyncOpenAI client per (api_key, base_url), all on the shared pooled transport
+        self._clients: dict[tuple[str, str], AsyncOpenAI] = {}
+
+    def _get_client(self) -> AsyncOpenAI:
+        config = config_service.app_config.get('openai', {})
+        api_key = str(config.get("api_key", ""))
+        base_url = str(config.get("url", ""))  # 可选
+
+        if not api_key:
+            raise ValueError("OpenAI API key is not configured")
+
+        key = (api_key, base_url)
+        client = self._clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url or None,
+                http_client=llm_client_registry.get_async_client('openai', base_url or None),
+            )
+            self._clients[key] = client
+        return client
+
+    async def _save_image(self, image_data: Image, metadata: Optional[dict[str, Any]] = None) -> tuple[str, int, int, str]:
+        """Save one returned image; returns (mime_type, width, height, filename)"""
+        image_id = generate_image_id()
+        # Handle different response formats
+        if image_data.b64_json:
+            # Base64 response
+            mime_type, width, height, extension = await get_image_info_and_save(
+                image_data.b64_json, os.path.join(FILES_DIR, f'{image_id}'), is_b64=True, metadata=metadata
+            )
+        elif image_data.url:
+            # URL response
+            mime_type, width, height, extension = await get_image_info_and_save(
+                image_data.url, os.path.join(FILES_DIR, f'{image_id}'), metadata=metadata
+            )
+        else:
+            raise Exception("Invalid response format from OpenAI API")
+
+        # Ensure mime_type is not None
+        if mime_type is None:
+            raise Exception('Failed to determine image MIME type')
+
+        return mime_type, width, height, f'{image_id}.{extension}'
+
     async def generate(
         self,
         prompt: str,
         model: str,
         aspect_ratio: str = "1:1",
         input_images: Optional[list[str]] = None,
+        metadata: Optional[dict[str, Any]] = None,
         **kwargs: Any
     ) -> tuple[str, int, int, str]:
         """
@@ -25,17 +88,27 @@ class OpenAIImageProvider(ImageProviderBase):
         Returns:
             tuple[str, int, int, str]: (mime_type, width, height, filename)
         """
+        images = await self.generate_images(
+            prompt, model, aspect_ratio, input_images, metadata, **kwargs)
+        return images[0]
 
-        config = config_service.app_config.get('openai', {})
-        self.api_key = str(config.get("api_key", ""))
-        self.base_url = str(config.get("url", ""))  # 可选
-
-        if not self.api_key:
-            raise ValueError("OpenAI API key is not configured")
+    async def generate_images(
+        self,
+        prompt: str,
+        model: str,
+        aspect_ratio: str = "1:1",
+        input_images: Optional[list[str]] = None,
+        metadata: Optional[dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> list[tuple[str, int, int, str]]:
+        """
+        Generate kwargs["num_images"] images with one request and save them concurrently
 
-        # Create OpenAI client
-        self.client = OpenAI(api_key=self.api_key,
-                             base_url=self.base_url or None)
+        Returns:
+            list[tuple[str, int, int, str]]: (mime_type, width, height, filename) per image
+        """
+        client = self._get_client()
+        n = kwargs.get("num_images", 1)
         try:
             # Remove openai/ prefix if present
             model = model.replace('openai/', '')
@@ -45,66 +118,40 @@ class OpenAIImageProvider(ImageProviderBase):
                 # Image editing mode
                 input_image_path = input_images[0]
                 # For OpenAI, input_image should be the file path
-                full_path = os.path.join(FILES_DIR, input_image_path)
-
-                with open(full_path, 'rb') as image_file:
-                    result = self.client.images.edit(
-                        model=model,
-                        image=image_file,
-                        prompt=prompt,
-                        n=kwargs.get("num_images", 1)
-                    )
+                full_path = await asset_store.resolve_path(input_image_path)
+                if full_path is None:
+                    raise FileNotFoundError(f"Input image not found: {input_image_path}")
+
+                image_bytes = await asyncio.to_thread(_read_file, full_path)
+                result = await client.images.edit(
+                    model=model,
+                    image=(os.path.basename(full_path), image_bytes),
+                    prompt=prompt,
+                    n=n
+                )
             else:
                 # Image generation mode
-                # Map aspect ratio to size
-                size_map = {
-                    "1:1": "1024x1024",
-                    "16:9": "1792x1024",
-                    "9:16": "1024x1792",
-                    "4:3": "1024x768",
-                    "3:4": "768x1024"
-                }
-                size = size_map.get(aspect_ratio, "1024x1024")
-
-                result = self.client.images.generate(
+                result = await client.images.generate(
                     model=model,
                     prompt=prompt,
-                    n=kwargs.get("num_images", 1),
-                    size=size,
+                    n=n,
+                    size=SIZE_MAP.get(aspect_ratio, "1024x1024"),  # type: ignore
                 )
 
             # Process the result
             if not result.data or len(result.data) == 0:
                 raise Exception("No image data returned from OpenAI API")
 
-            image_data = result.data[0]
-
-            # Handle different response formats
-            if hasattr(image_data, 'b64_json') and image_data.b64_json:
-                # Base64 response
-                image_b64 = image_data.b64_json
-                image_id = generate_image_id()
-                mime_type, width, height, extension = await get_image_info_and_save(
-                    image_b64, os.path.join(FILES_DIR, f'{image_id}'), is_b64=True
-                )
-            elif hasattr(image_data, 'url') and image_data.url:
-                # URL response
-                image_url = image_data.url
-                image_id = generate_image_id()
-                mime_type, width, height, extension = await get_image_info_and_save(
-                    image_url, os.path.join(FILES_DIR, f'{image_id}')
-                )
-            else:
-                raise Exception("Invalid response format from OpenAI API")
-
-            # Ensure mime_type is not None
-            if mime_type is None:
-                raise Exception('Failed to determine image MIME type')
-
-            filename = f'{image_id}.{extension}'
-            return mime_type, width, height, filename
+            return list(await asyncio.gather(
+                *(self._save_image(image_data, metadata) for image_data in result.data)
+            ))
 
         except Exception as e:
             print('Error generating image with OpenAI:', e)
             traceback.print_exc()
             raise e
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
@@ -1,4 +1,5 @@
 import os
+import hashlib
 import traceback
 from typing import Optional, Any
 from .image_base_provider import ImageProviderBase
@@ -6,6 +7,75 @@ from ..utils.image_utils import get_image_info_and_save, generate_image_id
 from services.config_service import FILES_DIR
 from utils.http_client import HttpClient
 from services.config_service import config_service
+from services.generation_job_service import generation_job_service
+from services.generation_scheduler import RateLimitError, parse_retry_after
+from models.db_model import GenerationJob
+from services.task_tracker import (
+    TaskBackend, TaskUpdate, PollProfile, task_tracker,
+    pending_update, succeeded_update, failed_update,
+)
+
+
+def parse_replicate_prediction(prediction: dict[str, Any]) -> TaskUpdate:
+    """Map a Replicate prediction to a tracker update"""
+    status = prediction.get('status')
+    if status == 'succeeded':
+        return succeeded_update(prediction)
+    if status in ('failed', 'canceled'):
+        return failed_update(
+            f'Replicate image generation failed: {prediction.get("error") or status}', prediction)
+    return pending_update(prediction)
+
+
+def _parse_replicate_webhook(payload: dict[str, Any]) -> Optional[tuple[str, TaskUpdate]]:
+    """Replicate webhooks post the prediction object"""
+    if not payload.get('id'):
+        return None
+    return str(payload['id']), parse_replicate_prediction(payload)
+
+
+task_tracker.register_webhook('replicate', _parse_replicate_webhook)
+
+
+class ReplicateTaskBackend(TaskBackend):
+    """Replicate prediction status queries (one prediction per request)"""
+    provider = 'replicate'
+    profile = PollProfile(min_interval=1.0, max_interval=10.0, timeout=300.0)
+
+    def __init__(self, api_key: str):
+        self.api_key = api_key
+
+    @property
+    def key(self) -> str:
+        return f"{self.provider}:{hashlib.sha256(self.api_key.encode()).hexdigest()[:12]}"
+
+    async def fetch(self, task_ids: list[str]) -> dict[str, TaskUpdate]:
+        updates: dict[str, TaskUpdate] = {}
+        async with HttpClient.create_aiohttp() as session:
+            for task_id in task_ids:
+                async with session.get(
+                    f'https://api.replicate.com/v1/predictions/{task_id}',
+                    headers={'Authorization': f'Bearer {self.api_key}'}
+                ) as response:
+                    if response.status != 200:
+                        raise Exception(f'Failed to get Replicate prediction: HTTP {response.status}')
+                    updates[task_id] = parse_replicate_prediction(await response.json())
+        return updates
+
+
+async def _resume_replicate_job(job: GenerationJob) -> str:
+    """Resume waiting for a Replicate prediction created before a restart"""
+    prediction = await task_tracker.wait(
+        ReplicateTaskBackend(ReplicateImageProvider()._api_key()), job['remote_task_id'], model=job.get('model', ''))
+    output = prediction.get('output')
+    if isinstance(output, list):
+        output = output[0] if output else None
+    if not output:
+        raise Exception('Replicate image generation failed: no output url found')
+    return output
+
+
+generation_job_service.register_resumer('image', 'replicate', _resume_replicate_job)
 
 
 class ReplicateImageProvider(ImageProviderBase):
@@ -15,13 +85,17 @@ class ReplicateImageProvider(ImageProviderBase):
         """Build request URL for Replicate API"""
         return f"https://api.replicate.com/v1/models/{model}/predictions"
 
-    def _build_headers(self) -> dict[str, str]:
-        """Build request headers"""
+    def _api_key(self) -> str:
         config = config_service.app_config.get('replicate', {})
         api_key = config.get("api_key", "")
 
         if not api_key:
             raise ValueError("Replicate API key is not configured")
+        return api_key
+
+    def _build_headers(self) -> dict[str, str]:
+        """Build request headers"""
+        api_key = self._api_key()
         return {
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json",
@@ -39,6 +113,9 @@ class ReplicateImageProvider(ImageProviderBase):
             print(
                 f'🦄 Replicate API request: {url}, model: {data["input"]["prompt"]}')
             async with session.post(url, headers=headers, json=data) as response:
+                if response.status == 429:
+                    raise RateLimitError(
+                        'Replicate rate limit exceeded', parse_retry_after(response.headers))
                 # Parse JSON data
                 json_data = await response.json()
                 print('🦄 Replicate API response', json_data)
@@ -115,9 +192,22 @@ class ReplicateImageProvider(ImageProviderBase):
                     print(
                         "Warning: Replicate format only supports single image input. Using first image.")
 
+            # Let Replicate push completion when the server is reachable from outside
+            webhook_url = task_tracker.webhook_url('replicate')
+            if webhook_url:
+                data['webhook'] = webhook_url
+                data['webhook_events_filter'] = ['completed']
+
             # Make request
             res = await self._make_request(url, headers, data)
 
+            # "Prefer: wait" returns early for slow models; track the prediction by id
+            if res.get('id') and res.get('status') in ('starting', 'processing'):
+                print(f'🦄 Replicate prediction {res["id"]} still {res["status"]}, waiting via task tracker')
+                await generation_job_service.attach_remote_task(res['id'])
+                res = await task_tracker.wait(
+                    ReplicateTaskBackend(self._api_key()), res['id'], model=model)
+
             # Process response and return result
             return await self._process_response(res)
 
@@ -11,6 +11,7 @@ from ..utils.image_utils import get_image_info_and_save, generate_image_id
 from tools.video_generation_utils import get_image_base64
 from services.config_service import FILES_DIR, config_service
 from utils.http_client import HttpClient
+from services.generation_scheduler import RateLimitError, parse_retry_after
 
 
 class VolcesImagesResponse(BaseModel):
@@ -139,6 +140,10 @@ class VolcesProvider(ImageProviderBase):
                     async with session.post(
                         url, headers=headers, json=payload
                     ) as response:
+                        if response.status == 429:
+                            raise RateLimitError(
+                                "Volces rate limit exceeded", parse_retry_after(response.headers)
+                            )
                         if response.status != 200:
                             try:
                                 error_data = await response.json()
@@ -7,6 +7,7 @@ from .image_base_provider import ImageProviderBase
 from ..utils.image_utils import get_image_info_and_save, generate_image_id
 from services.config_service import FILES_DIR, config_service
 from utils.http_client import HttpClient
+from services.generation_scheduler import RateLimitError, parse_retry_after
 
 
 class WavespeedResponse(BaseModel):
@@ -119,6 +120,9 @@ class WavespeedProvider(ImageProviderBase):
 
             async with HttpClient.create_aiohttp() as session:
                 async with session.post(endpoint, json=payload, headers=headers) as response:
+                    if response.status == 429:
+                        raise RateLimitError(
+                            "WaveSpeed rate limit exceeded", parse_retry_after(response.headers))
                     response_json = await response.json()
 
                     if response.status != 200 or response_json.get("code") != 200:
@@ -0,0 +1,183 @@
+"""
+Shared per-canvas write coordinator
+Serializes canvas writes from the image and video pipelines and batches
+concurrent element inserts for the same canvas into a single DB write
+"""
+
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from services.db_service import db_service
+from utils.canvas import CanvasSpatialIndex
+
+# Number of canvases whose placement index is kept between flushes
+CANVAS_INDEX_CACHE_SIZE = 128
+
+# Builds an element at the (x, y) position reserved for it
+ElementBuilder = Callable[[Tuple[float, float]], Awaitable[Dict[str, Any]]]
+# (width, height, build_element, file_data)
+PendingElement = Tuple[float, float, ElementBuilder, Dict[str, Any]]
+
+
+@dataclass
+class _PendingInsert:
+    width: float
+    height: float
+    build_element: ElementBuilder
+    file_data: Dict[str, Any]
+    future: 'asyncio.Future[Dict[str, Any]]'
+
+
+@dataclass
+class _CachedIndex:
+    index: CanvasSpatialIndex
+    # Canvas revision (snapshot version, op count) the index reflects
+    revision: Tuple[int, int]
+
+
+@dataclass
+class _CanvasState:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    pending: List[_PendingInsert] = field(default_factory=list)
+    users: int = 0
+
+
+class CanvasWriteCoordinator:
+    """
+    One lock per canvas shared by every writer, created on demand and evicted as soon as
+    nobody holds or waits for it. Inserts queued while a write is in flight are flushed
+    together by the next lock holder.
+
+    The placement index of recently written canvases is kept and updated from each batch;
+    it is rebuilt from the stored elements only when another writer changed the canvas.
+    """
+
+    def __init__(self) -> None:
+        self._canvases: Dict[str, _CanvasState] = {}
+        self._indexes: 'OrderedDict[str, _CachedIndex]' = OrderedDict()
+
+    def _acquire(self, canvas_id: str) -> _CanvasState:
+        state = self._canvases.get(canvas_id)
+        if state is None:
+            state = self._canvases[canvas_id] = _CanvasState()
+        state.users += 1
+        return state
+
+    def _release(self, canvas_id: str, state: _CanvasState) -> None:
+        state.users -= 1
+        if state.users == 0 and not state.pending and self._canvases.get(canvas_id) is state:
+            del self._canvases[canvas_id]
+
+    @asynccontextmanager
+    async def lock_canvas(self, canvas_id: str):
+        """Exclusive access to a canvas for read-modify-write operations"""
+        state = self._acquire(canvas_id)
+        try:
+            async with state.lock:
+                yield
+        finally:
+            self._release(canvas_id, state)
+
+    async def add_element(
+        self,
+        canvas_id: str,
+        width: float,
+        height: float,
+        build_element: ElementBuilder,
+        file_data: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Queue an element insert and return the element once it has been written"""
+        elements = await self.add_elements(canvas_id, [(width, height, build_element, file_data)])
+        return elements[0]
+
+    async def add_elements(
+        self,
+        canvas_id: str,
+        items: List[PendingElement],
+    ) -> List[Dict[str, Any]]:
+        """Queue several element inserts; they are positioned in order and written together"""
+        loop = asyncio.get_running_loop()
+        state = self._acquire(canvas_id)
+        try:
+            futures: List['asyncio.Future[Dict[str, Any]]'] = []
+            for width, height, build_element, file_data in items:
+                future: 'asyncio.Future[Dict[str, Any]]' = loop.create_future()
+                state.pending.append(_PendingInsert(width, height, build_element, file_data, future))
+                futures.append(future)
+
+            try:
+                # Let concurrently arriving inserts join the queue before the first flush
+                await asyncio.sleep(0)
+                async with state.lock:
+                    if not all(future.done() for future in futures):
+                        await self._flush(canvas_id, state)
+            except asyncio.CancelledError:
+                # Drop our own inserts; those of other callers stay queued for the next lock holder
+                for future in futures:
+                    future.cancel()
+                state.pending = [item for item in state.pending if not item.future.done()]
+                raise
+
+            return [future.result() for future in futures]
+        finally:
+            self._release(canvas_id, state)
+
+    async def _placement_index(self, canvas_id: str) -> Optional[_CachedIndex]:
+        """Cached index if the canvas is unchanged since our last write, otherwise a rebuilt one"""
+        # Read the revision before the elements: a write in between only causes a spurious rebuild
+        revision = await db_service.get_canvas_revision(canvas_id)
+        if revision is None:
+            return None
+        cached = self._indexes.get(canvas_id)
+        if cached is None or cached.revision != revision:
+            # Placement only needs element geometry, not files or sessions
+            elements = await db_service.get_canvas_elements(canvas_id) or []
+            cached = self._indexes[canvas_id] = _CachedIndex(CanvasSpatialIndex.from_elements(elements), revision)
+        self._indexes.move_to_end(canvas_id)
+        while len(self._indexes) > CANVAS_INDEX_CACHE_SIZE:
+            self._indexes.popitem(last=False)
+        return cached
+
+    async def _flush(self, canvas_id: str, state: _CanvasState) -> None:
+        batch = [item for item in state.pending if not item.future.done()]
+        state.pending = []
+        try:
+            cached = await self._placement_index(canvas_id)
+            index = cached.index if cached else CanvasSpatialIndex()
+            # Slots are reserved in order so the whole batch tiles without overlap
+            positions = index.place_batch((item.width, item.height) for item in batch)
+
+            elements: List[Dict[str, Any]] = []
+            files: Dict[str, Any] = {}
+            for item, position in zip(batch, positions):
+                elements.append(await item.build_element(position))
+                files[item.file_data['id']] = item.file_data
+
+            op_count = await db_service.add_canvas_elements(canvas_id, elements, files)
+        except BaseException as e:
+            # The index may hold slots that were never written
+            self._indexes.pop(canvas_id, None)
+            if not isinstance(e, Exception):
+                # The lock holder was cancelled: requeue the batch so the other callers'
+                # inserts are written by whoever takes the lock next
+                state.pending[:0] = [item for item in batch if not item.future.done()]
+                raise
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        if cached is not None:
+            # Any other write before the next flush changes the revision and forces a rebuild
+            cached.revision = (cached.revision[0], cached.revision[1] + op_count)
+
+        for item, element in zip(batch, elements):
+            # A caller cancelled while its insert was being written no longer wants the result
+            if not item.future.done():
+                item.future.set_result(element)
+
+
+# Global coordinator shared by image and video tools
+canvas_write_coordinator = CanvasWriteCoordinator()
@@ -3,16 +3,14 @@ Canvas-related utilities for image generation
 Handles canvas operations, locking, and notifications
 """
 
-import asyncio
 import random
 import time
-import json
-from contextlib import asynccontextmanager
-from typing import Dict, List, Any, Optional, Union, cast
+from typing import Dict, List, Any, Optional, Tuple
 from nanoid import generate
 from services.db_service import db_service
 from services.websocket_service import broadcast_session_update
 from services.websocket_service import send_to_websocket
+from tools.utils.canvas_write_coordinator import canvas_write_coordinator, ElementBuilder, PendingElement
 from utils.canvas import find_next_best_element_position
 
 def generate_file_id() -> str:
@@ -20,42 +18,22 @@ def generate_file_id() -> str:
     return 'im_' + generate(size=8)
 
 
-class CanvasLockManager:
-    """Canvas lock manager to prevent concurrent operations causing position overlap"""
-
-    def __init__(self) -> None:
-        self._locks: Dict[str, asyncio.Lock] = {}
-
-    @asynccontextmanager
-    async def lock_canvas(self, canvas_id: str):
-        if canvas_id not in self._locks:
-            self._locks[canvas_id] = asyncio.Lock()
-
-        async with self._locks[canvas_id]:
-            yield
-
-
-# Global lock manager instance
-canvas_lock_manager = CanvasLockManager()
-
-
-
 async def generate_new_image_element(
     canvas_id: str,
     fileid: str,
     image_data: Dict[str, Any],
     canvas_data: Optional[Dict[str, Any]] = None,
+    position: Optional[Tuple[float, float]] = None,
 ) -> Dict[str, Any]:
     """Generate new image element for canvas"""
-    if canvas_data is None:
-        canvas = await db_service.get_canvas_data(canvas_id)
-        if canvas is None:
-            canvas = {"data": {}}
-        canvas_data = canvas.get("data", {})
-
-
-
-    new_x, new_y = await find_next_best_element_position(canvas_data)
+    if position is not None:
+        new_x, new_y = position
+    else:
+        if canvas_data is None:
+            # Placement only needs element geometry
+            elements = await db_service.get_canvas_elements(canvas_id)
+            canvas_data = {"elements": elements or []}
+        new_x, new_y = await find_next_best_element_position(canvas_data)
 
     return {
         "type": "image",
@@ -93,50 +71,35 @@ async def generate_new_image_element(
 
 async def save_image_to_canvas(session_id: str, canvas_id: str, filename: str, mime_type: str, width: int, height: int) -> str:
     """Save image to canvas with proper locking and positioning"""
-    # Use lock to ensure atomicity of the save process
-    async with canvas_lock_manager.lock_canvas(canvas_id):
-        # Fetch canvas data once inside the lock
-        canvas: Optional[Dict[str, Any]] = await db_service.get_canvas_data(canvas_id)
-        if canvas is None:
-            canvas = {'data': {}}
-        canvas_data: Dict[str, Any] = canvas.get('data', {})
-
-        # Ensure 'elements' and 'files' keys exist
-        if 'elements' not in canvas_data:
-            canvas_data['elements'] = []
-        if 'files' not in canvas_data:
-            canvas_data['files'] = {}
+    image_urls = await save_images_to_canvas(session_id, canvas_id, [(filename, mime_type, width, height)])
+    return image_urls[0]
 
-        file_id = generate_file_id()
-        url = f'/api/file/{filename}'
 
+async def save_images_to_canvas(
+    session_id: str,
+    canvas_id: str,
+    images: List[Tuple[str, str, int, int]],
+) -> List[str]:
+    """
+    Save several images (filename, mime_type, width, height) to canvas in one write.
+    Positions are assigned in order by the shared canvas write coordinator.
+    """
+    items: List[PendingElement] = []
+    for filename, mime_type, width, height in images:
+        file_id = generate_file_id()
         file_data: Dict[str, Any] = {
             'mimeType': mime_type,
             'id': file_id,
-            'dataURL': url,
+            'dataURL': f'/api/file/{filename}',
             'created': int(time.time() * 1000),
         }
+        items.append((width, height, _image_element_builder(canvas_id, file_id, width, height), file_data))
 
-        new_image_element: Dict[str, Any] = await generate_new_image_element(
-            canvas_id,
-            file_id,
-            {
-                'width': width,
-                'height': height,
-            },
-            canvas_data
-        )
-
-        # Update the canvas data with the new element and file info
-        elements_list = cast(List[Dict[str, Any]], canvas_data['elements'])
-        elements_list.append(new_image_element)
-        canvas_data['files'][file_id] = file_data
+    new_image_elements = await canvas_write_coordinator.add_elements(canvas_id, items)
 
+    image_urls: List[str] = []
+    for (filename, _, _, _), (_, _, _, file_data), new_image_element in zip(images, items, new_image_elements):
         image_url = f"/api/file/{filename}"
-
-        # Save the updated canvas data back to the database
-        await db_service.save_canvas_data(canvas_id, json.dumps(canvas_data))
-
         # Broadcast image generation message to frontend
         await broadcast_session_update(session_id, canvas_id, {
             'type': 'image_generated',
@@ -144,8 +107,23 @@ async def save_image_to_canvas(session_id: str, canvas_id: str, filename: str, m
             'file': file_data,
             'image_url': image_url,
         })
+        image_urls.append(image_url)
+
+    return image_urls
 
-        return image_url
+
+def _image_element_builder(canvas_id: str, file_id: str, width: int, height: int) -> ElementBuilder:
+    async def build(position: Tuple[float, float]) -> Dict[str, Any]:
+        return await generate_new_image_element(
+            canvas_id,
+            file_id,
+            {
+                'width': width,
+                'height': height,
+            },
+            position=position,
+        )
+    return build
 
 
 async def send_image_start_notification(session_id: str, message: str) -> None:
@@ -3,8 +3,11 @@ Image generation core module
 Contains the main orchestration logic for image generation across different providers
 """
 
+import asyncio
 from typing import Optional, Dict, Any
 from common import DEFAULT_PORT
+from services.generation_job_service import generation_job_service
+from services.generation_scheduler import generation_scheduler
 from tools.utils.image_utils import process_input_image
 from ..image_providers.image_base_provider import ImageProviderBase
 
@@ -18,6 +21,7 @@ from ..image_providers.wavespeed_provider import WavespeedProvider
 # from ..image_providers.comfyui_provider import ComfyUIProvider
 from .image_canvas_utils import (
     save_image_to_canvas,
+    save_images_to_canvas,
 )
 import time
 
@@ -39,6 +43,7 @@ async def generate_image_with_provider(
     prompt: str,
     aspect_ratio: str = "1:1",
     input_images: Optional[list[str]] = None,
+    num_images: int = 1,
 ) -> str:
     """
     通用图像生成函数，支持不同的模型和提供商
@@ -51,6 +56,7 @@ async def generate_image_with_provider(
         tool_call_id: 工具调用ID
         config: 上下文运行配置，包含canvas_id，session_id，model_info，由langgraph注入
         input_images: 可选的输入参考图像列表
+        num_images: 生成图像数量，大于 1 时所有图像一起写入画布
 
     Returns:
         str: 生成结果消息
@@ -80,14 +86,57 @@ async def generate_image_with_provider(
         "input_images": input_images or [],
     }
 
-    # Generate image using the selected provider
-    mime_type, width, height, filename = await provider_instance.generate(
-        prompt=prompt,
-        model=model,
-        aspect_ratio=aspect_ratio,
-        input_images=processed_input_images,
-        metadata=metadata,
-    )
+    async def generate_one() -> tuple[str, int, int, str]:
+        # The job record lets a restart resume the remote task
+        async with generation_job_service.track("image", provider, model, canvas_id, session_id):
+            # Provider concurrency / rate limits, shared fairly across sessions
+            return await generation_scheduler.run(
+                provider, session_id,
+                lambda: provider_instance.generate(
+                    prompt=prompt,
+                    model=model,
+                    aspect_ratio=aspect_ratio,
+                    input_images=processed_input_images,
+                    metadata=metadata,
+                ),
+            )
+
+    if num_images > 1:
+        if num_images <= provider_instance.max_images_per_request:
+            # The provider returns all images from one request
+            async with generation_job_service.track("image", provider, model, canvas_id, session_id):
+                images = await generation_scheduler.run(
+                    provider, session_id,
+                    lambda: provider_instance.generate_images(
+                        prompt=prompt,
+                        model=model,
+                        aspect_ratio=aspect_ratio,
+                        input_images=processed_input_images,
+                        metadata=metadata,
+                        num_images=num_images,
+                    ),
+                )
+        else:
+            # One request, scheduler slot and job per image, so each is rate limited and resumable
+            results = await asyncio.gather(*(generate_one() for _ in range(num_images)), return_exceptions=True)
+            images = [result for result in results if not isinstance(result, BaseException)]
+            if not images:
+                raise next(result for result in results if isinstance(result, BaseException))
+            if len(images) < num_images:
+                print(f"⚠️ {num_images - len(images)} of {num_images} images failed")
+
+        # Save all images to canvas in a single write
+        image_urls = await save_images_to_canvas(
+            session_id, canvas_id,
+            [(filename, mime_type, width, height) for mime_type, width, height, filename in images]
+        )
+        image_links = [
+            f"![image_id: {filename}](http://localhost:{DEFAULT_PORT}{image_url})"
+            for (_, _, _, filename), image_url in zip(images, image_urls)
+        ]
+        return f"{len(images)} images generated successfully\n\n" + "\n\n".join(image_links)
+
+    mime_type, width, height, filename = await generate_one()
 
     # Save image to canvas
     image_url = await save_image_to_canvas(
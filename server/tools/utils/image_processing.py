@@ -0,0 +1,124 @@
+"""
+CPU-bound image work executed in the image processing process pool.
+
+Functions here run in worker processes: they must stay importable without the
+rest of the server and take/return only picklable values.
+"""
+
+import os
+import json
+import base64
+import traceback
+from io import BytesIO
+from typing import Any, Optional, Tuple, Union
+from PIL import Image, PngImagePlugin
+
+
+def convert_to_png(
+    source: Union[bytes, str],
+    file_path: str,
+    metadata: Optional[dict[str, Any]] = None,
+) -> Tuple[int, int]:
+    """
+    Decode an image (raw bytes or a file path), convert it to PNG and save it with metadata
+
+    Returns:
+        tuple[int, int]: (width, height)
+    """
+    image = Image.open(BytesIO(source) if isinstance(source, bytes) else source)
+    width, height = image.size
+
+    # Store original format for debugging
+    original_format = image.format or 'Unknown'
+    print(f"Converting {original_format} image to PNG: {width}x{height}")
+
+    # Handle different color modes properly for PNG conversion
+    if image.mode == 'P':
+        # Palette mode - convert to RGBA to preserve potential transparency
+        if 'transparency' in image.info:
+            image = image.convert('RGBA')
+        else:
+            image = image.convert('RGB')
+    elif image.mode == 'LA':
+        # Grayscale with alpha - convert to RGBA
+        image = image.convert('RGBA')
+    elif image.mode == 'L':
+        # Grayscale - can stay as L or convert to RGB
+        # PNG supports grayscale, so we can keep it
+        pass
+    elif image.mode == 'CMYK':
+        # CMYK mode - convert to RGB
+        image = image.convert('RGB')
+    elif image.mode in ('RGB', 'RGBA'):
+        # Already compatible with PNG
+        pass
+    else:
+        # For any other modes, convert to RGB as a safe fallback
+        print(f"Warning: Unusual color mode {image.mode}, converting to RGB")
+        image = image.convert('RGB')
+
+    # Prepare PNG info for metadata
+    pnginfo = PngImagePlugin.PngInfo()
+
+    # Add original format info
+    pnginfo.add_text("original_format", original_format)
+
+    if metadata:
+        for key, value in metadata.items():
+            try:
+                # Handle different value types
+                if isinstance(value, (dict, list)):
+                    # Serialize complex types as JSON
+                    text_value = json.dumps(value, ensure_ascii=False)
+                elif value is None:
+                    text_value = "null"
+                else:
+                    # Convert to string
+                    text_value = str(value)
+
+                pnginfo.add_text(str(key), text_value)
+            except Exception as e:
+                print(f"Warning: Failed to add metadata key '{key}': {e}")
+                traceback.print_stack()
+
+    # Save with optimizations and metadata
+    # Write to a temporary file and rename so readers never see a partial PNG
+    temp_path = f"{file_path}.part"
+    if metadata or original_format != 'PNG':
+        image.save(temp_path, format='PNG', optimize=True, pnginfo=pnginfo)
+    else:
+        image.save(temp_path, format='PNG', optimize=True)
+    os.replace(temp_path, file_path)
+
+    return width, height
+
+
+def encode_data_url(file_path: str, mime_type: str) -> str:
+    """Re-encode an image file in the given mime type and return it as a base64 data URL"""
+    image = Image.open(file_path)
+    with BytesIO() as output:
+        image.save(output, format=str(mime_type.split('/')[1]).upper())
+        b64_data = base64.b64encode(output.getvalue()).decode('utf-8')
+    return f"data:{mime_type};base64,{b64_data}"
+
+
+def make_derivative(source_path: str, dest_path: str, width: int, quality: int = 80) -> Tuple[int, int]:
+    """
+    Write a WebP copy of an image scaled down to at most `width` pixels wide
+
+    Returns:
+        tuple[int, int]: (width, height) of the derivative
+    """
+    with Image.open(source_path) as image:
+        image.draft('RGB', (width, width))  # lets JPEG decode at reduced scale
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.Resampling.LANCZOS)
+        if image.mode not in ('RGB', 'RGBA'):
+            has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        temp_path = f"{dest_path}.part"
+        image.save(temp_path, format='WEBP', quality=quality, method=4)
+        os.replace(temp_path, dest_path)
+        return image.width, image.height
@@ -1,13 +1,11 @@
 import os
-import traceback
-from PIL import Image, PngImagePlugin
-from io import BytesIO
 import base64
-import json
 from typing import Any, Optional, Tuple
 from nanoid import generate
-from utils.http_client import HttpClient
-from services.config_service import FILES_DIR
+from utils.download import IMAGE_DOWNLOAD_MAX_BYTES, download_to_file, sniff_image_size
+from services.asset_store import asset_store
+from services.image_processing_service import image_processing_service
+from tools.utils.image_processing import convert_to_png, encode_data_url
 
 
 def generate_image_id() -> str:
@@ -34,85 +32,35 @@ async def get_image_info_and_save(
         tuple[str, int, int, str]: (mime_type, width, height, extension) - always PNG
     """
     try:
-        if is_b64:
-            image_data = base64.b64decode(url)
-        else:
-            # Fetch the image asynchronously
-            async with HttpClient.create_aiohttp() as session:
-                async with session.get(url) as response:
-                    # Read the image content as bytes
-                    image_data = await response.read()
-
-        # Open image to get info
-        image = Image.open(BytesIO(image_data))
-        width, height = image.size
-        
-        # Store original format for debugging
-        original_format = image.format or 'Unknown'
-        print(f"Converting {original_format} image to PNG: {width}x{height}")
-
-        # Handle different color modes properly for PNG conversion
-        if image.mode == 'P':
-            # Palette mode - convert to RGBA to preserve potential transparency
-            if 'transparency' in image.info:
-                image = image.convert('RGBA')
-            else:
-                image = image.convert('RGB')
-        elif image.mode == 'LA':
-            # Grayscale with alpha - convert to RGBA
-            image = image.convert('RGBA')
-        elif image.mode == 'L':
-            # Grayscale - can stay as L or convert to RGB
-            # PNG supports grayscale, so we can keep it
-            pass
-        elif image.mode == 'CMYK':
-            # CMYK mode - convert to RGB
-            image = image.convert('RGB')
-        elif image.mode in ('RGB', 'RGBA'):
-            # Already compatible with PNG
-            pass
-        else:
-            # For any other modes, convert to RGB as a safe fallback
-            print(f"Warning: Unusual color mode {image.mode}, converting to RGB")
-            image = image.convert('RGB')
-
         # Unified format: always PNG
         extension = 'png'
         mime_type = 'image/png'
-
-        # Prepare PNG info for metadata
-        pnginfo = PngImagePlugin.PngInfo()
-        
-        # Add original format info
-        pnginfo.add_text("original_format", original_format)
-        
-        if metadata:
-            for key, value in metadata.items():
-                try:
-                    # Handle different value types
-                    if isinstance(value, (dict, list)):
-                        # Serialize complex types as JSON
-                        text_value = json.dumps(value, ensure_ascii=False)
-                    elif value is None:
-                        text_value = "null"
-                    else:
-                        # Convert to string
-                        text_value = str(value)
-                    
-                    pnginfo.add_text(str(key), text_value)
-                except Exception as e:
-                    print(f"Warning: Failed to add metadata key '{key}': {e}")
-                    traceback.print_stack()
-
-        # Save as PNG with metadata
         file_path = f"{file_path_without_extension}.{extension}"
-        
-        # Save with optimizations and metadata
-        if metadata or original_format != 'PNG':
-            image.save(file_path, format='PNG', optimize=True, pnginfo=pnginfo)
-        else:
-            image.save(file_path, format='PNG', optimize=True)
-        
+
+        download_path = None
+        try:
+            if is_b64:
+                source: bytes | str = base64.b64decode(url)
+            else:
+                # Stream the image to disk instead of buffering it in memory
+                download_path = f"{file_path_without_extension}.download"
+                download = await download_to_file(url, download_path, IMAGE_DOWNLOAD_MAX_BYTES)
+                sniffed = sniff_image_size(download['head'])
+                if sniffed is None and not (download['content_type'] or '').startswith('image/'):
+                    raise ValueError(f"Downloaded content is not an image ({download['content_type']}): {url}")
+                if sniffed:
+                    print(f"Downloaded {sniffed[0]} image {sniffed[1]}x{sniffed[2]}, {download['size']} bytes, sha256 {download['sha256'][:12]}")
+                source = download_path
+
+            # Decode/convert/encode in the image process pool to keep the event loop responsive
+            width, height = await image_processing_service.run(convert_to_png, source, file_path, metadata)
+        finally:
+            if download_path and os.path.exists(download_path):
+                os.remove(download_path)
+
+        # Record in the content-addressed store; identical images share one blob
+        await asset_store.ingest(file_path)
+
         print(f"Successfully saved as PNG: {file_path}")
         return mime_type, width, height, extension
 
@@ -148,12 +96,11 @@ async def process_input_image(input_image: str | None) -> str | None:
         return None
 
     try:
-        full_path = os.path.join(FILES_DIR, input_image)
-        if not os.path.exists(full_path):
-            print(f"Warning: Image file not found: {full_path}")
+        full_path = await asset_store.resolve_path(input_image)
+        if full_path is None:
+            print(f"Warning: Image file not found: {input_image}")
             return None
 
-        image = Image.open(full_path)
         ext = os.path.splitext(input_image)[1].lower()
         mime_type_map = {
             '.png': 'image/png',
@@ -163,13 +110,7 @@ async def process_input_image(input_image: str | None) -> str | None:
         }
         mime_type = mime_type_map.get(ext, 'image/jpeg')
 
-        with BytesIO() as output:
-            image.save(output, format=str(mime_type.split('/')[1]).upper())
-            compressed_data = output.getvalue()
-            b64_data = base64.b64encode(compressed_data).decode('utf-8')
-
-        data_url = f"data:{mime_type};base64,{b64_data}"
-        return data_url
+        return await image_processing_service.run(encode_data_url, full_path, mime_type)
 
     except Exception as e:
         print(f"Error processing image {input_image}: {e}")
@@ -3,18 +3,16 @@ Video canvas utilities module
 Contains functions for video processing, canvas operations, and notifications
 """
 
-import json
 import time
 import os
-import asyncio
-from contextlib import asynccontextmanager
 from typing import Dict, List, Any, Tuple, Optional, Union
 from services.config_service import FILES_DIR
+from services.asset_store import asset_store
 from services.db_service import db_service
 from services.websocket_service import send_to_websocket, broadcast_session_update  # type: ignore
 from common import DEFAULT_PORT
-from utils.http_client import HttpClient
-import aiofiles
+from tools.utils.canvas_write_coordinator import canvas_write_coordinator
+from utils.download import VIDEO_DOWNLOAD_MAX_BYTES, download_to_file
 import mimetypes
 from pymediainfo import MediaInfo
 from nanoid import generate
@@ -22,25 +20,6 @@ import random
 from utils.canvas import find_next_best_element_position
 
 
-class CanvasLockManager:
-    """Canvas lock manager to prevent concurrent operations causing position overlap"""
-
-    def __init__(self) -> None:
-        self._locks: Dict[str, asyncio.Lock] = {}
-
-    @asynccontextmanager
-    async def lock_canvas(self, canvas_id: str):
-        if canvas_id not in self._locks:
-            self._locks[canvas_id] = asyncio.Lock()
-
-        async with self._locks[canvas_id]:
-            yield
-
-
-# Global lock manager instance
-canvas_lock_manager = CanvasLockManager()
-
-
 async def save_video_to_canvas(
     session_id: str,
     canvas_id: str,
@@ -57,60 +36,44 @@ async def save_video_to_canvas(
     Returns:
         Tuple of (filename, file_data, new_video_element)
     """
-    # Use lock to ensure atomicity of the save process
-    async with canvas_lock_manager.lock_canvas(canvas_id):
-        # Generate unique video ID
-        video_id = generate_video_file_id()
-
-        # Download and save video
-        print(f"🎥 Downloading video from: {video_url}")
-        mime_type, width, height, extension = await get_video_info_and_save(
-            video_url, os.path.join(FILES_DIR, f"{video_id}")
-        )
-        filename = f"{video_id}.{extension}"
+    # Generate unique video ID
+    video_id = generate_video_file_id()
 
-        print(f"🎥 Video saved as: {filename}, dimensions: {width}x{height}")
+    # Download and save video (outside the canvas lock)
+    print(f"🎥 Downloading video from: {video_url}")
+    mime_type, width, height, extension = await get_video_info_and_save(
+        video_url, os.path.join(FILES_DIR, f"{video_id}")
+    )
+    filename = f"{video_id}.{extension}"
 
-        # Create file data
-        file_id = generate_video_file_id()
-        file_url = f"/api/file/{filename}"
+    print(f"🎥 Video saved as: {filename}, dimensions: {width}x{height}")
 
-        file_data: Dict[str, Any] = {
-            "mimeType": mime_type,
-            "id": file_id,
-            "dataURL": file_url,
-            "created": int(time.time() * 1000),
-        }
+    # Create file data
+    file_id = generate_video_file_id()
+    file_url = f"/api/file/{filename}"
 
-        # Create new video element for canvas
-        new_video_element: Dict[str, Any] = await generate_new_video_element(
+    file_data: Dict[str, Any] = {
+        "mimeType": mime_type,
+        "id": file_id,
+        "dataURL": file_url,
+        "created": int(time.time() * 1000),
+    }
+
+    async def build_element(position: Tuple[float, float]) -> Dict[str, Any]:
+        return await generate_new_video_element(
             canvas_id,
             file_id,
             {
                 "width": width,
                 "height": height,
             },
+            position=position,
         )
 
-        # Update canvas data
-        canvas_data: Optional[Dict[str, Any]] = await db_service.get_canvas_data(canvas_id)
-        if canvas_data is None:
-            canvas_data = {}
-        if "data" not in canvas_data:
-            canvas_data["data"] = {}
-        if "elements" not in canvas_data["data"]:
-            canvas_data["data"]["elements"] = []
-        if "files" not in canvas_data["data"]:
-            canvas_data["data"]["files"] = {}
-
-        canvas_data["data"]["elements"].append(
-            new_video_element)  # type: ignore
-        canvas_data["data"]["files"][file_id] = file_data
+    # Position and write through the coordinator shared with image tools
+    new_video_element = await canvas_write_coordinator.add_element(canvas_id, width, height, build_element, file_data)
 
-        # Save updated canvas data
-        await db_service.save_canvas_data(canvas_id, json.dumps(canvas_data["data"]))
-
-        return filename, file_data, new_video_element
+    return filename, file_data, new_video_element
 
 
 async def send_video_start_notification(session_id: str, message: str) -> None:
@@ -207,16 +170,10 @@ def generate_video_file_id() -> str:
 async def get_video_info_and_save(
     url: str, file_path_without_extension: str
 ) -> Tuple[str, int, int, str]:
-    # Fetch the video asynchronously
-    async with HttpClient.create_aiohttp() as session:
-        async with session.get(url) as response:
-            video_content = await response.read()
-
-    # Save to temporary mp4 file first
+    # Stream the video straight to disk instead of buffering the whole file
     temp_path = f"{file_path_without_extension}.mp4"
-    async with aiofiles.open(temp_path, "wb") as out_file:
-        await out_file.write(video_content)
-    print("🎥 Video saved to", temp_path)
+    download = await download_to_file(url, temp_path, VIDEO_DOWNLOAD_MAX_BYTES)
+    print(f"🎥 Video saved to {temp_path} ({download['size']} bytes, sha256 {download['sha256'][:12]})")
 
     try:
         media_info = MediaInfo.parse(temp_path)  # type: ignore
@@ -235,12 +192,18 @@ async def get_video_info_and_save(
         # Get mime type
         mime_type = mimetypes.types_map.get(".mp4", "video/mp4")
 
+        # Record in the content-addressed store after probing
+        await asset_store.ingest(temp_path)
+
         print(
             f"🎥 Video info - width: {width}, height: {height}, mime_type: {mime_type}, extension: {extension}"
         )
 
         return mime_type, width, height, extension
-    except Exception as e:
+    except BaseException as e:
+        # Also covers cancellation: the downloaded file never reached the asset store
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
         print(f"Error probing video file {temp_path}: {str(e)}")
         raise e
 
@@ -250,15 +213,17 @@ async def generate_new_video_element(
     fileid: str,
     video_data: Dict[str, Any],
     canvas_data: Optional[Dict[str, Any]] = None,
+    position: Optional[Tuple[float, float]] = None,
 ) -> Dict[str, Any]:
     """Generate new video element for canvas"""
-    if canvas_data is None:
-        canvas = await db_service.get_canvas_data(canvas_id)
-        if canvas is None:
-            canvas = {"data": {}}
-        canvas_data = canvas.get("data", {})
-
-    new_x, new_y = await find_next_best_element_position(canvas_data)
+    if position is not None:
+        new_x, new_y = position
+    else:
+        if canvas_data is None:
+            # Placement only needs element geometry
+            elements = await db_service.get_canvas_elements(canvas_id)
+            canvas_data = {"elements": elements or []}
+        new_x, new_y = await find_next_best_element_position(canvas_data)
 
     return {
         "type": "video",
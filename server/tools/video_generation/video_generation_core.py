@@ -6,6 +6,8 @@ Contains the main orchestration logic for video generation across different prov
 import traceback
 from typing import List, cast, Optional, Any
 from models.config_model import ModelInfo
+from services.generation_job_service import generation_job_service
+from services.generation_scheduler import generation_scheduler
 from ..video_providers.video_base_provider import get_default_provider, VideoProviderBase
 # Import all providers to ensure automatic registration (don't delete these imports)
 from ..video_providers.volces_provider import VolcesVideoProvider  # type: ignore
@@ -88,25 +90,30 @@ async def generate_video_with_provider(
             # For now, just pass them as is
             processed_input_images = input_images
 
-        # Generate video using the selected provider
-        video_url = await provider_instance.generate(
-            prompt=prompt,
-            model=model,
-            resolution=resolution,
-            duration=duration,
-            aspect_ratio=aspect_ratio,
-            input_images=processed_input_images,
-            camera_fixed=camera_fixed,
-            **kwargs
-        )
-
-        # Process video result (save, update canvas, notify)
-        return await process_video_result(
-            video_url=video_url,
-            session_id=session_id,
-            canvas_id=canvas_id,
-            provider_name=f"{model_name} ({provider_name})"
-        )
+        # Generate video using the selected provider; the job record lets a restart resume the remote task
+        async with generation_job_service.track('video', provider_name, model, canvas_id, session_id):
+            # Provider concurrency / rate limits, shared fairly across sessions
+            video_url = await generation_scheduler.run(
+                provider_name, session_id,
+                lambda: provider_instance.generate(
+                    prompt=prompt,
+                    model=model,
+                    resolution=resolution,
+                    duration=duration,
+                    aspect_ratio=aspect_ratio,
+                    input_images=processed_input_images,
+                    camera_fixed=camera_fixed,
+                    **kwargs
+                ),
+            )
+
+            # Process video result (save, update canvas, notify)
+            return await process_video_result(
+                video_url=video_url,
+                session_id=session_id,
+                canvas_id=canvas_id,
+                provider_name=f"{model_name} ({provider_name})"
+            )
 
     except Exception as e:
         error_message = str(e)
@@ -1,7 +1,6 @@
 # from engineio import payload
-from utils.http_client import HttpClient
+from utils.download import VIDEO_DOWNLOAD_MAX_BYTES, download_to_file
 
-import aiofiles
 import io
 import os
 import base64
@@ -15,7 +14,7 @@ from pymediainfo import MediaInfo
 from PIL import Image
 
 
-from services.config_service import FILES_DIR
+from services.asset_store import asset_store
 
 
 def generate_video_file_id():
@@ -25,16 +24,10 @@ def generate_video_file_id():
 async def get_video_info_and_save(
     url: str, file_path_without_extension: str
 ) -> tuple[str, int, int, str]:
-    # Fetch the video asynchronously
-    async with HttpClient.create_aiohttp() as session:
-        async with session.get(url) as response:
-            video_content = await response.read()
-
-    # Save to temporary mp4 file first
+    # Stream the video straight to disk instead of buffering the whole file
     temp_path = f"{file_path_without_extension}.mp4"
-    async with aiofiles.open(temp_path, "wb") as out_file:
-        await out_file.write(video_content)
-    print("🎥 Video saved to", temp_path)
+    download = await download_to_file(url, temp_path, VIDEO_DOWNLOAD_MAX_BYTES)
+    print(f"🎥 Video saved to {temp_path} ({download['size']} bytes, sha256 {download['sha256'][:12]})")
 
     try:
         media_info = MediaInfo.parse(temp_path)
@@ -49,19 +42,27 @@ async def get_video_info_and_save(
         # Get mime type
         mime_type = mimetypes.types_map.get(".mp4", "video/mp4")
 
+        # Record in the content-addressed store after probing
+        await asset_store.ingest(temp_path)
+
         print(
             f"🎥 Video info - width: {width}, height: {height}, mime_type: {mime_type}, extension: {extension}"
         )
 
         return mime_type, width, height, extension
-    except Exception as e:
+    except BaseException as e:
+        # Also covers cancellation: the downloaded file never reached the asset store
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
         print(f"Error probing video file {temp_path}: {str(e)}")
         raise e
 
 
-def get_image_base64(image_name: str):
+async def get_image_base64(image_name: str):
     # Process image
-    image_path = os.path.join(FILES_DIR, f"{image_name}")
+    image_path = await asset_store.resolve_path(image_name)
+    if image_path is None:
+        raise FileNotFoundError(f"Image file not found: {image_name}")
     image = Image.open(image_path)
 
     # 可爱的豆包，鲁棒性太拉了，拉的想骂人(图片支支持0.4-2.5比例的)
@@ -1,11 +1,98 @@
-import json
+import hashlib
 import traceback
-import asyncio
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
 from .video_base_provider import VideoProviderBase
 from utils.http_client import HttpClient
 from services.config_service import config_service
+from services.generation_job_service import generation_job_service
+from services.generation_scheduler import RateLimitError, parse_retry_after
+from models.db_model import GenerationJob
+from services.task_tracker import (
+    TaskBackend, TaskUpdate, PollProfile, task_tracker,
+    pending_update, succeeded_update, failed_update,
+)
+
+
+def parse_volces_task(task: Dict[str, Any]) -> TaskUpdate:
+    """Map a Volces generation task to a tracker update"""
+    status = task.get("status")
+    if status == "succeeded":
+        video_url = task.get("content", {}).get("video_url")
+        if video_url and isinstance(video_url, str):
+            return succeeded_update(task)
+        return failed_update("No video URL found in successful response", task)
+    if status in ("failed", "cancelled"):
+        detail_error = task.get("detail") or task.get("error") or f"Task failed with status: {status}"
+        return failed_update(f"Volces video generation failed: {detail_error}", task)
+    return pending_update(task)
+
+
+def _parse_volces_webhook(payload: Dict[str, Any]) -> Optional[Tuple[str, TaskUpdate]]:
+    """Volces callbacks carry the same task object as the query API"""
+    if not payload.get("id"):
+        return None
+    return str(payload["id"]), parse_volces_task(payload)
+
+
+task_tracker.register_webhook("volces", _parse_volces_webhook)
+
+
+class VolcesTaskBackend(TaskBackend):
+    """Volces task status queries; several tasks are fetched with one list request"""
+    provider = "volces"
+    max_batch = 20
+    profile = PollProfile(min_interval=3.0, max_interval=20.0, timeout=900.0)
+
+    def __init__(self, base_url: str, api_key: str):
+        self.base_url = base_url
+        self.api_key = api_key
+
+    @property
+    def key(self) -> str:
+        key_hash = hashlib.sha256(self.api_key.encode()).hexdigest()[:12]
+        return f"{self.provider}:{self.base_url}:{key_hash}"
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    async def _fetch_one(self, task_id: str) -> TaskUpdate:
+        async with HttpClient.create_aiohttp() as session:
+            async with session.get(f"{self.base_url}/contents/generations/tasks/{task_id}", headers=self._headers()) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to get Volces task status: HTTP {response.status}")
+                return parse_volces_task(await response.json())
+
+    async def fetch(self, task_ids: List[str]) -> Dict[str, TaskUpdate]:
+        if len(task_ids) == 1:
+            return {task_ids[0]: await self._fetch_one(task_ids[0])}
+
+        params = [("page_size", str(len(task_ids)))] + [("filter.task_ids", task_id) for task_id in task_ids]
+        async with HttpClient.create_aiohttp() as session:
+            async with session.get(f"{self.base_url}/contents/generations/tasks", headers=self._headers(), params=params) as response:
+                if response.status != 200:
+                    raise Exception(f"Failed to list Volces tasks: HTTP {response.status}")
+                data = await response.json()
+
+        updates = {
+            str(task.get("id")): parse_volces_task(task)
+            for task in data.get("items") or []
+            if task.get("id") in task_ids
+        }
+        # Tasks missing from the list response are fetched one by one
+        for task_id in task_ids:
+            if task_id not in updates:
+                updates[task_id] = await self._fetch_one(task_id)
+        return updates
+
+
+async def _resume_volces_job(job: GenerationJob) -> str:
+    """Resume waiting for a Volces video task created before a restart"""
+    provider = VolcesVideoProvider()
+    return await provider._poll_task_status(job["remote_task_id"], job.get("model", ""))
+
+
+generation_job_service.register_resumer("video", "volces", _resume_volces_job)
 
 
 class VolcesVideoProvider(VideoProviderBase, provider_name="volces"):
@@ -87,36 +174,10 @@ class VolcesVideoProvider(VideoProviderBase, provider_name="volces"):
 
         return payload
 
-    async def _poll_task_status(self, task_id: str, headers: Dict[str, str]) -> str:
-        """Poll task status until completion"""
-        polling_url = f"{self.base_url}/contents/generations/tasks/{task_id}"
-        status = "submitted"
-
-        async with HttpClient.create_aiohttp() as session:
-            while status not in ("succeeded", "failed", "cancelled"):
-                print(
-                    f"🎥 Polling Volces generation {task_id}, current status: {status} ...")
-                await asyncio.sleep(3)  # Wait 3 seconds between polls
-
-                async with session.get(polling_url, headers=headers) as poll_response:
-                    poll_res = await poll_response.json()
-                    status = poll_res.get("status", None)
-
-                    if status == "succeeded":
-                        output = poll_res.get(
-                            "content", {}).get("video_url", None)
-                        if output and isinstance(output, str):
-                            return output
-                        else:
-                            raise Exception(
-                                "No video URL found in successful response")
-                    elif status in ("failed", "cancelled"):
-                        detail_error = poll_res.get(
-                            "detail", f"Task failed with status: {status}")
-                        raise Exception(
-                            f"Volces video generation failed: {detail_error}")
-
-        raise Exception(f"Task polling failed with final status: {status}")
+    async def _poll_task_status(self, task_id: str, model: str) -> str:
+        """Wait for task completion through the shared task tracker"""
+        task = await task_tracker.wait(VolcesTaskBackend(self.base_url, self.api_key), task_id, model=model)
+        return task["content"]["video_url"]
 
     async def generate(
         self,
@@ -154,6 +215,10 @@ class VolcesVideoProvider(VideoProviderBase, provider_name="volces"):
                 input_image_data=input_image_data,
                 **kwargs
             )
+            # Let Volces push the result when the server is reachable from outside
+            callback_url = task_tracker.webhook_url("volces")
+            if callback_url:
+                payload["callback_url"] = callback_url
 
             print(
                 f"🎥 Starting Volces video generation")
@@ -161,6 +226,9 @@ class VolcesVideoProvider(VideoProviderBase, provider_name="volces"):
             # Make API request to create task
             async with HttpClient.create_aiohttp() as session:
                 async with session.post(api_url, headers=headers, json=payload) as response:
+                    if response.status == 429:
+                        raise RateLimitError(
+                            "Volces rate limit exceeded", parse_retry_after(response.headers))
                     if response.status != 200:
                         try:
                             error_data = await response.json()
@@ -182,8 +250,11 @@ class VolcesVideoProvider(VideoProviderBase, provider_name="volces"):
                 print(
                     f"🎥 Volces video generation task created, task_id: {task_id}")
 
+            # Record the task id so a restart can resume waiting for it
+            await generation_job_service.attach_remote_task(task_id)
+
             # Poll for task completion
-            video_url = await self._poll_task_status(task_id, headers)
+            video_url = await self._poll_task_status(task_id, payload["model"])
             print(
                 f"🎥 Volces video generation completed, video URL: {video_url}")
 
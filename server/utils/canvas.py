@@ -1,58 +1,137 @@
-from typing import Optional, Dict, Any, Union
-from services.db_service import db_service
+import bisect
+from typing import Optional, Dict, Any, Union, List, Iterable, Tuple
+from models.db_model import CanvasOp
+
+
+def apply_canvas_ops(canvas_data: Dict[str, Any], ops: Iterable[CanvasOp]) -> Dict[str, Any]:
+    """
+    Fold patch-log operations onto a canvas snapshot (in place) and return it.
+    Elements keep their original order; appends for an existing id update it in place.
+    """
+    elements: List[Optional[Dict[str, Any]]] = list(canvas_data.get("elements") or [])
+    files: Dict[str, Any] = canvas_data.get("files") or {}
+    index = {e.get("id"): i for i, e in enumerate(elements) if e}
+
+    for op in ops:
+        kind = op.get("op")
+        payload = op.get("payload")
+        if kind in ("append", "update") and payload is not None:
+            element_id = op.get("element_id") or payload.get("id")
+            if element_id in index:
+                elements[index[element_id]] = payload
+            else:
+                index[element_id] = len(elements)
+                elements.append(payload)
+        elif kind == "delete":
+            i = index.pop(op.get("element_id"), None)
+            if i is not None:
+                elements[i] = None
+        elif kind == "file" and payload is not None:
+            files[payload.get("id") or op.get("element_id")] = payload
+        elif kind == "app_state" and payload is not None:
+            canvas_data["appState"] = payload
+
+    canvas_data["elements"] = [e for e in elements if e is not None]
+    canvas_data["files"] = files
+    return canvas_data
+
+
+MEDIA_ELEMENT_TYPES = ("image", "embeddable", "video")
+
+
+class _RowBand:
+    __slots__ = ("top", "bottom", "count", "right_x", "right_width")
+
+    def __init__(self, top: float, bottom: float, x: float, width: float):
+        self.top = top
+        self.bottom = bottom
+        self.count = 1
+        # Element with the largest x in the row; new elements go to its right
+        self.right_x = x
+        self.right_width = width
+
+    def absorb(self, other: "_RowBand") -> None:
+        self.top = min(self.top, other.top)
+        self.bottom = max(self.bottom, other.bottom)
+        self.count += other.count
+        if other.right_x > self.right_x:
+            self.right_x, self.right_width = other.right_x, other.right_width
+
+
+class CanvasSpatialIndex:
+    """
+    Row-band index of media elements used for placement.
+
+    Elements whose vertical extents overlap are grouped into one row band. Bands never
+    overlap, so they are kept sorted by top and located with bisect; the last band is the
+    bottom row of the canvas. Adding an element is O(log n) plus merging of the bands it
+    bridges, and next_position() is O(1).
+    """
+
+    def __init__(self, max_num_per_row: int = 4, spacing: float = 20):
+        self.max_num_per_row = max_num_per_row
+        self.spacing = spacing
+        self._tops: List[float] = []
+        self._bands: List[_RowBand] = []
+
+    @classmethod
+    def from_elements(cls, elements: Iterable[Dict[str, Any]], max_num_per_row: int = 4, spacing: float = 20) -> "CanvasSpatialIndex":
+        index = cls(max_num_per_row, spacing)
+        for element in elements:
+            if element.get("type") in MEDIA_ELEMENT_TYPES and not element.get("isDeleted"):
+                index.add(
+                    element.get("x") or 0,
+                    element.get("y") or 0,
+                    element.get("width") or 0,
+                    element.get("height") or 0,
+                )
+        return index
+
+    def __len__(self) -> int:
+        return sum(band.count for band in self._bands)
+
+    def add(self, x: float, y: float, width: float, height: float) -> None:
+        band = _RowBand(y, y + max(height, 0), x, width)
+
+        # Bands starting before this element ends; those overlapping it form a contiguous tail
+        end = bisect.bisect_left(self._tops, band.bottom) if height > 0 else bisect.bisect_right(self._tops, y)
+        start = end
+        while start > 0 and self._bands[start - 1].bottom > y:
+            start -= 1
+
+        for other in self._bands[start:end]:
+            band.absorb(other)
+        self._bands[start:end] = [band]
+        self._tops[start:end] = [band.top]
+
+    def next_position(self) -> Tuple[float, float]:
+        if not self._bands:
+            return 0, 0
+
+        last_row = self._bands[-1]
+        if last_row.count < self.max_num_per_row:
+            # Add to the last row, aligned with its top
+            return last_row.right_x + last_row.right_width + self.spacing, last_row.top
+
+        # Start a new row below the entire last row
+        return 0, last_row.bottom + self.spacing
+
+    def place(self, width: float, height: float) -> Tuple[float, float]:
+        """Reserve the next free slot for an element of the given size"""
+        x, y = self.next_position()
+        self.add(x, y, width, height)
+        return x, y
+
+    def place_batch(self, sizes: Iterable[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        """Reserve slots for several elements so parallel generations tile correctly"""
+        return [self.place(width, height) for width, height in sizes]
+
 
 async def find_next_best_element_position(canvas_data, max_num_per_row=4, spacing=20):
     """
     Calculates the next best position for a new element on the canvas.
-    This final version uses a robust row detection algorithm to handle complex layouts.
+    Builds a CanvasSpatialIndex over the current elements; callers placing several
+    elements should keep the index and use CanvasSpatialIndex.place instead.
     """
-    elements = canvas_data.get("elements", [])
-    
-    media_elements = [
-        e for e in elements 
-        if e.get("type") in ["image", "embeddable", "video"] and not e.get("isDeleted")
-    ]
-
-    if not media_elements:
-        return 0, 0
-
-    # Sort elements by their top-left corner
-    media_elements.sort(key=lambda e: (e.get("y", 0), e.get("x", 0)))
-
-    # Group elements into rows based on vertical overlap
-    rows = []
-    for element in media_elements:
-        y, height = element.get("y", 0), element.get("height", 0)
-        placed = False
-        for row in rows:
-            # Check if the element vertically overlaps with any element in the row
-            if any(max(y, r.get("y", 0)) < min(y + height, r.get("y", 0) + r.get("height", 0)) for r in row):
-                row.append(element)
-                placed = True
-                break
-        if not placed:
-            rows.append([element])
-
-    # Sort rows by their average y-coordinate
-    rows.sort(key=lambda row: sum(e.get("y", 0) for e in row) / len(row))
-
-    if not rows:
-        return 0, 0
-
-    last_row = rows[-1]
-    last_row.sort(key=lambda e: e.get("x", 0))
-
-    if len(last_row) < max_num_per_row:
-        # Add to the last row
-        rightmost_element = last_row[-1]
-        new_x = rightmost_element.get("x", 0) + rightmost_element.get("width", 0) + spacing
-        # Align with the top of the last row for consistency
-        new_y = min(e.get("y", 0) for e in last_row)
-    else:
-        # Start a new row
-        new_x = 0
-        # Position below the entire last row
-        bottom_of_last_row = max(e.get("y", 0) + e.get("height", 0) for e in last_row)
-        new_y = bottom_of_last_row + spacing
-
-    return new_x, new_y
\ No newline at end of file
+    index = CanvasSpatialIndex.from_elements(canvas_data.get("elements") or [], max_num_per_row, spacing)
+    return index.next_position()
@@ -0,0 +1,86 @@
+"""
+Micro-benchmark for canvas element placement.
+
+Compares the previous O(n^2) row-grouping scan with CanvasSpatialIndex at 100, 1k and 10k
+elements. Run from the server directory:
+
+    python -m utils.canvas_benchmark
+"""
+
+import random
+import time
+from typing import Any, Dict, List, Tuple
+
+from utils.canvas import CanvasSpatialIndex
+
+SIZES = (100, 1_000, 10_000)
+BATCH = 8
+# The legacy scan takes about a minute at 10k elements
+LEGACY_MAX = 1_000
+
+
+def _legacy_next_position(elements: List[Dict[str, Any]], max_num_per_row: int = 4, spacing: int = 20) -> Tuple[float, float]:
+    """Row grouping as it was before the spatial index, kept only for comparison"""
+    media_elements = [e for e in elements if e.get("type") in ["image", "embeddable", "video"] and not e.get("isDeleted")]
+    if not media_elements:
+        return 0, 0
+    media_elements.sort(key=lambda e: (e.get("y", 0), e.get("x", 0)))
+    rows: List[List[Dict[str, Any]]] = []
+    for element in media_elements:
+        y, height = element.get("y", 0), element.get("height", 0)
+        for row in rows:
+            if any(max(y, r.get("y", 0)) < min(y + height, r.get("y", 0) + r.get("height", 0)) for r in row):
+                row.append(element)
+                break
+        else:
+            rows.append([element])
+    rows.sort(key=lambda row: sum(e.get("y", 0) for e in row) / len(row))
+    last_row = sorted(rows[-1], key=lambda e: e.get("x", 0))
+    if len(last_row) < max_num_per_row:
+        rightmost = last_row[-1]
+        return rightmost.get("x", 0) + rightmost.get("width", 0) + spacing, min(e.get("y", 0) for e in last_row)
+    return 0, max(e.get("y", 0) + e.get("height", 0) for e in last_row) + spacing
+
+
+def _make_canvas(n: int) -> List[Dict[str, Any]]:
+    """n images tiled the way the placement algorithm lays them out, with mixed sizes"""
+    rng = random.Random(n)
+    index = CanvasSpatialIndex()
+    elements = []
+    for i in range(n):
+        width, height = rng.randint(256, 1024), rng.randint(256, 1024)
+        x, y = index.place(width, height)
+        elements.append({"id": str(i), "type": "image", "x": x, "y": y, "width": width, "height": height})
+    rng.shuffle(elements)
+    return elements
+
+
+def _timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    print(f"{'elements':>10} {'legacy ms':>12} {'build ms':>12} {'place ms':>12} {f'batch {BATCH} ms':>14}")
+    for n in SIZES:
+        elements = _make_canvas(n)
+        repeat = max(1, 2000 // n)
+
+        build_ms = _timed(lambda: CanvasSpatialIndex.from_elements(elements), repeat)
+        index = CanvasSpatialIndex.from_elements(elements)
+
+        legacy = "-"
+        if n <= LEGACY_MAX:
+            legacy = f"{_timed(lambda: _legacy_next_position(elements), repeat):.3f}"
+            assert index.next_position() == _legacy_next_position(elements)
+
+        place_ms = _timed(lambda: index.place(512, 512), 1000)
+        batch_ms = _timed(lambda: index.place_batch([(512, 512)] * BATCH), 100)
+
+        print(f"{n:>10} {legacy:>12} {build_ms:>12.3f} {place_ms:>12.4f} {batch_ms:>14.4f}")
+
+
+if __name__ == "__main__":
+    main()
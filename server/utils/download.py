@@ -0,0 +1,105 @@
+"""
+Streaming downloads of generated assets.
+
+Responses are written to disk chunk by chunk instead of being buffered with
+response.read(): the body goes to a temporary file next to the destination, is hashed
+while it streams and is renamed into place only once complete, so readers never see a
+partial asset. A size guard aborts downloads that exceed the configured limit.
+"""
+
+import os
+import hashlib
+from io import BytesIO
+from typing import Optional, Tuple, TypedDict
+
+import aiofiles
+from nanoid import generate
+from PIL import Image
+
+from utils.http_client import HttpClient
+
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("DOWNLOAD_CHUNK_SIZE", 256 * 1024))
+# Bytes kept from the start of the body for format/dimension sniffing
+DOWNLOAD_HEAD_SIZE = 64 * 1024
+IMAGE_DOWNLOAD_MAX_BYTES = int(os.environ.get("IMAGE_DOWNLOAD_MAX_BYTES", 64 * 1024 * 1024))
+VIDEO_DOWNLOAD_MAX_BYTES = int(os.environ.get("VIDEO_DOWNLOAD_MAX_BYTES", 1024 * 1024 * 1024))
+
+
+class DownloadTooLargeError(ValueError):
+    """Raised when a download exceeds its max_bytes limit"""
+
+
+class DownloadResult(TypedDict):
+    path: str
+    size: int
+    sha256: str
+    content_type: Optional[str]
+    head: bytes
+
+
+async def download_to_file(url: str, dest_path: str, max_bytes: int) -> DownloadResult:
+    """
+    Stream url into dest_path with an atomic rename
+
+    Args:
+        url: URL to download
+        dest_path: Final file path; the temporary file is created in the same directory
+        max_bytes: Abort and discard the download once the body exceeds this size
+
+    Returns:
+        DownloadResult with the size, sha256 hex digest, content type and the first
+        DOWNLOAD_HEAD_SIZE bytes of the body
+    """
+    temp_path = f"{dest_path}.{generate(size=6)}.part"
+    digest = hashlib.sha256()
+    head = bytearray()
+    size = 0
+    try:
+        async with HttpClient.create_aiohttp() as session:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                if response.content_length is not None and response.content_length > max_bytes:
+                    raise DownloadTooLargeError(
+                        f"Download of {response.content_length} bytes exceeds limit of {max_bytes} bytes: {url}")
+
+                async with aiofiles.open(temp_path, "wb") as out_file:
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > max_bytes:
+                            raise DownloadTooLargeError(
+                                f"Download exceeds limit of {max_bytes} bytes: {url}")
+                        digest.update(chunk)
+                        if len(head) < DOWNLOAD_HEAD_SIZE:
+                            head.extend(chunk[:DOWNLOAD_HEAD_SIZE - len(head)])
+                        await out_file.write(chunk)
+                content_type = response.content_type
+
+        os.replace(temp_path, dest_path)
+    except BaseException:
+        # Also covers cancellation of the generation task
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return {
+        'path': dest_path,
+        'size': size,
+        'sha256': digest.hexdigest(),
+        'content_type': content_type,
+        'head': bytes(head),
+    }
+
+
+def sniff_image_size(head: bytes) -> Optional[Tuple[str, int, int]]:
+    """
+    Read (format, width, height) from the leading bytes of an image
+
+    PIL only parses the header on open, so the first few KB are enough for PNG, GIF,
+    WebP and most JPEGs. Returns None if the bytes are not a recognizable image.
+    """
+    try:
+        with Image.open(BytesIO(head)) as image:
+            width, height = image.size
+            return image.format or 'Unknown', width, height
+    except Exception:
+        return None
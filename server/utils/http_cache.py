@@ -0,0 +1,73 @@
+"""
+Cache validators for file responses.
+
+FileResponse already answers Range requests (206 / multipart byteranges) and sets
+ETag/Last-Modified, but it never answers conditional requests. cached_file_response
+adds the 304 handling StaticFiles does and picks the Cache-Control policy:
+
+- immutable: content-addressed files whose name never points at different bytes
+- revalidate: files that may change in place; browsers keep them but check the ETag
+"""
+
+import os
+from email.utils import parsedate
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import FileResponse
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import NotModifiedResponse
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+NO_STORE_CACHE_CONTROL = "no-store, no-cache, must-revalidate, max-age=0"
+
+
+def is_not_modified(response_headers: Headers, request_headers: Headers) -> bool:
+    """Same rules as StaticFiles.is_not_modified: If-None-Match wins over If-Modified-Since"""
+    if if_none_match := request_headers.get("if-none-match"):
+        if if_none_match.strip() == "*":
+            return True
+        etag = response_headers["etag"].removeprefix("W/")
+        return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+    if_modified_since = parsedate(request_headers.get("if-modified-since", ""))
+    last_modified = parsedate(response_headers.get("last-modified", ""))
+    return if_modified_since is not None and last_modified is not None and if_modified_since >= last_modified
+
+
+def cached_file_response(
+    request: Request,
+    path: str,
+    *,
+    etag: Optional[str] = None,
+    immutable: bool = False,
+    media_type: Optional[str] = None,
+    filename: Optional[str] = None,
+) -> Response:
+    """
+    FileResponse with conditional request and Cache-Control handling
+
+    Args:
+        request: Incoming request, for If-None-Match / If-Modified-Since
+        path: File to serve
+        etag: Strong validator (e.g. the content sha256); defaults to Starlette's mtime/size hash
+        immutable: Allow clients to cache the response for a year without revalidating
+        media_type: Content type, guessed from path if omitted
+        filename: Sets Content-Disposition when given
+    """
+    headers = {"cache-control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL}
+    if etag:
+        headers["etag"] = f'"{etag}"'
+
+    response = FileResponse(
+        path,
+        media_type=media_type,
+        filename=filename,
+        headers=headers,
+        stat_result=os.stat(path),
+    )
+    if is_not_modified(response.headers, request.headers):
+        return NotModifiedResponse(response.headers)
+    return response
@@ -6,13 +6,15 @@ HTTP 客户端工厂和管理器
 - 连接池管理和超时控制
 - 同步和异步客户端支持
 - 支持代理环境变量 (trust_env=True)
+- 长连接复用：异步客户端共享按主机分池的连接池（keep-alive，httpx 支持时启用 HTTP/2），
+  由应用 lifespan 在关闭时调用 HttpClient.aclose_shared() 释放
 
 使用指南：
-1. httpx 客户端：
+1. httpx 客户端（共享连接池，退出上下文时不会关闭连接）：
    async with HttpClient.create() as client:
        response = await client.get("https://api.example.com/data")
 
-2. aiohttp 客户端：
+2. aiohttp 客户端（返回共享 session，不要手动关闭）：
    async with HttpClient.create_aiohttp() as session:
        async with session.get("https://api.example.com/data") as response:
            data = await response.json()
@@ -23,17 +25,49 @@ HTTP 客户端工厂和管理器
 """
 
 import ssl
+import asyncio
 import certifi
 import httpx
 from typing import Optional, Dict, Any, AsyncGenerator, Generator
 from contextlib import asynccontextmanager, contextmanager
 import aiohttp
 
+try:
+    import h2  # noqa: F401  # httpx 的 HTTP/2 支持依赖 h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# 连接池中保持的空闲连接数与存活时间（秒）
+KEEPALIVE_CONNECTIONS = 50
+KEEPALIVE_EXPIRY = 30
+
+# 只影响连接池（transport）的 httpx 参数；带这些参数时不能复用共享连接池
+_TRANSPORT_KWARGS = {'verify', 'cert', 'limits', 'http1', 'http2', 'proxy', 'mounts', 'transport'}
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """委托给共享连接池的 transport；关闭客户端时不关闭共享连接池"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
 
 class HttpClient:
     """HTTP 客户端工厂和管理器"""
 
     _ssl_context: Optional[ssl.SSLContext] = None
+    # 共享的长连接客户端，绑定到创建它们的事件循环
+    _shared_client: Optional[httpx.AsyncClient] = None
+    _shared_transport: Optional[httpx.AsyncHTTPTransport] = None
+    _shared_session: Optional[aiohttp.ClientSession] = None
+    _shared_loop: Optional[asyncio.AbstractEventLoop] = None
 
     @classmethod
     def _get_ssl_context(cls) -> ssl.SSLContext:
@@ -55,7 +89,9 @@ class HttpClient:
             'timeout': 300,
             'follow_redirects': True,
             'limits': httpx.Limits(
-                max_keepalive_connections=0, max_connections=200, keepalive_expiry=30
+                max_keepalive_connections=KEEPALIVE_CONNECTIONS,
+                max_connections=200,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
             ),
             **kwargs,
         }
@@ -68,19 +104,81 @@ class HttpClient:
     ) -> Dict[str, Any]:
         """获取 aiohttp 客户端配置"""
         config = {
-            'connector': aiohttp.TCPConnector(
-                ssl=cls._get_ssl_context(),
-                limit=200,
-                limit_per_host=50,
-                keepalive_timeout=0,
-            ),
             'timeout': aiohttp.ClientTimeout(total=300),
             'trust_env': trust_env,  # 启用环境变量代理支持
             **kwargs,
         }
+        if 'connector' not in config:
+            config['connector'] = cls._create_aiohttp_connector()
 
         return config
 
+    @classmethod
+    def _create_aiohttp_connector(cls) -> aiohttp.TCPConnector:
+        return aiohttp.TCPConnector(
+            ssl=cls._get_ssl_context(),
+            limit=200,
+            limit_per_host=50,
+            keepalive_timeout=KEEPALIVE_EXPIRY,
+        )
+
+    # ========== 共享连接池 ==========
+
+    @classmethod
+    def _ensure_shared(cls) -> bool:
+        """在当前事件循环上准备共享客户端；不在运行中的事件循环里或循环不同则返回 False"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+        if cls._shared_loop is not loop:
+            if cls._shared_loop is not None and not cls._shared_loop.is_closed():
+                # 另一个事件循环（例如线程中的 asyncio.run）使用独立的客户端
+                return False
+            cls._shared_loop = loop
+            cls._shared_client = None
+            cls._shared_transport = None
+            cls._shared_session = None
+
+        if cls._shared_client is None:
+            config = cls._get_client_config(http2=HTTP2_AVAILABLE)
+            cls._shared_transport = httpx.AsyncHTTPTransport(
+                verify=config.pop('verify'),
+                limits=config.pop('limits'),
+                http2=config.pop('http2'),
+            )
+            cls._shared_client = httpx.AsyncClient(transport=_SharedTransport(cls._shared_transport), **config)
+        if cls._shared_session is None or cls._shared_session.closed:
+            cls._shared_session = aiohttp.ClientSession(**cls._get_aiohttp_config())
+        return True
+
+    @classmethod
+    def get_shared_client(cls) -> httpx.AsyncClient:
+        """获取共享的 httpx 异步客户端（不要关闭）"""
+        if not cls._ensure_shared():
+            raise RuntimeError("Shared HTTP clients require the application event loop")
+        return cls._shared_client  # type: ignore
+
+    @classmethod
+    def get_shared_aiohttp(cls) -> 'aiohttp.ClientSession':
+        """获取共享的 aiohttp session（不要关闭）"""
+        if not cls._ensure_shared():
+            raise RuntimeError("Shared HTTP clients require the application event loop")
+        return cls._shared_session  # type: ignore
+
+    @classmethod
+    async def aclose_shared(cls) -> None:
+        """关闭共享客户端，由应用 lifespan 在关闭时调用"""
+        if cls._shared_session is not None:
+            await cls._shared_session.close()
+        if cls._shared_transport is not None:
+            await cls._shared_transport.aclose()
+        cls._shared_client = None
+        cls._shared_transport = None
+        cls._shared_session = None
+        cls._shared_loop = None
+
     # ========== 工厂方法 ==========
 
     @classmethod
@@ -88,9 +186,22 @@ class HttpClient:
     async def create(
         cls, url: Optional[str] = None, **kwargs: Any
     ) -> AsyncGenerator[httpx.AsyncClient, None]:
-        """创建异步客户端上下文管理器"""
-        config = cls._get_client_config(**kwargs)
-        client = httpx.AsyncClient(**config)
+        """创建异步客户端上下文管理器
+
+        默认复用共享连接池；只修改客户端级参数（如 timeout、headers）时也共享连接池，
+        修改连接池参数（verify、limits 等）时创建独立客户端。
+        """
+        if not kwargs and cls._ensure_shared():
+            yield cls._shared_client  # type: ignore
+            return
+
+        if not (_TRANSPORT_KWARGS & kwargs.keys()) and cls._ensure_shared():
+            config = cls._get_client_config(**kwargs)
+            config.pop('verify')
+            config.pop('limits')
+            client = httpx.AsyncClient(transport=_SharedTransport(cls._shared_transport), **config)  # type: ignore
+        else:
+            client = httpx.AsyncClient(**cls._get_client_config(**kwargs))
         try:
             yield client
         finally:
@@ -127,14 +238,24 @@ class HttpClient:
     async def create_aiohttp(
         cls, trust_env: bool = True, **kwargs: Any
     ) -> AsyncGenerator['aiohttp.ClientSession', None]:
-        """创建 aiohttp 客户端上下文管理器
+        """获取 aiohttp 客户端上下文管理器
+
+        默认返回共享 session（退出时不关闭）；带自定义参数时创建新的 session，
+        但仍复用共享连接器的连接池。
 
         Args:
             trust_env: 是否信任环境变量代理设置 (HTTP_PROXY, HTTPS_PROXY, etc.)
             **kwargs: 其他 aiohttp.ClientSession 参数
         """
-        config = cls._get_aiohttp_config(trust_env=trust_env, **kwargs)
-        session = aiohttp.ClientSession(**config)
+        if not cls._ensure_shared():
+            session = aiohttp.ClientSession(**cls._get_aiohttp_config(trust_env=trust_env, **kwargs))
+        elif not kwargs and trust_env:
+            yield cls._shared_session  # type: ignore
+            return
+        else:
+            if 'connector' not in kwargs:
+                kwargs.update(connector=cls._shared_session.connector, connector_owner=False)  # type: ignore
+            session = aiohttp.ClientSession(**cls._get_aiohttp_config(trust_env=trust_env, **kwargs))
         try:
             yield session
         finally:
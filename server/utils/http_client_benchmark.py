@@ -0,0 +1,83 @@
+"""
+Connection reuse benchmark for HttpClient.
+
+Runs a 150-iteration status poll loop against a local HTTP server and counts the TCP
+connections it opened; over HTTPS every new connection is also a TLS handshake. Loopback
+connections are nearly free, so the timings here understate what remote hosts cost. Run
+from the server directory:
+
+    python -m utils.http_client_benchmark
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Set
+
+import aiohttp
+from aiohttp import web
+
+from utils.http_client import HttpClient
+
+POLL_ITERATIONS = 150
+
+
+async def _legacy_poll(url: str) -> None:
+    """One fresh session per request, as call sites did before the shared pool"""
+    for _ in range(POLL_ITERATIONS):
+        connector = aiohttp.TCPConnector(limit=200, limit_per_host=50, force_close=True)
+        async with aiohttp.ClientSession(connector=connector, trust_env=True) as session:
+            async with session.get(url) as response:
+                await response.json()
+
+
+async def _shared_aiohttp_poll(url: str) -> None:
+    for _ in range(POLL_ITERATIONS):
+        async with HttpClient.create_aiohttp() as session:
+            async with session.get(url) as response:
+                await response.json()
+
+
+async def _shared_httpx_poll(url: str) -> None:
+    for _ in range(POLL_ITERATIONS):
+        async with HttpClient.create() as client:
+            response = await client.get(url)
+            response.json()
+
+
+async def main() -> None:
+    # Client (host, port) pairs: one per TCP connection
+    connections: Set[Any] = set()
+
+    async def status(request: web.Request) -> web.Response:
+        connections.add(request.transport.get_extra_info('peername'))  # type: ignore
+        return web.json_response({'status': 'processing'})
+
+    app = web.Application()
+    app.router.add_get('/status', status)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore
+    url = f'http://127.0.0.1:{port}/status'
+
+    runs: list[tuple[str, Callable[[str], Awaitable[None]]]] = [
+        ('session per request (before)', _legacy_poll),
+        ('shared aiohttp session', _shared_aiohttp_poll),
+        ('shared httpx client', _shared_httpx_poll),
+    ]
+    print(f"{'strategy':<30} {'connections':>12} {'ms':>10}")
+    try:
+        for name, poll in runs:
+            connections.clear()
+            start = time.perf_counter()
+            await poll(url)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{name:<30} {len(connections):>12} {elapsed:>10.1f}")
+    finally:
+        await HttpClient.aclose_shared()
+        await runner.cleanup()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+LLM 客户端注册表
+
+每个 provider + base URL 只创建一组 httpx 客户端（同步 + 异步），由所有模型实例共享，
+不再在每次创建 ChatOpenAI 时新建并泄漏客户端。每个 provider 的并发请求数受
+LLM_MAX_CONCURRENCY 限制：LLM 流式响应在整个生成期间占用一个连接，因此客户端只用
+HTTP/1.1，并把连接池上限设为并发上限，超出的请求在连接池中排队等待（最长
+LLM_POOL_TIMEOUT 秒）。应用关闭时由 lifespan 调用 aclose()。
+"""
+
+import os
+import httpx
+from typing import Dict, Optional, Tuple, Any
+from utils.http_client import HttpClient, KEEPALIVE_EXPIRY
+
+# 每个 provider 同时进行的请求数上限
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 16))
+# 等待空闲连接的最长时间（秒）
+LLM_POOL_TIMEOUT = float(os.environ.get("LLM_POOL_TIMEOUT", 120))
+# 单个请求的读取超时（秒）
+LLM_REQUEST_TIMEOUT = 300
+
+
+class LLMClientRegistry:
+    """按 provider + base URL 复用的 LLM httpx 客户端"""
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self._async_clients: Dict[Tuple[str, str], httpx.AsyncClient] = {}
+        self._sync_clients: Dict[Tuple[str, str], httpx.Client] = {}
+
+    def _client_config(self) -> Dict[str, Any]:
+        return HttpClient._get_client_config(
+            timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, pool=LLM_POOL_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    def get_async_client(self, provider: str, base_url: Optional[str]) -> httpx.AsyncClient:
+        key = (provider, base_url or '')
+        client = self._async_clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(**self._client_config())
+            self._async_clients[key] = client
+        return client
+
+    def get_sync_client(self, provider: str, base_url: Optional[str]) -> httpx.Client:
+        key = (provider, base_url or '')
+        client = self._sync_clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.Client(**self._client_config())
+            self._sync_clients[key] = client
+        return client
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'max_concurrency': self.max_concurrency,
+            'async_clients': len(self._async_clients),
+            'sync_clients': len(self._sync_clients),
+        }
+
+    async def aclose(self) -> None:
+        """关闭所有客户端"""
+        for client in self._async_clients.values():
+            await client.aclose()
+        for sync_client in self._sync_clients.values():
+            sync_client.close()
+        self._async_clients.clear()
+        self._sync_clients.clear()
+
+
+llm_client_registry = LLMClientRegistry()